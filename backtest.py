@@ -9,15 +9,28 @@ from datetime import datetime, timedelta
 import time
 import numpy as np
 import os
+import hashlib
+import itertools
+import multiprocessing
+import zlib
 from pathlib import Path
 from fpdf import FPDF
 
+import data_cache
+import indicators
+import results_store
+from indicators import calculate_percentile_threshold, calculate_z_score_threshold, normalize_tnx, rsi
+
 # --- CONFIGURATION ---
 LOOKBACK_YEARS = 15
 HISTORICAL_START_DATE = "1916-01-01"
 BACKTEST_START_DATE = os.environ.get("BACKTEST_START_DATE")
 BACKTEST_TAG = os.environ.get("BACKTEST_TAG")
+BACKTEST_ERAS = os.environ.get("BACKTEST_ERAS", "")
 FORWARD_WINDOWS = [30, 90, 180]
+RESULT_ASSETS = ["^SPX", "WPM", "BTC-USD"]
+EVENT_STUDY_ASSETS = ["^SPX", "WPM", "BTC-USD", "GC=F", "^TNX", "DX-Y.NYB"]
+EVENT_STUDY_HORIZONS = [int(h) for h in os.environ.get("EVENT_STUDY_HORIZONS", "5,10,30,90,180,365").split(",") if h.strip()]
 TEMPORAL_WINDOW_DAYS = 30
 DEDUP_DAYS = 30
 DEPRESSION_FORWARD_DAYS = 365
@@ -25,6 +38,63 @@ DEPRESSION_FORWARD_TRADING_DAYS = 252
 HIST_WINDOW_TRADING_DAYS = 252 * 5
 DEPRESSION_Z_THRESHOLD = 2.0
 DEPRESSION_COMPONENTS_REQUIRED = 3
+WARMUP_TRADING_DAYS = 505
+BACKTEST_ENGINE = os.environ.get("BACKTEST_ENGINE", "vectorized").lower()
+DEPRESSION_CACHE_PATH = os.environ.get("DEPRESSION_CACHE_PATH", "output/cache/depression_outcomes.pkl")
+BACKTEST_INCREMENTAL = os.environ.get("BACKTEST_INCREMENTAL", "true").strip().lower() not in {"0", "false", "no", "off"}
+BACKTEST_CHECKPOINT_PATH = os.environ.get("BACKTEST_CHECKPOINT_PATH")
+BOOTSTRAP_REPLICATES = int(os.environ.get("BOOTSTRAP_REPLICATES", "2000"))
+BOOTSTRAP_WORKERS = int(os.environ.get("BOOTSTRAP_WORKERS", "0")) or None
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 20080915
+
+SINGLE_SIGNALS = [
+    "SOLVENCY_DEATH",
+    "SUGAR_CRASH",
+    "WAR_PROTOCOL",
+    "EM_CURRENCY_STRESS",
+    "BOND_FREEZE",
+    "HOUSING_BUST",
+    "LABOUR_SHOCK",
+    "INTERBANK_STRESS",
+    "BUY_WPM_NOW",
+    "BUY_BTC_NOW",
+    "FLASH_MOVE",
+]
+# Thresholds of the vectorized engine (analyse_date keeps them inline); the
+# parameter sweep overrides any subset of these per evaluation.
+SIGNAL_PARAMS = {
+    "spread_threshold": 5.0,
+    "vix_ceiling": 13.0,
+    "flash_move_pct": 5.0,
+    "z_num_std": 2.0,
+    "dxy_percentile": 95,
+    "temporal_window_days": TEMPORAL_WINDOW_DAYS,
+    "dedup_days": DEDUP_DAYS,
+}
+COMBO_SIGNALS = ["COMBO_CRISIS", "DEPRESSION_ALERT", "DEPRESSION_WATCH", "TEMPORAL_CRISIS"]
+TRACKED_SIGNALS = ["SOLVENCY_DEATH", "SUGAR_CRASH", "EM_CURRENCY_STRESS", "WAR_PROTOCOL",
+                   "INTERBANK_STRESS", "LABOUR_SHOCK", "FLASH_MOVE"]
+FLASH_TICKERS = {
+    "^TNX": "Bonos 10Y",
+    "^SPX": "S&P 500",
+    "CL=F": "Petróleo",
+    "GC=F": "Oro",
+    "BTC-USD": "Bitcoin",
+    "DX-Y.NYB": "Dólar (DXY)",
+    "^VIX": "VIX"
+}
+# Combo discovery: every 2..COMBO_MAX_SIZE subset of these, per window length
+COMBO_DISCOVERY_SIGNALS = ["SOLVENCY_DEATH", "SUGAR_CRASH", "EM_CURRENCY_STRESS", "BOND_FREEZE", "WAR_PROTOCOL",
+                           "HOUSING_BUST", "LABOUR_SHOCK", "INTERBANK_STRESS", "FLASH_MOVE"]
+COMBO_WINDOWS = [int(w) for w in os.environ.get("COMBO_WINDOWS", str(TEMPORAL_WINDOW_DAYS)).split(",") if w.strip()]
+COMBO_MAX_SIZE = int(os.environ.get("COMBO_MAX_SIZE", "3"))
+COMBO_COOLDOWN_DAYS = DEDUP_DAYS
+COMBO_MIN_OCCURRENCES = 5
+COMBO_STRONG_IMPROVEMENT_PP = 10.0
+COMBO_COLUMNS = ["combo", "size", "occurrences", "window_days", "cooldown_days", "depression_rate", "crash_rate",
+                 "avg_fwd_90", "avg_depression_score", "best_individual_depression_rate", "improvement_pp",
+                 "classification"]
 
 REPORT_TEXT = {
     "en": {
@@ -113,50 +183,15 @@ REPORT_TEXT = {
 def get_report_labels(lang):
     return REPORT_TEXT.get(lang, REPORT_TEXT["en"])
 
-# --- TECHNICAL INDICATORS ---
-def rsi(series, period=14):
-    if series.empty or len(series) < period:
-        return pd.Series([50.0] * len(series), index=series.index)
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_z_score_threshold(series, window=250, num_std=2.0):
-    if len(series) < window: return None, None
-    rolling_mean = series.rolling(window=window).mean().iloc[-1]
-    rolling_std = series.rolling(window=window).std().iloc[-1]
-    if pd.isna(rolling_mean) or pd.isna(rolling_std) or rolling_std == 0: return None, None
-    threshold = rolling_mean + (num_std * rolling_std)
-    z_score = (series.iloc[-1] - rolling_mean) / rolling_std
-    return threshold, z_score
-
-def calculate_percentile_threshold(series, window=250, percentile=95):
-    if len(series) < window: return None, None
-    threshold = series.rolling(window=window).quantile(percentile / 100.0).iloc[-1]
-    if pd.isna(threshold): return None, None
-    recent = series.iloc[-window:]
-    pctl = (recent < series.iloc[-1]).sum() / len(recent) * 100
-    return threshold, pctl
-
-def normalize_tnx(series):
-    """
-    Normalize ^TNX units if Yahoo returns yield * 10.
-    Heuristic: if median > 20, assume scaled and divide by 10.
-    """
-    if series is None or series.empty:
-        return series
-    median_val = series.median(skipna=True)
-    if pd.notna(median_val) and median_val > 20:
-        return series / 10.0
-    return series
-
 # --- DATA FETCHING ---
-def fetch_historical_data():
+def fetch_fred(series, start, end):
+    return web.DataReader(series, "fred", start, end)
+
+def fetch_historical_data(start=None):
     end_date = datetime.now()
-    if BACKTEST_START_DATE:
-        start_date = datetime.strptime(BACKTEST_START_DATE, "%Y-%m-%d")
+    start = start or BACKTEST_START_DATE
+    if start:
+        start_date = datetime.strptime(start, "%Y-%m-%d")
     elif HISTORICAL_START_DATE:
         start_date = datetime.strptime(HISTORICAL_START_DATE, "%Y-%m-%d")
     else:
@@ -178,9 +213,12 @@ def fetch_historical_data():
                 time.sleep(delays[min(attempt, len(delays) - 1)])
         return pd.DataFrame()
 
+    def download_group(group, start, end):
+        return download_series(group[0], start, end)
+
     market_df = pd.DataFrame()
     for ticker in tickers:
-        df = download_series(ticker, start_date, end_date)
+        df = data_cache.cached_yahoo_download([ticker], start_date, end_date, download_group)
         if df.empty:
             print(f"YF missing: {ticker}")
             continue
@@ -205,11 +243,11 @@ def fetch_historical_data():
             print(f"Market data start: {actual_start.date()}")
 
     try:
-        fred_df = web.DataReader(
+        fred_df = data_cache.cached_fred(
             ["BAMLH0A0HYM2", "RRPONTSYD", "WALCL", "WTREGEN", "ICSA", "SOFR", "DFF", "USREC"],
-            "fred",
             start_date,
             end_date,
+            fetch_fred,
         ).ffill()
         if not fred_df.empty:
             actual_start = fred_df.dropna(how="all").index.min()
@@ -220,7 +258,7 @@ def fetch_historical_data():
         fred_df = pd.DataFrame()
 
     try:
-        housing_df = web.DataReader(["HOUST", "MORTGAGE30US", "CSUSHPINSA", "DRSFRMACBS"], "fred", start_date, end_date).ffill()
+        housing_df = data_cache.cached_fred(["HOUST", "MORTGAGE30US", "CSUSHPINSA", "DRSFRMACBS"], start_date, end_date, fetch_fred).ffill()
         if not housing_df.empty:
             actual_start = housing_df.dropna(how="all").index.min()
             if actual_start is not None:
@@ -347,17 +385,8 @@ def analyse_date(market_df, fred_df, housing_df, idx, history_log):
             triggers.append("BUY_BTC_NOW")
 
     # --- FLASH MOVE DETECTOR ---
-    flash_tickers = {
-        "^TNX": "Bonos 10Y",
-        "^SPX": "S&P 500",
-        "CL=F": "Petróleo",
-        "GC=F": "Oro",
-        "BTC-USD": "Bitcoin",
-        "DX-Y.NYB": "Dólar (DXY)",
-        "^VIX": "VIX"
-    }
     if len(m_win) > 1:
-        for ticker in flash_tickers:
+        for ticker in FLASH_TICKERS:
             if ticker in m_win.columns:
                 current_price = m_win[ticker].iloc[-1]
                 prev_price = m_win[ticker].iloc[-2]
@@ -391,16 +420,280 @@ def analyse_date(market_df, fred_df, housing_df, idx, history_log):
         triggers.append("TEMPORAL_CRISIS")
         details["TEMPORAL_CRISIS"] = "Solvency+War"
 
-    tracked_signals = {"SOLVENCY_DEATH", "SUGAR_CRASH", "EM_CURRENCY_STRESS", "WAR_PROTOCOL",
-                       "INTERBANK_STRESS", "LABOUR_SHOCK", "FLASH_MOVE"}
     for t in triggers:
-        if t in tracked_signals:
+        if t in TRACKED_SIGNALS:
             history_log.append((current_date, t))
 
     cutoff = current_date - timedelta(days=TEMPORAL_WINDOW_DAYS * 2)
     new_log = [x for x in history_log if x[0] > cutoff]
     return triggers, new_log, details
 
+
+# --- VECTORIZED SIGNAL ENGINE ---
+def _asof(series, index):
+    """
+    Aligns a series onto index using the last row at or before each date,
+    i.e. the value `series.loc[:date].iloc[-1]` would return.
+    """
+    if series is None or series.empty:
+        return pd.Series(np.nan, index=index)
+    return series.reindex(index, method="ffill")
+
+
+def _asof_flag(flags, index):
+    return _asof(flags.astype(float), index).fillna(0) > 0
+
+
+def _rows_up_to(df, index):
+    """Number of rows of df dated at or before each date in index (len of `df.loc[:date]`)."""
+    if df is None or df.empty:
+        return np.zeros(len(index), dtype=int)
+    return np.searchsorted(df.index.values, index.values, side="right")
+
+
+def _last_or(df, col, default):
+    """Vector form of `get_last(df, col) or default`."""
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=float)
+    series = df[col]
+    return series.where(series.notna() & (series != 0), default)
+
+
+def signal_indicator_sets(market_df, fred_df):
+    """Memoized indicator sets read by build_signal_matrix (market columns and ICSA)."""
+    icsa = None
+    if not fred_df.empty and "ICSA" in fred_df.columns:
+        icsa = indicators.IndicatorSet(fred_df["ICSA"].dropna().to_frame())
+    return {"market": indicators.IndicatorSet(market_df), "icsa": icsa}
+
+
+def build_signal_matrix(market_df, fred_df, housing_df, params=None, indicator_sets=None):
+    """
+    Evaluates every trigger for every trading day in one vectorized pass.
+    Returns (matrix, details): a boolean date x signal frame whose True cells
+    match the triggers analyse_date would emit when replayed by run_backtest,
+    and a frame holding the EventDetail text of the windowed combos.
+
+    params overrides SIGNAL_PARAMS (used by the parameter sweep); passing the
+    same indicator_sets across calls reuses every indicator series.
+    """
+    p = {**SIGNAL_PARAMS, **(params or {})}
+    index = market_df.index
+    n = len(index)
+    columns = SINGLE_SIGNALS + COMBO_SIGNALS
+    matrix = pd.DataFrame(False, index=index, columns=columns)
+    details = pd.DataFrame(None, index=index, columns=["DEPRESSION_ALERT", "DEPRESSION_WATCH", "TEMPORAL_CRISIS"], dtype=object)
+    if n == 0 or "^TNX" not in market_df.columns or "^SPX" not in market_df.columns:
+        return matrix, details
+
+    positions = np.arange(n)
+    us10y = market_df["^TNX"]
+    spx = market_df["^SPX"]
+    active = pd.Series((positions >= WARMUP_TRADING_DAYS) & us10y.notna().values & spx.notna().values, index=index)
+
+    dxy = _last_or(market_df, "DX-Y.NYB", 100)
+    oil = _last_or(market_df, "CL=F", 70)
+    gold = _last_or(market_df, "GC=F", 2000)
+    vix = _last_or(market_df, "^VIX", 15)
+
+    # Same memoized indicator math as the live sentinel, read as full columns.
+    indicator_sets = indicator_sets or signal_indicator_sets(market_df, fred_df)
+    ind = indicator_sets["market"]
+    btc_rsi = ind.rsi("BTC-USD")
+    wpm_rsi = ind.rsi("WPM")
+    us10y_rsi = ind.rsi("^TNX")
+    spx_rsi = ind.rsi("^SPX")
+
+    fred_rows = _rows_up_to(fred_df, index)
+    housing_rows = _rows_up_to(housing_df, index)
+    singles = {}
+
+    # --- SINGLE SIGNALS ---
+    solvency = pd.Series(False, index=index)
+    if not fred_df.empty and "BAMLH0A0HYM2" in fred_df.columns:
+        spread = fred_df["BAMLH0A0HYM2"].dropna()
+        limit = p["spread_threshold"]
+        confirmed = (spread > limit) & (spread.shift(1) > limit) & (spread.shift(2) > limit)
+        solvency = _asof_flag(confirmed, index) & (fred_rows > 3)
+    singles["SOLVENCY_DEATH"] = solvency
+
+    spx_high50 = ind.rolling("^SPX", 50, "max")
+    spx_rsi_high50 = ind.rsi_rolling("^SPX", 50, "max")
+    singles["SUGAR_CRASH"] = (spx >= spx_high50) & (spx_rsi < spx_rsi_high50) & (vix < p["vix_ceiling"])
+
+    war = pd.Series(False, index=index)
+    if "CL=F" in market_df.columns and "GC=F" in market_df.columns:
+        oil_threshold = ind.z_threshold("CL=F", 250, p["z_num_std"])
+        gold_high20 = ind.rolling("GC=F", 20, "max").shift(1)
+        spx_low20 = ind.rolling("^SPX", 20, "min").shift(1)
+        war = oil_threshold.notna() & (oil > oil_threshold) & (gold > gold_high20) & (spx < spx_low20)
+    singles["WAR_PROTOCOL"] = war
+
+    em = pd.Series(False, index=index)
+    if "DX-Y.NYB" in market_df.columns:
+        dxy_threshold = ind.pct_threshold("DX-Y.NYB", 250, p["dxy_percentile"])
+        us10y_sma = ind.rolling("^TNX", 250, "mean").where(positions + 1 > 250, 4.2)
+        adaptive = dxy_threshold.notna() & (dxy > dxy_threshold) & (us10y > us10y_sma)
+        fixed = dxy_threshold.isna() & (dxy > 107) & (us10y > 4.2)
+        em = adaptive | fixed
+    singles["EM_CURRENCY_STRESS"] = em
+
+    bond_threshold = ind.z_threshold("^TNX", 250, p["z_num_std"])
+    singles["BOND_FREEZE"] = bond_threshold.notna() & (us10y > bond_threshold) & (us10y_rsi > 70)
+
+    housing_bust = pd.Series(False, index=index)
+    if not housing_df.empty and "HOUST" in housing_df.columns and "MORTGAGE30US" in housing_df.columns:
+        houst = housing_df["HOUST"].dropna()
+        h_mean = houst.rolling(504).mean()
+        h_std = houst.rolling(504).std()
+        h_z = ((houst - h_mean) / h_std).where(h_std > 0, 0.0)
+        h_ready = pd.Series(np.arange(1, len(houst) + 1) >= 504, index=houst.index)
+        mortgage = housing_df["MORTGAGE30US"]
+        m_avg = mortgage.rolling(252).mean()
+        m_cur = _last_or(housing_df, "MORTGAGE30US", 6.0)
+        h_rows = pd.Series(np.arange(1, len(housing_df) + 1) > 252, index=housing_df.index)
+        bust = (
+            h_rows
+            & _asof_flag(h_ready, housing_df.index)
+            & (_asof(h_z, housing_df.index) < -1.5)
+            & m_avg.notna()
+            & (m_cur > m_avg)
+        )
+        housing_bust = _asof_flag(bust, index) & (housing_rows > 252)
+    singles["HOUSING_BUST"] = housing_bust
+
+    labour = pd.Series(False, index=index)
+    if indicator_sets["icsa"] is not None:
+        icsa_ind = indicator_sets["icsa"]
+        icsa = icsa_ind.frame["ICSA"]
+        icsa_threshold = icsa_ind.z_threshold("ICSA", 250, p["z_num_std"])
+        icsa_avg = icsa_ind.rolling("ICSA", 20, "mean")
+        icsa_ready = pd.Series(np.arange(1, len(icsa) + 1) > 250, index=icsa.index)
+        shock = icsa_ready & icsa_threshold.notna() & (icsa_threshold != 0) & (icsa_avg > icsa_threshold)
+        labour = _asof_flag(shock, index)
+    singles["LABOUR_SHOCK"] = labour
+
+    interbank = pd.Series(False, index=index)
+    if not fred_df.empty and "SOFR" in fred_df.columns and "DFF" in fred_df.columns:
+        sofr = _asof(fred_df["SOFR"], index)
+        dff = _asof(fred_df["DFF"], index)
+        interbank = sofr.notna() & (sofr != 0) & dff.notna() & (dff != 0) & (sofr > dff + 0.10)
+    singles["INTERBANK_STRESS"] = interbank
+
+    buy_wpm = pd.Series(False, index=index)
+    if "WPM" in market_df.columns and "WPM_Volume" in market_df.columns:
+        wpm = market_df["WPM"]
+        wpm_yest = wpm.shift(1)
+        wpm_crash = wpm.notna() & (wpm != 0) & wpm_yest.notna() & (wpm_yest > 0) & (wpm < (wpm_yest * 0.95))
+        w_mean = ind.rolling("WPM", 20, "mean")
+        w_std = ind.rolling("WPM", 20, "std")
+        w_lower = w_mean - (2 * w_std)
+        w_vol = market_df["WPM_Volume"]
+        w_vol_avg = ind.rolling("WPM_Volume", 20, "mean")
+        buy_wpm = (
+            wpm_crash
+            & (positions + 1 > 20)
+            & w_lower.notna()
+            & (wpm < w_lower)
+            & (wpm_rsi < 30)
+            & w_vol.notna()
+            & w_vol_avg.notna()
+            & (w_vol > (w_vol_avg * 2))
+        )
+    singles["BUY_WPM_NOW"] = buy_wpm
+
+    buy_btc = pd.Series(False, index=index)
+    if not fred_df.empty and {"WALCL", "WTREGEN", "RRPONTSYD"}.issubset(fred_df.columns):
+        net_liq = fred_df["WALCL"].fillna(0) - (fred_df["WTREGEN"].fillna(0) + fred_df["RRPONTSYD"].fillna(0))
+        nl_s = fred_df["WALCL"] - (fred_df["WTREGEN"] + fred_df["RRPONTSYD"])
+        nl_sma = nl_s.rolling(10).mean()
+        nl_prev = nl_s.shift(1)
+        nl_prev_sma = nl_sma.shift(1)
+        nl_rows = pd.Series(np.arange(1, len(fred_df) + 1) > 10, index=fred_df.index)
+        pivot = nl_rows & nl_sma.notna() & nl_prev_sma.notna() & (net_liq > nl_sma) & (nl_prev < nl_prev_sma)
+        buy_btc = _asof_flag(pivot, index) & (btc_rsi < 60)
+    singles["BUY_BTC_NOW"] = buy_btc
+
+    flash = pd.Series(False, index=index)
+    for ticker in FLASH_TICKERS:
+        if ticker not in market_df.columns:
+            continue
+        current_price = market_df[ticker]
+        prev_price = current_price.shift(1)
+        pct_change = ((current_price - prev_price) / prev_price) * 100
+        valid = current_price.notna() & prev_price.notna() & (prev_price > 0)
+        flash = flash | (valid & (pct_change.abs() > p["flash_move_pct"]))
+    singles["FLASH_MOVE"] = flash
+
+    for name in SINGLE_SIGNALS:
+        matrix[name] = singles[name].fillna(False).astype(bool) & active
+
+    # --- COMPLEX COMBINATIONS ---
+    # A tracked signal is "recent" on day t when it fired on an earlier
+    # replayed day no more than temporal_window_days calendar days before t.
+    recent = {}
+    for name in TRACKED_SIGNALS:
+        fired_on = pd.Series(index.where(matrix[name].values), index=index)
+        last_prior = fired_on.ffill().shift(1)
+        age_days = (index.to_series() - last_prior).dt.days
+        recent[name] = (age_days <= p["temporal_window_days"]).fillna(False) & active
+
+    matrix["COMBO_CRISIS"] = matrix["SOLVENCY_DEATH"] & matrix["SUGAR_CRASH"]
+
+    sugar_interbank = recent["SUGAR_CRASH"] & recent["INTERBANK_STRESS"]
+    depression_alert = sugar_interbank & recent["FLASH_MOVE"]
+    watch_interbank = sugar_interbank & ~depression_alert
+    watch_labour = recent["SUGAR_CRASH"] & recent["LABOUR_SHOCK"] & ~sugar_interbank
+    matrix["DEPRESSION_ALERT"] = depression_alert
+    matrix["DEPRESSION_WATCH"] = watch_interbank | watch_labour
+    details.loc[depression_alert.values, "DEPRESSION_ALERT"] = "Sugar+Interbank+Flash"
+    details.loc[watch_interbank.values, "DEPRESSION_WATCH"] = "Sugar+Interbank"
+    details.loc[watch_labour.values, "DEPRESSION_WATCH"] = "Sugar+Labour"
+
+    sugar_em = recent["SUGAR_CRASH"] & recent["EM_CURRENCY_STRESS"]
+    solvency_war = recent["SOLVENCY_DEATH"] & recent["WAR_PROTOCOL"] & ~sugar_em
+    matrix["TEMPORAL_CRISIS"] = sugar_em | solvency_war
+    details.loc[sugar_em.values, "TEMPORAL_CRISIS"] = "Sugar+EM"
+    details.loc[solvency_war.values, "TEMPORAL_CRISIS"] = "Solvency+War"
+
+    return matrix, details
+
+
+def iter_signal_days(market_df, fred_df, housing_df, engine=None, signals=None, start=0, history_log=None):
+    """
+    Yields (idx, triggers, details) for every replayed day with at least one trigger.
+    engine="loop" replays analyse_date day by day; the default vectorized engine
+    reads the same triggers from build_signal_matrix (or from `signals`, an
+    already built (matrix, details) pair).
+
+    start skips days before that position; a resumed loop replay takes the
+    history_log of the run it continues.
+    """
+    engine = (engine or BACKTEST_ENGINE).lower()
+    if engine == "loop":
+        history_log = list(history_log or [])
+        for idx in range(max(WARMUP_TRADING_DAYS, start), len(market_df)):
+            triggers, history_log, details = analyse_date(market_df, fred_df, housing_df, idx, history_log)
+            if triggers:
+                yield idx, triggers, details
+        return
+
+    matrix, details = signals or build_signal_matrix(market_df, fred_df, housing_df)
+    columns = list(matrix.columns)
+    values = matrix.to_numpy()
+    detail_columns = list(details.columns)
+    detail_values = details.to_numpy()
+    for idx in np.flatnonzero(values.any(axis=1)):
+        if idx < start:
+            continue
+        triggers = [columns[j] for j in np.flatnonzero(values[idx])]
+        row_details = {
+            name: detail_values[idx, j]
+            for j, name in enumerate(detail_columns)
+            if detail_values[idx, j] is not None and name in triggers
+        }
+        yield int(idx), triggers, row_details
+
 def max_drawdown_pct(series):
     if series.empty:
         return None
@@ -410,13 +703,39 @@ def max_drawdown_pct(series):
     min_price = series.min()
     return ((min_price - start_price) / start_price) * 100
 
+def forward_rolling(series, periods, how="min"):
+    """
+    Min/max over the forward window [i, i + periods] of every row, ignoring NaN
+    (NaN when the whole window is missing). Runs as one reversed rolling pass.
+    """
+    reversed_series = series.iloc[::-1]
+    rolling = reversed_series.rolling(window=periods + 1, min_periods=1)
+    result = rolling.min() if how == "min" else rolling.max()
+    return result.iloc[::-1]
+
+
+def forward_drawdown_pct(series, periods):
+    """
+    Vector form of max_drawdown_pct over the forward window [i, i + periods]:
+    the drop from the first valid price in the window to the window minimum.
+    """
+    values = series.to_numpy(dtype=float)
+    positions = np.arange(len(values))
+    next_valid = pd.Series(np.where(np.isnan(values), np.nan, positions)).bfill().to_numpy()
+    has_start = ~np.isnan(next_valid) & (next_valid <= positions + periods)
+    start_price = np.full(len(values), np.nan)
+    start_price[has_start] = values[next_valid[has_start].astype(int)]
+    start_price[start_price == 0] = np.nan
+    window_min = forward_rolling(series, periods, how="min").to_numpy(dtype=float)
+    drawdown = ((window_min - start_price) / start_price) * 100
+    return pd.Series(drawdown, index=series.index)
+
+
 def prepare_depression_inputs(market_df, fred_df, housing_df):
-    spx = market_df["^SPX"] if "^SPX" in market_df.columns else pd.Series()
-    spx_dd_forward = []
-    for i in range(len(market_df)):
-        end_i = min(i + DEPRESSION_FORWARD_TRADING_DAYS, len(market_df) - 1)
-        spx_window = spx.iloc[i:end_i + 1].dropna()
-        spx_dd_forward.append(max_drawdown_pct(spx_window))
+    if "^SPX" in market_df.columns:
+        spx_dd_forward = forward_drawdown_pct(market_df["^SPX"], DEPRESSION_FORWARD_TRADING_DAYS)
+    else:
+        spx_dd_forward = pd.Series(np.nan, index=market_df.index)
 
     icsa_4w = pd.Series()
     if not fred_df.empty and "ICSA" in fred_df.columns:
@@ -427,7 +746,7 @@ def prepare_depression_inputs(market_df, fred_df, housing_df):
         interbank_spread = (fred_df["SOFR"] - fred_df["DFF"]).dropna()
 
     return {
-        "spx_dd_forward": pd.Series(spx_dd_forward, index=market_df.index),
+        "spx_dd_forward": spx_dd_forward,
         "icsa_4w": icsa_4w,
         "interbank_spread": interbank_spread,
     }
@@ -553,6 +872,620 @@ def compute_depression_outcomes(market_df, fred_df, housing_df, idx, precomp):
         "Depress_Interbank_Z": round(interbank_z, 2) if interbank_z is not None else None,
     }
 
+
+def _range_extreme(values, lo, hi, how="max"):
+    """
+    Max/min of values[lo:hi] for every (lo, hi) pair via a sparse table,
+    O(N log N) to build and O(1) per window. Empty windows give NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    lo = np.asarray(lo, dtype=np.int64)
+    hi = np.asarray(hi, dtype=np.int64)
+    result = np.full(len(lo), np.nan)
+    valid = hi > lo
+    if len(values) == 0 or not valid.any():
+        return result
+    reduce = np.fmax if how == "max" else np.fmin
+    table = [values]
+    span = 1
+    while span * 2 <= len(values):
+        prev = table[-1]
+        table.append(reduce(prev[:-span], prev[span:]))
+        span *= 2
+    lengths = hi[valid] - lo[valid]
+    levels = np.floor(np.log2(lengths)).astype(int)
+    starts = lo[valid]
+    ends = hi[valid] - (1 << levels)
+    stacked_lo = np.empty(len(starts))
+    stacked_hi = np.empty(len(starts))
+    for level in np.unique(levels):
+        mask = levels == level
+        stacked_lo[mask] = table[level][starts[mask]]
+        stacked_hi[mask] = table[level][ends[mask]]
+    result[valid] = reduce(stacked_lo, stacked_hi)
+    return result
+
+
+def _trailing_forward_stats(series, index, forward_days, how="max"):
+    """
+    For every date d in index, returns (mean, std, extreme) where mean/std cover
+    the last HIST_WINDOW_TRADING_DAYS rows of series up to d and extreme is the
+    max/min of series over [d, d + forward_days]. series must be NaN-free.
+    """
+    rolling = series.rolling(window=HIST_WINDOW_TRADING_DAYS, min_periods=1)
+    mean = _asof(rolling.mean(), index).to_numpy()
+    std = _asof(rolling.std(), index).to_numpy()
+    lo = np.searchsorted(series.index.values, index.values, side="left")
+    hi = np.searchsorted(series.index.values, (index + timedelta(days=forward_days)).values, side="right")
+    extreme = _range_extreme(series.to_numpy(), lo, hi, how=how)
+    extreme[np.isnan(mean)] = np.nan
+    return mean, std, extreme
+
+
+def _severity_z(extreme, mean, std):
+    """z-score of the forward extreme, NaN where the trailing std is missing or zero."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, (extreme - mean) / std, np.nan)
+
+
+def build_depression_outcome_table(market_df, fred_df, housing_df, precomp=None):
+    """
+    Builds the Depress_* outcome columns of compute_depression_outcomes for every
+    trading day at once, so the backtest only looks rows up by signal date.
+    """
+    if precomp is None:
+        precomp = prepare_depression_inputs(market_df, fred_df, housing_df)
+    index = market_df.index
+    n = len(index)
+    nan = np.full(n, np.nan)
+
+    # Equity drawdown proxy: 5th percentile of the prior HIST_WINDOW valid drawdowns
+    spx_dd = precomp["spx_dd_forward"].to_numpy(dtype=float)
+    dd_valid = precomp["spx_dd_forward"].dropna()
+    dd_q05 = dd_valid.rolling(window=HIST_WINDOW_TRADING_DAYS, min_periods=1).quantile(0.05)
+    positions = np.arange(n)
+    valid_positions = np.flatnonzero(~np.isnan(spx_dd))
+    prior_count = np.searchsorted(valid_positions, positions, side="left")
+    dd_threshold = np.full(n, np.nan)
+    has_prior = prior_count > 0
+    dd_threshold[has_prior] = dd_q05.to_numpy()[prior_count[has_prior] - 1]
+    equity_crash = has_prior & (spx_dd <= dd_threshold)
+
+    credit_max, credit_z = nan, nan
+    if not fred_df.empty and "BAMLH0A0HYM2" in fred_df.columns:
+        mean, std, credit_max = _trailing_forward_stats(fred_df["BAMLH0A0HYM2"].dropna(), index, DEPRESSION_FORWARD_DAYS)
+        credit_z = _severity_z(credit_max, mean, std)
+    credit_freeze = credit_z >= DEPRESSION_Z_THRESHOLD
+
+    icsa_max_4w, icsa_z = nan, nan
+    if not precomp["icsa_4w"].empty:
+        mean, std, icsa_max_4w = _trailing_forward_stats(precomp["icsa_4w"].dropna(), index, DEPRESSION_FORWARD_DAYS)
+        icsa_z = _severity_z(icsa_max_4w, mean, std)
+    labor_shock = icsa_z >= DEPRESSION_Z_THRESHOLD
+
+    houst_z_min, mortgage_z_max = nan, nan
+    if not housing_df.empty and "HOUST" in housing_df.columns:
+        mean, std, houst_min = _trailing_forward_stats(housing_df["HOUST"].dropna(), index, DEPRESSION_FORWARD_DAYS, how="min")
+        houst_z_min = _severity_z(houst_min, mean, std)
+        if "MORTGAGE30US" in housing_df.columns:
+            mean, std, mortgage_max = _trailing_forward_stats(housing_df["MORTGAGE30US"].dropna(), index, DEPRESSION_FORWARD_DAYS)
+            mortgage_z_max = _severity_z(mortgage_max, mean, std)
+    housing_bust = (houst_z_min <= -DEPRESSION_Z_THRESHOLD) & (mortgage_z_max >= 1.0)
+
+    interbank_max_spread, interbank_z = nan, nan
+    if not precomp["interbank_spread"].empty:
+        mean, std, interbank_max_spread = _trailing_forward_stats(precomp["interbank_spread"].dropna(), index, DEPRESSION_FORWARD_DAYS)
+        interbank_z = _severity_z(interbank_max_spread, mean, std)
+    interbank_stress = interbank_z >= DEPRESSION_Z_THRESHOLD
+
+    nber_recession = np.zeros(n, dtype=bool)
+    if not fred_df.empty and "USREC" in fred_df.columns:
+        usrec = fred_df["USREC"].dropna()
+        lo = np.searchsorted(usrec.index.values, index.values, side="left")
+        hi = np.searchsorted(usrec.index.values, (index + timedelta(days=DEPRESSION_FORWARD_DAYS)).values, side="right")
+        nber_recession = _range_extreme(usrec.to_numpy(), lo, hi, how="max") >= 1
+
+    components = np.vstack([equity_crash, credit_freeze, labor_shock, housing_bust, interbank_stress]).astype(int)
+    depression_score = components.sum(axis=0)
+
+    table = pd.DataFrame(
+        {
+            "DepressionScore": depression_score,
+            "DepressionFlag": (depression_score >= DEPRESSION_COMPONENTS_REQUIRED).astype(int),
+            "Depress_NBER_Recession": nber_recession.astype(int),
+            "Depress_EquityCrash": components[0],
+            "Depress_CreditFreeze": components[1],
+            "Depress_LaborShock": components[2],
+            "Depress_HousingBust": components[3],
+            "Depress_Interbank": components[4],
+            "Depress_SPX_Drawdown_12m": np.round(spx_dd, 2),
+            "Depress_SPX_Drawdown_5p": np.round(dd_threshold, 2),
+            "Depress_Credit_Max": np.round(credit_max, 2),
+            "Depress_Credit_Z": np.round(credit_z, 2),
+            "Depress_ICSA_4w_Max": np.round(icsa_max_4w, 0),
+            "Depress_ICSA_Z": np.round(icsa_z, 2),
+            "Depress_HOUST_Z_Min": np.round(houst_z_min, 2),
+            "Depress_MORT_Z_Max": np.round(mortgage_z_max, 2),
+            "Depress_Interbank_Spread_Max": np.round(interbank_max_spread, 3),
+            "Depress_Interbank_Z": np.round(interbank_z, 2),
+        },
+        index=index,
+    )
+    return table
+
+
+def _depression_inputs_key(market_df, fred_df, housing_df):
+    digest = hashlib.sha1()
+    params = (DEPRESSION_FORWARD_DAYS, DEPRESSION_FORWARD_TRADING_DAYS, HIST_WINDOW_TRADING_DAYS,
+              DEPRESSION_Z_THRESHOLD, DEPRESSION_COMPONENTS_REQUIRED)
+    digest.update(repr(params).encode())
+    frames = [
+        market_df[["^SPX"]] if "^SPX" in market_df.columns else market_df.iloc[:, :0],
+        fred_df,
+        housing_df,
+    ]
+    for frame in frames:
+        digest.update(repr(list(frame.columns)).encode())
+        if not frame.empty:
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def load_depression_outcome_table(market_df, fred_df, housing_df, precomp=None, cache_path=None):
+    """
+    Returns the outcome table, reusing the on-disk copy when it was built from
+    the same inputs and parameters.
+    """
+    cache_path = Path(cache_path or DEPRESSION_CACHE_PATH)
+    key = _depression_inputs_key(market_df, fred_df, housing_df)
+    if cache_path.exists():
+        try:
+            cached = pd.read_pickle(cache_path)
+            if cached.get("key") == key:
+                print(f"Depression outcomes loaded from cache: {cache_path}")
+                return cached["table"]
+        except Exception as e:
+            print(f"Depression cache read error: {e}")
+
+    table = build_depression_outcome_table(market_df, fred_df, housing_df, precomp)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        pd.to_pickle({"key": key, "table": table}, cache_path)
+    except Exception as e:
+        print(f"Depression cache write error: {e}")
+    return table
+
+# --- COMBO DISCOVERY ---
+def recent_signal_bits(matrix, window_days):
+    """
+    Packs, per day, which signals fired within [day - window_days, day] into one
+    integer bitset (bit j = matrix column j). Window counts come from a prefix
+    sum over the date axis, so the cost is independent of the window length.
+    """
+    index = matrix.index
+    fired = matrix.to_numpy(dtype=np.int64)
+    prefix = np.vstack([np.zeros((1, fired.shape[1]), dtype=np.int64), fired.cumsum(axis=0)])
+    lo = np.searchsorted(index.values, (index - pd.Timedelta(days=window_days)).values, side="left")
+    counts = prefix[1:] - prefix[lo]
+    weights = np.left_shift(np.int64(1), np.arange(fired.shape[1], dtype=np.int64))
+    return (counts > 0).astype(np.int64) @ weights
+
+
+def cooldown_starts(dates, candidates, cooldown_days):
+    """
+    Positions of candidate days more than cooldown_days after the last kept one.
+    Jumps between kept days with a binary search, so the cost scales with the
+    number of occurrences rather than the number of candidate days.
+    """
+    positions = np.flatnonzero(candidates)
+    days = dates.values[positions].astype("datetime64[D]").astype(np.int64)
+    starts = []
+    i = 0
+    while i < len(positions):
+        starts.append(positions[i])
+        i = int(np.searchsorted(days, days[i] + cooldown_days, side="right"))
+    return np.asarray(starts, dtype=int)
+
+
+def _combo_outcomes(positions, depression_flag, depression_score, fwd_90):
+    if len(positions) == 0:
+        return {"depression_rate": np.nan, "crash_rate": np.nan, "avg_fwd_90": np.nan, "avg_depression_score": np.nan}
+    fwd = fwd_90[positions]
+    fwd = fwd[~np.isnan(fwd)]
+    return {
+        "depression_rate": depression_flag[positions].mean() * 100,
+        "crash_rate": (fwd < 0).mean() * 100 if len(fwd) else np.nan,
+        "avg_fwd_90": fwd.mean() if len(fwd) else np.nan,
+        "avg_depression_score": depression_score[positions].mean(),
+    }
+
+
+def build_combo_analysis(matrix, market_df, outcome_table, signals=None, windows=None,
+                         max_size=None, cooldown_days=None):
+    """
+    Scans every 2..max_size combination of the tracked signals for each window.
+    A combo occurs on a day when one of its signals fires and all of them fired
+    within the trailing window; occurrences closer than cooldown_days to the
+    previous counted one are dropped. Returns one row per (combo, window).
+    """
+    signals = [s for s in (signals or COMBO_DISCOVERY_SIGNALS) if s in matrix.columns]
+    windows = windows or COMBO_WINDOWS
+    max_size = max_size or COMBO_MAX_SIZE
+    cooldown_days = COMBO_COOLDOWN_DAYS if cooldown_days is None else cooldown_days
+
+    sub = matrix[signals].astype(bool)
+    dates = sub.index
+    outcomes = outcome_table.reindex(dates)
+    depression_flag = outcomes["DepressionFlag"].fillna(0).to_numpy(dtype=float)
+    depression_score = outcomes["DepressionScore"].fillna(0).to_numpy(dtype=float)
+    spx = market_df["^SPX"].reindex(dates) if "^SPX" in market_df.columns else pd.Series(np.nan, index=dates)
+    fwd_90 = ((spx.shift(-90) - spx) / spx * 100).to_numpy(dtype=float)
+
+    weights = np.left_shift(np.int64(1), np.arange(len(signals), dtype=np.int64))
+    today_bits = sub.to_numpy(dtype=np.int64) @ weights
+
+    individual = {}
+    for name in signals:
+        positions = cooldown_starts(dates, sub[name].to_numpy(), cooldown_days)
+        individual[name] = _combo_outcomes(positions, depression_flag, depression_score, fwd_90)["depression_rate"]
+
+    rows = []
+    for window_days in windows:
+        recent_bits = recent_signal_bits(sub, window_days)
+        for size in range(2, max_size + 1):
+            for combo in itertools.combinations(range(len(signals)), size):
+                mask = int(sum(int(weights[j]) for j in combo))
+                candidates = ((recent_bits & mask) == mask) & ((today_bits & mask) != 0)
+                positions = cooldown_starts(dates, candidates, cooldown_days)
+                stats = _combo_outcomes(positions, depression_flag, depression_score, fwd_90)
+                best_individual = max(
+                    (individual[signals[j]] for j in combo if not np.isnan(individual[signals[j]])),
+                    default=np.nan,
+                )
+                improvement = stats["depression_rate"] - best_individual
+                strong = len(positions) >= COMBO_MIN_OCCURRENCES and improvement >= COMBO_STRONG_IMPROVEMENT_PP
+                rows.append({
+                    "combo": " + ".join(signals[j] for j in combo),
+                    "size": size,
+                    "occurrences": len(positions),
+                    "window_days": window_days,
+                    "cooldown_days": cooldown_days,
+                    **stats,
+                    "best_individual_depression_rate": best_individual,
+                    "improvement_pp": improvement,
+                    "classification": "STRONG" if strong else "TRIVIAL",
+                })
+
+    table = pd.DataFrame(rows, columns=COMBO_COLUMNS)
+    return table.sort_values(
+        ["depression_rate", "occurrences"], ascending=[False, False], na_position="last", kind="stable"
+    ).reset_index(drop=True)
+
+
+def generate_combo_analysis(matrix, market_df, outcome_table, output_dir, suffix=""):
+    table = build_combo_analysis(matrix, market_df, outcome_table)
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / f"combo_analysis{suffix}.csv"
+    table.to_csv(path, index=False)
+    strong = table[table["classification"] == "STRONG"]
+    print(f"Combo analysis: {len(table)} combos scanned, {len(strong)} STRONG -> {path}")
+    return table
+
+
+# --- EVENT STUDY ---
+def forward_return_matrix(market_df, assets=None, horizons=None):
+    """
+    Percent change from each date's close to the close `h` rows later, for
+    every asset and horizon, built from shifted price arrays. Returns
+    (values, assets, horizons) where values is a (dates, assets, horizons)
+    float array, NaN where a price is missing or the horizon runs past the data.
+    """
+    assets = [a for a in (assets or EVENT_STUDY_ASSETS) if a in market_df.columns]
+    horizons = list(horizons or EVENT_STUDY_HORIZONS)
+    prices = market_df[assets].to_numpy(dtype=float)
+    n = len(prices)
+    values = np.full((n, len(assets), len(horizons)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k, h in enumerate(horizons):
+            if 0 < h < n:
+                values[:-h, :, k] = ((prices[h:] - prices[:-h]) / prices[:-h]) * 100
+    return values, assets, horizons
+
+
+EVENT_STUDY_COLUMNS = ["Event", "Asset", "horizon_days", "clusters", "observations", "mean_return",
+                       "median_return", "loss_rate"]
+
+
+def build_event_study(matrix, forward, dedup_days=None):
+    """
+    Outcome of every signal's cluster starts against every asset and horizon
+    of a forward_return_matrix (aligned with matrix.index): one row per
+    (signal, asset, horizon) with the mean/median return and the share of
+    losses over the starts whose horizon is complete.
+    """
+    values, assets, horizons = forward
+    dedup_days = DEDUP_DAYS if dedup_days is None else dedup_days
+    rows = []
+    for event in matrix.columns:
+        starts = cluster_start_mask(matrix.index, matrix[event].to_numpy(dtype=bool), dedup_days)
+        sample = values[starts]
+        valid = ~np.isnan(sample)
+        observations = valid.sum(axis=0)
+        filled = np.where(valid, sample, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = filled.sum(axis=0) / observations
+            losses = (filled < 0).sum(axis=0) / observations * 100
+        median = np.full(observations.shape, np.nan)
+        if len(sample):
+            for a, k in zip(*np.nonzero(observations)):
+                median[a, k] = np.median(sample[valid[:, a, k], a, k])
+        for a, asset in enumerate(assets):
+            for k, h in enumerate(horizons):
+                rows.append({
+                    "Event": event,
+                    "Asset": asset,
+                    "horizon_days": h,
+                    "clusters": int(starts.sum()),
+                    "observations": int(observations[a, k]),
+                    "mean_return": mean[a, k],
+                    "median_return": median[a, k],
+                    "loss_rate": losses[a, k],
+                })
+    return pd.DataFrame(rows, columns=EVENT_STUDY_COLUMNS)
+
+
+def generate_event_study(matrix, market_df, output_dir, suffix=""):
+    forward = forward_return_matrix(market_df.reindex(matrix.index))
+    table = build_event_study(matrix, forward)
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / f"event_study{suffix}.csv"
+    table.to_csv(path, index=False)
+    print(f"Event study: {matrix.shape[1]} signals x {len(forward[1])} assets x {len(forward[2])} horizons -> {path}")
+    return table
+
+
+# --- PARAMETER SWEEP ---
+# Inputs of the running sweep. Set in the parent before the pool starts so
+# forked workers read the data and warmed indicator caches copy-on-write.
+_SWEEP_CONTEXT = {}
+SWEEP_INDICATOR_PARAMS = ("z_num_std", "dxy_percentile")
+
+
+def expand_parameter_grid(grid):
+    """Cartesian product of {param: [values]} as full SIGNAL_PARAMS dicts."""
+    unknown = sorted(set(grid) - set(SIGNAL_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(unknown)}")
+    names = sorted(grid)
+    values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in names]
+    return [{**SIGNAL_PARAMS, **dict(zip(names, combo))} for combo in itertools.product(*values)]
+
+
+def cluster_start_mask(dates, fired, dedup_days):
+    """Vector form of run_backtest's IsClusterStart: gap since the previous firing > dedup_days."""
+    positions = np.flatnonzero(fired)
+    starts = np.zeros(len(fired), dtype=bool)
+    if len(positions) == 0:
+        return starts
+    days = dates.values[positions].astype("datetime64[D]").astype(np.int64)
+    gaps = np.diff(days, prepend=days[0] - dedup_days - 1)
+    starts[positions[gaps > dedup_days]] = True
+    return starts
+
+
+def result_asset(event):
+    """Asset a signal's outcome is measured on: WPM and BTC buys on their own asset, the rest on SPX."""
+    return "WPM" if "WPM" in event else ("BTC-USD" if "BTC" in event else "^SPX")
+
+
+def evaluate_signal_params(params):
+    """
+    Builds the signal matrix for one parameter set from _SWEEP_CONTEXT and
+    summarises every signal: firings, cluster starts and, over cluster starts,
+    the 90d loss rate of the signal's result_asset (hit_rate), DepressionFlag
+    and NBER rates.
+    """
+    ctx = _SWEEP_CONTEXT
+    matrix, _ = build_signal_matrix(
+        ctx["market_df"], ctx["fred_df"], ctx["housing_df"], params=params, indicator_sets=ctx["indicator_sets"]
+    )
+    dates = matrix.index
+    rows = []
+    for event in matrix.columns:
+        fired = matrix[event].to_numpy()
+        starts = cluster_start_mask(dates, fired, params["dedup_days"])
+        fwd = ctx["fwd_90"].get(result_asset(event), ctx["no_asset"])[starts]
+        fwd = fwd[~np.isnan(fwd)]
+        count = int(starts.sum())
+        rows.append({
+            **params,
+            "Event": event,
+            "signals": int(fired.sum()),
+            "clusters": count,
+            "hit_rate": (fwd < 0).mean() * 100 if len(fwd) else np.nan,
+            "avg_fwd_90": fwd.mean() if len(fwd) else np.nan,
+            "depression_rate": ctx["depression_flag"][starts].mean() * 100 if count else np.nan,
+            "nber_rate": ctx["nber"][starts].mean() * 100 if count else np.nan,
+        })
+    return rows
+
+
+def run_parameter_sweep(market_df, fred_df, housing_df, grid, workers=None, outcome_table=None):
+    """
+    Evaluates every parameter set of `grid` and returns one tidy frame with a
+    row per (parameter set, signal). Indicator series are computed once in the
+    parent; with workers > 1 the sets are fanned out over a forked process pool.
+    """
+    param_sets = expand_parameter_grid(grid)
+    if outcome_table is None:
+        outcome_table = load_depression_outcome_table(market_df, fred_df, housing_df)
+    outcomes = outcome_table.reindex(market_df.index)
+    forward, assets, _ = forward_return_matrix(market_df, RESULT_ASSETS, [90])
+    indicator_sets = signal_indicator_sets(market_df, fred_df)
+
+    _SWEEP_CONTEXT.clear()
+    _SWEEP_CONTEXT.update({
+        "market_df": market_df,
+        "fred_df": fred_df,
+        "housing_df": housing_df,
+        "indicator_sets": indicator_sets,
+        "fwd_90": {asset: forward[:, a, 0] for a, asset in enumerate(assets)},
+        "no_asset": np.full(len(market_df), np.nan),
+        "depression_flag": outcomes["DepressionFlag"].fillna(0).to_numpy(dtype=float),
+        "nber": outcomes["Depress_NBER_Recession"].fillna(0).to_numpy(dtype=float),
+    })
+
+    # Warm every indicator variant the grid needs before any fork
+    warmed = set()
+    for params in param_sets:
+        key = tuple(params[name] for name in SWEEP_INDICATOR_PARAMS)
+        if key not in warmed:
+            build_signal_matrix(market_df, fred_df, housing_df, params=params, indicator_sets=indicator_sets)
+            warmed.add(key)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(param_sets)))
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    print(f"Parameter sweep: {len(param_sets)} set(s) on {workers if can_fork else 1} worker(s)")
+    try:
+        if workers > 1 and can_fork:
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                chunks = pool.map(evaluate_signal_params, param_sets)
+        else:
+            chunks = [evaluate_signal_params(params) for params in param_sets]
+    finally:
+        _SWEEP_CONTEXT.clear()
+
+    columns = list(SIGNAL_PARAMS) + ["Event", "signals", "clusters", "hit_rate", "avg_fwd_90", "depression_rate", "nber_rate"]
+    return pd.DataFrame([row for chunk in chunks for row in chunk], columns=columns)
+
+
+# --- RESAMPLING ---
+# Rates reported by the summaries, as (result column, hit rule). NaN or missing
+# columns count as misses, like the point estimates.
+RESAMPLED_RATES = {
+    "depression_rate": ("DepressionFlag", lambda s: s == 1),
+    "nber_rate": ("Depress_NBER_Recession", lambda s: s == 1),
+    "crash90": ("Fwd_90d", lambda s: s < 0),
+    "win180": ("Fwd_180d", lambda s: s > 0),
+}
+RESAMPLED_COLUMNS = [f"{rate}_{stat}" for rate in RESAMPLED_RATES for stat in ("ci_low", "ci_high", "p")]
+_RESAMPLE_CONTEXT = {}
+
+
+def rate_hits(results):
+    """(rows, rates) 0/1 matrix of the RESAMPLED_RATES hits of every result row."""
+    hits = np.zeros((len(results), len(RESAMPLED_RATES)))
+    for j, (column, rule) in enumerate(RESAMPLED_RATES.values()):
+        if column in results.columns:
+            hits[:, j] = rule(pd.to_numeric(results[column], errors="coerce")).to_numpy(dtype=float)
+    return hits
+
+
+def cluster_blocks(results):
+    """
+    Block id per result row: rows of one event belong to the same block until
+    the next IsClusterStart, so resampling keeps each 30-day cluster whole.
+    """
+    if "IsClusterStart" not in results.columns:
+        return np.arange(len(results))
+    cluster = results["IsClusterStart"].fillna(0).astype(int).groupby(results["Event"]).cumsum()
+    return results.groupby([results["Event"], cluster], sort=False).ngroup().to_numpy()
+
+
+def block_totals(hits, blocks):
+    """Per-block hit sums (blocks, rates) and row counts (blocks,)."""
+    _, inverse = np.unique(blocks, return_inverse=True)
+    counts = np.bincount(inverse).astype(float)
+    sums = np.stack([np.bincount(inverse, weights=hits[:, j], minlength=len(counts))
+                     for j in range(hits.shape[1])], axis=1)
+    return sums, counts
+
+
+def block_bootstrap_ci(sums, counts, replicates, rng, confidence=BOOTSTRAP_CONFIDENCE):
+    """
+    Percentile interval (in %) of every rate, drawing whole blocks with
+    replacement. Each replicate is a multinomial block-weight vector, so all
+    replicates reduce to one matrix product over the block totals.
+    """
+    n = len(counts)
+    weights = rng.multinomial(n, np.full(n, 1.0 / n), size=replicates)
+    rates = (weights @ sums) / (weights @ counts)[:, None] * 100
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(rates, [tail, 100 - tail], axis=0)
+
+
+def permutation_null(sums, counts, replicates, rng):
+    """
+    Rates (in %) of random block subsets of every size: entry [r, k - 1] is a
+    uniformly drawn k-block subset of replicate r. Every group of the pool
+    reads its null distribution from the same (replicates, blocks, rates) array.
+    """
+    order = np.argsort(rng.random((replicates, len(counts))), axis=1)
+    return np.cumsum(sums[order], axis=1) / np.cumsum(counts[order], axis=1)[..., None] * 100
+
+
+def _resample_pool(task):
+    """
+    Bootstrap CI and one-sided permutation p-value (group rate >= random
+    subsets of the pool's blocks) for every group of one pool.
+    """
+    pool_key, pool_rows, groups = task
+    ctx = _RESAMPLE_CONTEXT
+    rng = np.random.default_rng([ctx["seed"], zlib.crc32(repr(pool_key).encode())])
+    blocks = ctx["blocks"]
+    pool_sums, pool_counts = block_totals(ctx["hits"][pool_rows], blocks[pool_rows])
+    null = permutation_null(pool_sums, pool_counts, ctx["replicates"], rng)
+
+    out = {}
+    for key, rows in groups:
+        sums, counts = block_totals(ctx["hits"][rows], blocks[rows])
+        observed = sums.sum(axis=0) / counts.sum() * 100
+        low, high = block_bootstrap_ci(sums, counts, ctx["replicates"], rng)
+        k = len(counts)
+        p_values = ((null[:, k - 1] >= observed - 1e-9).sum(axis=0) + 1) / (ctx["replicates"] + 1)
+        stats = {}
+        for j, rate in enumerate(RESAMPLED_RATES):
+            stats[f"{rate}_ci_low"] = low[j]
+            stats[f"{rate}_ci_high"] = high[j]
+            stats[f"{rate}_p"] = p_values[j]
+        out[key] = stats
+    return out
+
+
+def resample_rates(results, pools, replicates=None, workers=None, seed=BOOTSTRAP_SEED):
+    """
+    Block-bootstrap intervals and permutation p-values for groups of result
+    rows. `pools` is a list of (pool_key, pool_rows, [(group_key, rows), ...])
+    with positional row arrays; each group is tested against random subsets of
+    its pool's clusters. Pools are fanned out over a forked process pool and
+    results are seeded per pool, so they do not depend on the worker count.
+    Returns {group_key: {column: value}} with the RESAMPLED_COLUMNS.
+    """
+    replicates = replicates or BOOTSTRAP_REPLICATES
+    tasks = [(key, np.asarray(rows), [(g, np.asarray(r)) for g, r in groups if len(r)])
+             for key, rows, groups in pools if len(rows)]
+    if not tasks or replicates <= 0:
+        return {}
+
+    _RESAMPLE_CONTEXT.clear()
+    _RESAMPLE_CONTEXT.update({
+        "hits": rate_hits(results),
+        "blocks": cluster_blocks(results),
+        "replicates": replicates,
+        "seed": seed,
+    })
+    workers = max(1, min(workers or BOOTSTRAP_WORKERS or os.cpu_count() or 1, len(tasks)))
+    try:
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                chunks = pool.map(_resample_pool, tasks)
+        else:
+            chunks = [_resample_pool(task) for task in tasks]
+    finally:
+        _RESAMPLE_CONTEXT.clear()
+    return {key: stats for chunk in chunks for key, stats in chunk.items()}
+
+
 # --- REPORTING ---
 class DetailedPDF(FPDF):
     def __init__(self, labels):
@@ -767,10 +1700,11 @@ def generate_maximalist_report(results, market_df, pdf_path, lang="en"):
     print(f"PDF Generated: {pdf_path}")
 
 
-def generate_walkforward_summary(results, output_dir, suffix, docs_dir, lang="en"):
+def generate_walkforward_summary(results, output_dir, suffix, docs_dir, langs=("en",)):
     """
     Builds a walk-forward summary table by year/event using only signals
-    with a full 12-month forward window available.
+    with a full 12-month forward window available. The resampled intervals
+    are computed once and rendered into one markdown file per language.
     """
     df = results.copy()
     if "Date" not in df.columns:
@@ -778,11 +1712,23 @@ def generate_walkforward_summary(results, output_dir, suffix, docs_dir, lang="en
 
     df["Date"] = pd.to_datetime(df["Date"])
     cutoff = df["Date"].max() - timedelta(days=DEPRESSION_FORWARD_DAYS)
-    df = df[df["Date"] <= cutoff]
+    df = df[df["Date"] <= cutoff].reset_index(drop=True)
     if df.empty:
         print("Walk-forward summary skipped: insufficient forward window.")
         return
 
+    # Year/event cells are tested against the clusters of their year, the
+    # all-years key-signal lines against every cluster.
+    key_events = ["DEPRESSION_ALERT", "DEPRESSION_WATCH", "COMBO_CRISIS"]
+    years = df["Date"].dt.year
+    cells = df.groupby([years, "Event"]).indices
+    pools = [
+        (year, np.flatnonzero(years.to_numpy() == year), [(key, rows) for key, rows in cells.items() if key[0] == year])
+        for year in sorted(years.unique())
+    ]
+    pools.append(("all", np.arange(len(df)), [(ev, np.flatnonzero(df["Event"].to_numpy() == ev)) for ev in key_events]))
+    resampled = resample_rates(df, pools)
+
     grouped = (
         df.groupby([df["Date"].dt.year, "Event"])
           .agg(
@@ -799,58 +1745,70 @@ def generate_walkforward_summary(results, output_dir, suffix, docs_dir, lang="en
     for col in ["depression_rate", "nber_rate", "crash90", "win180"]:
         if col in grouped.columns:
             grouped[col] = grouped[col] * 100
+    for col in RESAMPLED_COLUMNS:
+        grouped[col] = [resampled.get((year, ev), {}).get(col, np.nan) for year, ev in zip(grouped["Year"], grouped["Event"])]
 
     output_dir.mkdir(exist_ok=True)
     grouped.to_csv(output_dir / f"walkforward_summary{suffix}.csv", index=False)
 
-    # Minimal markdown summary for key depression signals
-    key_events = ["DEPRESSION_ALERT", "DEPRESSION_WATCH", "COMBO_CRISIS"]
-    if lang == "es":
-        lines = [
-            "# Resumen Walk-Forward",
-            f"**Fecha de generación:** {datetime.now().strftime('%Y-%m-%d')}",
-            "",
-            "El resumen usa solo señales con una ventana completa de 12 meses hacia adelante.",
-            "Las tasas se calculan por año calendario y luego se agregan para señales clave.",
-            ""
-        ]
-    else:
-        lines = [
-            "# Walk-Forward Summary",
-            f"**Date generated:** {datetime.now().strftime('%Y-%m-%d')}",
-            "",
-            "Summary uses only signals with a full 12-month forward window available.",
-            "Rates are computed per calendar year and then aggregated below for key signals.",
-            ""
-        ]
-
-    for ev in key_events:
-        sub = df[df["Event"] == ev]
-        if sub.empty:
-            continue
-        dep_rate = sub["DepressionFlag"].mean() * 100 if "DepressionFlag" in sub.columns else 0
-        nber_rate = sub["Depress_NBER_Recession"].mean() * 100 if "Depress_NBER_Recession" in sub.columns else 0
-        crash90 = (sub["Fwd_90d"] < 0).mean() * 100 if "Fwd_90d" in sub.columns else 0
-        win180 = (sub["Fwd_180d"] > 0).mean() * 100 if "Fwd_180d" in sub.columns else 0
+    for lang in langs:
+        # Minimal markdown summary for key depression signals
         if lang == "es":
-            lines.append(
-                f"- **{ev}:** conteo {len(sub)}, depresión {dep_rate:.1f}%, NBER {nber_rate:.1f}%, crash 90d {crash90:.1f}%, ganancia 180d {win180:.1f}%."
-            )
+            lines = [
+                "# Resumen Walk-Forward",
+                f"**Fecha de generación:** {datetime.now().strftime('%Y-%m-%d')}",
+                "",
+                "El resumen usa solo señales con una ventana completa de 12 meses hacia adelante.",
+                "Las tasas se calculan por año calendario y luego se agregan para señales clave.",
+                f"Corchetes: intervalo bootstrap por bloques de clúster al {BOOTSTRAP_CONFIDENCE:.0%} de la tasa de depresión; "
+                "p: test de permutación contra sorteos del mismo número de clústeres entre todas las señales.",
+                ""
+            ]
         else:
-            lines.append(
-                f"- **{ev}:** count {len(sub)}, depression {dep_rate:.1f}%, NBER {nber_rate:.1f}%, 90d crash {crash90:.1f}%, 180d win {win180:.1f}%."
+            lines = [
+                "# Walk-Forward Summary",
+                f"**Date generated:** {datetime.now().strftime('%Y-%m-%d')}",
+                "",
+                "Summary uses only signals with a full 12-month forward window available.",
+                "Rates are computed per calendar year and then aggregated below for key signals.",
+                f"Brackets: {BOOTSTRAP_CONFIDENCE:.0%} cluster block-bootstrap interval of the depression rate; "
+                "p: permutation test against random draws of the same number of clusters from all signals.",
+                ""
+            ]
+
+        for ev in key_events:
+            sub = df[df["Event"] == ev]
+            if sub.empty:
+                continue
+            dep_rate = sub["DepressionFlag"].mean() * 100 if "DepressionFlag" in sub.columns else 0
+            nber_rate = sub["Depress_NBER_Recession"].mean() * 100 if "Depress_NBER_Recession" in sub.columns else 0
+            crash90 = (sub["Fwd_90d"] < 0).mean() * 100 if "Fwd_90d" in sub.columns else 0
+            win180 = (sub["Fwd_180d"] > 0).mean() * 100 if "Fwd_180d" in sub.columns else 0
+            stats = resampled.get(ev)
+            dep_ci = (
+                f" [{stats['depression_rate_ci_low']:.1f}–{stats['depression_rate_ci_high']:.1f}, p={stats['depression_rate_p']:.3f}]"
+                if stats else ""
             )
-
-    docs_dir.mkdir(exist_ok=True)
-    lang_suffix = "" if lang == "en" else "_es"
-    md_path = docs_dir / f"WALKFORWARD_SUMMARY{suffix}{lang_suffix}.md"
-    md_path.write_text("\n".join(lines) + "\n")
-
-
-def generate_regime_split_summary(results, output_dir, suffix, docs_dir, lang="en"):
+            if lang == "es":
+                lines.append(
+                    f"- **{ev}:** conteo {len(sub)}, depresión {dep_rate:.1f}%{dep_ci}, NBER {nber_rate:.1f}%, crash 90d {crash90:.1f}%, ganancia 180d {win180:.1f}%."
+                )
+            else:
+                lines.append(
+                    f"- **{ev}:** count {len(sub)}, depression {dep_rate:.1f}%{dep_ci}, NBER {nber_rate:.1f}%, 90d crash {crash90:.1f}%, 180d win {win180:.1f}%."
+                )
+
+        docs_dir.mkdir(exist_ok=True)
+        lang_suffix = "" if lang == "en" else "_es"
+        md_path = docs_dir / f"WALKFORWARD_SUMMARY{suffix}{lang_suffix}.md"
+        md_path.write_text("\n".join(lines) + "\n")
+
+
+def generate_regime_split_summary(results, output_dir, suffix, docs_dir, langs=("en",)):
     """
     Builds a rolling 5-year window summary by event.
-    Intended to show regime sensitivity of signals.
+    Intended to show regime sensitivity of signals. One markdown file is
+    written per language from the same resampled table.
     """
     df = results.copy()
     if "Date" not in df.columns:
@@ -858,24 +1816,33 @@ def generate_regime_split_summary(results, output_dir, suffix, docs_dir, lang="e
 
     df["Date"] = pd.to_datetime(df["Date"])
     cutoff = df["Date"].max() - timedelta(days=DEPRESSION_FORWARD_DAYS)
-    df = df[df["Date"] <= cutoff]
+    df = df[df["Date"] <= cutoff].reset_index(drop=True)
     if df.empty:
         print("Regime split summary skipped: insufficient forward window.")
         return
 
     min_year = df["Date"].dt.year.min()
     max_year = df["Date"].dt.year.max()
+    events = df["Event"].to_numpy()
 
     rows = []
+    pools = []
     for start_year in range(min_year, max_year - 4 + 1):
         start_date = datetime(start_year, 1, 1)
         end_date = datetime(start_year + 4, 12, 31)
-        window = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
+        in_window = ((df["Date"] >= start_date) & (df["Date"] <= end_date)).to_numpy()
+        window = df[in_window]
         if window.empty:
             continue
+        pools.append((
+            start_year,
+            np.flatnonzero(in_window),
+            [((start_year, event), np.flatnonzero(in_window & (events == event))) for event in window["Event"].unique()],
+        ))
         for event in window["Event"].unique():
             sub = window[window["Event"] == event]
             rows.append({
+                "StartYear": start_year,
                 "WindowStart": start_date.strftime("%Y-%m-%d"),
                 "WindowEnd": end_date.strftime("%Y-%m-%d"),
                 "Event": event,
@@ -889,82 +1856,209 @@ def generate_regime_split_summary(results, output_dir, suffix, docs_dir, lang="e
     if not rows:
         return
 
+    resampled = resample_rates(df, pools)
+    for row in rows:
+        stats = resampled.get((row.pop("StartYear"), row["Event"]), {})
+        row.update({col: stats.get(col, np.nan) for col in RESAMPLED_COLUMNS})
+
     summary = pd.DataFrame(rows)
     output_dir.mkdir(exist_ok=True)
     summary.to_csv(output_dir / f"regime_split_summary{suffix}.csv", index=False)
 
     key_events = ["DEPRESSION_ALERT", "DEPRESSION_WATCH", "COMBO_CRISIS"]
-    if lang == "es":
-        lines = [
-            "# Resumen por Régimen",
-            f"**Fecha de generación:** {datetime.now().strftime('%Y-%m-%d')}",
-            "",
-            "Ventanas móviles de cinco años (año inicial a inicial+4).",
-            "Solo se incluyen señales con ventana completa de 12 meses.",
-            ""
-        ]
-    else:
-        lines = [
-            "# Regime Split Summary",
-            f"**Date generated:** {datetime.now().strftime('%Y-%m-%d')}",
-            "",
-            "Rolling five-year windows (start year to start+4).",
-            "Only signals with a full 12-month forward window are included.",
-            ""
-        ]
-
-    for event in key_events:
-        sub = summary[summary["Event"] == event]
-        if sub.empty:
-            continue
-        lines.append(f"## {event}")
-        top = sub.sort_values(["DepressionRate", "Count"], ascending=[False, False]).head(5)
+    for lang in langs:
         if lang == "es":
-            lines.append("| Ventana | Conteo | Depresión | NBER | Crash90 | Ganancia180 |")
-            lines.append("| --- | --- | --- | --- | --- | --- |")
+            lines = [
+                "# Resumen por Régimen",
+                f"**Fecha de generación:** {datetime.now().strftime('%Y-%m-%d')}",
+                "",
+                "Ventanas móviles de cinco años (año inicial a inicial+4).",
+                "Solo se incluyen señales con ventana completa de 12 meses.",
+                f"IC: intervalo bootstrap por bloques de clúster al {BOOTSTRAP_CONFIDENCE:.0%} de la tasa de depresión; "
+                "p: test de permutación contra los clústeres de todas las señales de la ventana.",
+                ""
+            ]
         else:
-            lines.append("| Window | Count | Depression | NBER | Crash90 | Win180 |")
-            lines.append("| --- | --- | --- | --- | --- | --- |")
-        for _, row in top.iterrows():
-            window_label = f"{row['WindowStart']} → {row['WindowEnd']}"
-            lines.append(
-                f"| {window_label} | {int(row['Count'])} | {row['DepressionRate']:.1f}% | {row['NBERRate']:.1f}% | {row['Crash90']:.1f}% | {row['Win180']:.1f}% |"
-            )
-        lines.append("")
+            lines = [
+                "# Regime Split Summary",
+                f"**Date generated:** {datetime.now().strftime('%Y-%m-%d')}",
+                "",
+                "Rolling five-year windows (start year to start+4).",
+                "Only signals with a full 12-month forward window are included.",
+                f"CI: {BOOTSTRAP_CONFIDENCE:.0%} cluster block-bootstrap interval of the depression rate; "
+                "p: permutation test against the clusters of all signals in the window.",
+                ""
+            ]
+
+        for event in key_events:
+            sub = summary[summary["Event"] == event]
+            if sub.empty:
+                continue
+            lines.append(f"## {event}")
+            top = sub.sort_values(["DepressionRate", "Count"], ascending=[False, False]).head(5)
+            if lang == "es":
+                lines.append("| Ventana | Conteo | Depresión | IC | p | NBER | Crash90 | Ganancia180 |")
+                lines.append("| --- | --- | --- | --- | --- | --- | --- | --- |")
+            else:
+                lines.append("| Window | Count | Depression | CI | p | NBER | Crash90 | Win180 |")
+                lines.append("| --- | --- | --- | --- | --- | --- | --- | --- |")
+            for _, row in top.iterrows():
+                window_label = f"{row['WindowStart']} → {row['WindowEnd']}"
+                ci_label = (
+                    f"{row['depression_rate_ci_low']:.1f}–{row['depression_rate_ci_high']:.1f}%"
+                    if pd.notna(row["depression_rate_ci_low"]) else "-"
+                )
+                p_label = f"{row['depression_rate_p']:.3f}" if pd.notna(row["depression_rate_p"]) else "-"
+                lines.append(
+                    f"| {window_label} | {int(row['Count'])} | {row['DepressionRate']:.1f}% | {ci_label} | {p_label} | {row['NBERRate']:.1f}% | {row['Crash90']:.1f}% | {row['Win180']:.1f}% |"
+                )
+            lines.append("")
+
+        docs_dir.mkdir(exist_ok=True)
+        lang_suffix = "" if lang == "en" else "_es"
+        md_path = docs_dir / f"REGIME_SPLIT_SUMMARY{suffix}{lang_suffix}.md"
+        md_path.write_text("\n".join(lines) + "\n")
+
+
+# --- CHECKPOINT ---
+def _checkpoint_key(market_df, fred_df, housing_df, last_date):
+    """
+    Engine parameters plus a fingerprint of the market, FRED and housing rows
+    up to last_date, so late-published or revised macro prints (HOUST and
+    CSUSHPINSA lag by months, ICSA/WALCL get revised) also void the checkpoint.
+    """
+    digest = hashlib.sha1()
+    frames = [frame if frame is not None else pd.DataFrame() for frame in (market_df, fred_df, housing_df)]
+    params = (sorted(SIGNAL_PARAMS.items()), WARMUP_TRADING_DAYS, FORWARD_WINDOWS, DEDUP_DAYS,
+              TEMPORAL_WINDOW_DAYS, BACKTEST_ENGINE, [list(frame.columns) for frame in frames])
+    digest.update(repr(params).encode())
+    for frame in frames:
+        prefix = frame.loc[:last_date]
+        digest.update(str(len(prefix)).encode())
+        if not prefix.empty:
+            digest.update(pd.util.hash_pandas_object(prefix, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def load_backtest_checkpoint(path, market_df, fred_df, housing_df):
+    """
+    Returns the saved run state when it still matches the market, FRED and
+    housing data up to its last processed date, otherwise None (the backtest
+    then starts over).
+    """
+    path = Path(path)
+    if not BACKTEST_INCREMENTAL or not path.exists():
+        return None
+    try:
+        checkpoint = pd.read_pickle(path)
+    except Exception as e:
+        print(f"Backtest checkpoint read error: {e}")
+        return None
+    last_date = checkpoint.get("last_date")
+    if last_date is None or last_date not in market_df.index:
+        print("Backtest checkpoint does not match the current data; running full history.")
+        return None
+    if checkpoint.get("key") != _checkpoint_key(market_df, fred_df, housing_df, last_date):
+        print("Backtest checkpoint inputs changed; running full history.")
+        return None
+    return checkpoint
 
-    docs_dir.mkdir(exist_ok=True)
-    lang_suffix = "" if lang == "en" else "_es"
-    md_path = docs_dir / f"REGIME_SPLIT_SUMMARY{suffix}{lang_suffix}.md"
-    md_path.write_text("\n".join(lines) + "\n")
 
+def save_backtest_checkpoint(path, market_df, fred_df, housing_df, last_date, results, last_seen, history_log):
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        pd.to_pickle(
+            {
+                "key": _checkpoint_key(market_df, fred_df, housing_df, last_date),
+                "last_date": last_date,
+                "results": results,
+                "last_seen": last_seen,
+                "history_log": history_log,
+            },
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Backtest checkpoint write error: {e}")
 
-def run_backtest():
-    market_df, fred_df, housing_df = fetch_historical_data()
-    if market_df is None or market_df.empty:
-        print("No market data available for backtest.")
-        return
 
-    print(f"Running Scientific Backtest on {len(market_df)} days...")
-    results = []
-    history_log = []
-    last_seen = {}
-    precomp = prepare_depression_inputs(market_df, fred_df, housing_df)
+def _forward_returns(forward, asset, idx):
+    """Fwd_{h}d columns of one result row; None while the horizon runs past the data."""
+    values, assets, horizons = forward
+    row = values[idx, assets.index(asset)]
+    return {f"Fwd_{h}d": (row[k] if idx + h < len(values) else None) for k, h in enumerate(horizons)}
 
-    for idx in range(505, len(market_df)):
-        triggers, history_log, details = analyse_date(market_df, fred_df, housing_df, idx, history_log)
-        
-        if not triggers: continue
 
-        depression_outcomes = compute_depression_outcomes(market_df, fred_df, housing_df, idx, precomp)
-        
+def backfill_pending_outcomes(results, market_df, outcome_table, checkpoint_date):
+    """
+    Refreshes, in place, the rows whose forward horizon was still open at
+    checkpoint_date: Fwd_* returns that were missing and the Depress_* columns
+    of signals dated within DEPRESSION_FORWARD_DAYS of it.
+    """
+    since = (checkpoint_date - timedelta(days=DEPRESSION_FORWARD_DAYS)).strftime("%Y-%m-%d")
+    pending = [row for row in results if row["Date"] > since]
+    if not pending:
+        return 0
+    positions = market_df.index.get_indexer(pd.to_datetime([row["Date"] for row in pending]))
+    outcome_columns = list(outcome_table.columns)
+    outcome_values = outcome_table.to_numpy(dtype=object)
+    forward = forward_return_matrix(market_df, RESULT_ASSETS, FORWARD_WINDOWS)
+    for row, idx in zip(pending, positions):
+        if idx < 0:
+            continue
+        row.update(zip(outcome_columns, outcome_values[idx]))
+        if any(row.get(f"Fwd_{w}d") is None for w in FORWARD_WINDOWS):
+            row.update(_forward_returns(forward, row["Asset"], idx))
+    return len(pending)
+
+
+def replay_backtest(market_df, fred_df, housing_df, outcome_table, signals, checkpoint_path):
+    """
+    Produces the per-signal result rows, resuming from checkpoint_path when it
+    matches the data and saving the updated state back to it.
+    """
+    outcome_columns = list(outcome_table.columns)
+    outcome_values = outcome_table.to_numpy(dtype=object)
+    index = market_df.index
+
+    checkpoint = load_backtest_checkpoint(checkpoint_path, market_df, fred_df, housing_df)
+    if checkpoint:
+        results = checkpoint["results"]
+        last_seen = checkpoint["last_seen"]
+        history_log = checkpoint["history_log"]
+        start = int(index.searchsorted(checkpoint["last_date"], side="right"))
+        refreshed = backfill_pending_outcomes(results, market_df, outcome_table, checkpoint["last_date"])
+        print(f"Resuming backtest after {checkpoint['last_date'].date()}: "
+              f"{len(index) - start} new day(s), {refreshed} open-horizon row(s) refreshed.")
+    else:
+        results, last_seen, history_log, start = [], {}, [], 0
+        print(f"Running Scientific Backtest on {len(market_df)} days...")
+
+    # The last few bars can still be revised by the data refresh, so the
+    # checkpoint stops short of them and they are replayed next run.
+    settled = int(index.searchsorted(index[-1] - timedelta(days=data_cache.get_refresh_days()), side="right")) - 1
+    snapshot = None
+    prices = market_df.reindex(columns=RESULT_ASSETS).to_numpy(dtype=float)
+    forward = forward_return_matrix(market_df, RESULT_ASSETS, FORWARD_WINDOWS)
+
+    for idx, triggers, details in iter_signal_days(
+        market_df, fred_df, housing_df, signals=signals, start=start, history_log=history_log
+    ):
+        if snapshot is None and idx > settled:
+            snapshot = (len(results), dict(last_seen), list(history_log))
+        depression_outcomes = dict(zip(outcome_columns, outcome_values[idx]))
+        current_date = index[idx]
+        history_log.extend((current_date, t) for t in triggers if t in TRACKED_SIGNALS)
+
         for event in triggers:
-            asset = "WPM" if "WPM" in event else ("BTC-USD" if "BTC" in event else "^SPX")
+            asset = result_asset(event)
             if asset not in market_df.columns:
                 continue
-            
-            entry = market_df[asset].iloc[idx]
+
+            entry = prices[idx, RESULT_ASSETS.index(asset)]
             event_detail = details.get(event)
-            current_date = market_df.index[idx]
             last_date = last_seen.get(event)
             is_cluster_start = True if last_date is None else (current_date - last_date).days > DEDUP_DAYS
             last_seen[event] = current_date
@@ -977,39 +2071,135 @@ def run_backtest():
                 "IsClusterStart": int(is_cluster_start),
             }
             res.update(depression_outcomes)
-            
+
             if pd.isna(entry) or entry == 0: continue
-            
-            for w in FORWARD_WINDOWS:
-                fut_idx = idx + w
-                if fut_idx < len(market_df):
-                    ex = market_df[asset].iloc[fut_idx]
-                    res[f"Fwd_{w}d"] = ((ex - entry) / entry) * 100
-                else:
-                    res[f"Fwd_{w}d"] = None
+
+            res.update(_forward_returns(forward, asset, idx))
             results.append(res)
 
-    if results:
-        df = pd.DataFrame(results)
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        suffix = f"_{BACKTEST_TAG}" if BACKTEST_TAG else ""
-        docs_dir = Path("docs") if not BACKTEST_TAG else output_dir
-
-        df.to_csv(output_dir / f"maximalist_backtest{suffix}.csv", index=False)
-        df.to_csv(output_dir / f"scientific_backtest{suffix}.csv", index=False)
-
-        pdf_path = output_dir / f"comprehensive_backtest_report{suffix}.pdf"
-        generate_maximalist_report(df, market_df, pdf_path, lang="en")
-        pdf_path_es = output_dir / f"comprehensive_backtest_report{suffix}_es.pdf"
-        generate_maximalist_report(df, market_df, pdf_path_es, lang="es")
-
-        generate_walkforward_summary(df, output_dir, suffix, docs_dir, lang="en")
-        generate_walkforward_summary(df, output_dir, suffix, docs_dir, lang="es")
-        generate_regime_split_summary(df, output_dir, suffix, docs_dir, lang="en")
-        generate_regime_split_summary(df, output_dir, suffix, docs_dir, lang="es")
+    if snapshot is None:
+        snapshot = (len(results), dict(last_seen), list(history_log))
+    if settled >= 0:
+        cutoff = index[settled] - timedelta(days=TEMPORAL_WINDOW_DAYS * 2)
+        saved_results, saved_seen, saved_log = snapshot
+        save_backtest_checkpoint(
+            checkpoint_path,
+            market_df,
+            fred_df,
+            housing_df,
+            index[settled],
+            results[:saved_results],
+            saved_seen,
+            [entry for entry in saved_log if entry[0] > cutoff],
+        )
+    return results
+
+
+# --- ERAS ---
+def parse_backtest_eras(raw):
+    """
+    Parses BACKTEST_ERAS ("full,modern=2013-01-01,post2008=2008-09-15") into
+    [(name, start)] pairs. An era without a start date covers the whole
+    fetched history and writes the untagged outputs. Raises ValueError on a
+    malformed entry.
+    """
+    eras = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, start = item.partition("=")
+        name, start = name.strip(), start.strip()
+        if not name:
+            raise ValueError(f"era without a name: {item!r}")
+        if any(name == existing for existing, _ in eras):
+            raise ValueError(f"duplicate era: {name}")
+        eras.append((name, pd.Timestamp(datetime.strptime(start, "%Y-%m-%d")) if start else None))
+    if sum(start is None for _, start in eras) > 1:
+        raise ValueError("only one era may cover the full history")
+    return eras
+
+
+def era_fetch_start(eras):
+    """Earliest date any era needs; None when one of them spans the full history."""
+    starts = [start for _, start in eras]
+    if not starts or any(start is None for start in starts):
+        return None
+    return min(starts).strftime("%Y-%m-%d")
+
+
+def era_results(df, start):
+    """
+    Result rows dated on or after start. Indicators are already warm from the
+    history before start, so only the cluster flags are re-derived: each
+    event's first firing inside the era opens a cluster, as it would in a run
+    whose data began there.
+    """
+    if start is None:
+        return df.reset_index(drop=True)
+    sliced = df[pd.to_datetime(df["Date"]) >= start].reset_index(drop=True)
+    if not sliced.empty:
+        first = ~sliced["Event"].duplicated()
+        sliced.loc[first, "IsClusterStart"] = 1
+    return sliced
+
+
+def write_backtest_outputs(df, matrix, market_df, outcome_table, tag):
+    """Results store, PDF reports, walk-forward, regime-split, combo and event-study outputs of one era."""
+    suffix = f"_{tag}" if tag else ""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    docs_dir = Path("docs") if not tag else output_dir
+
+    stored = results_store.write_results(df, tag)
+    print(f"Backtest results stored in {stored} (CSV: python scripts/export_backtest_csv.py)")
+
+    pdf_path = output_dir / f"comprehensive_backtest_report{suffix}.pdf"
+    generate_maximalist_report(df, market_df, pdf_path, lang="en")
+    pdf_path_es = output_dir / f"comprehensive_backtest_report{suffix}_es.pdf"
+    generate_maximalist_report(df, market_df, pdf_path_es, lang="es")
+
+    generate_walkforward_summary(df, output_dir, suffix, docs_dir, langs=("en", "es"))
+    generate_regime_split_summary(df, output_dir, suffix, docs_dir, langs=("en", "es"))
+    generate_combo_analysis(matrix, market_df, outcome_table, output_dir, suffix)
+    generate_event_study(matrix, market_df, output_dir, suffix)
+
+
+def run_backtest():
+    try:
+        eras = parse_backtest_eras(BACKTEST_ERAS)
+    except ValueError as e:
+        print(f"Invalid BACKTEST_ERAS: {e}")
+        return
+    if eras:
+        market_df, fred_df, housing_df = fetch_historical_data(era_fetch_start(eras) or HISTORICAL_START_DATE)
+        checkpoint_suffix = "_eras"
     else:
+        market_df, fred_df, housing_df = fetch_historical_data()
+        eras = [(BACKTEST_TAG, None)]
+        checkpoint_suffix = f"_{BACKTEST_TAG}" if BACKTEST_TAG else ""
+    if market_df is None or market_df.empty:
+        print("No market data available for backtest.")
+        return
+
+    checkpoint_path = BACKTEST_CHECKPOINT_PATH or f"output/cache/backtest_checkpoint{checkpoint_suffix}.pkl"
+    outcome_table = load_depression_outcome_table(market_df, fred_df, housing_df)
+    signals = build_signal_matrix(market_df, fred_df, housing_df)
+    results = replay_backtest(market_df, fred_df, housing_df, outcome_table, signals, checkpoint_path)
+
+    if not results:
         print("No signals.")
+        return
+    df = pd.DataFrame(results)
+    for name, start in eras:
+        era_df = era_results(df, start)
+        if era_df.empty:
+            print(f"No signals in era {name}.")
+            continue
+        if start is not None:
+            print(f"Era {name}: {len(era_df)} signal rows since {start.date()}")
+        matrix = signals[0] if start is None else signals[0].loc[start:]
+        write_backtest_outputs(era_df, matrix, market_df, outcome_table, name if start is not None else BACKTEST_TAG)
 
 if __name__ == "__main__":
     run_backtest()
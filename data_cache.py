@@ -0,0 +1,318 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join("output", "cache", "data")
+MANIFEST_FILENAME = "manifest.json"
+# Recent rows are always re-requested: the last bar may be intraday and FRED revises.
+DEFAULT_REFRESH_DAYS = 7
+# Yahoo prices are split/dividend adjusted: when the re-requested overlap moves
+# by more than this (relative) the cached history is on an old basis.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+_MANIFEST_LOCK = threading.Lock()
+
+
+def cache_enabled():
+    return os.environ.get("DATA_CACHE", "true").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def get_cache_dir():
+    return os.environ.get("DATA_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def get_refresh_days():
+    try:
+        return max(0, int(os.environ.get("DATA_CACHE_REFRESH_DAYS", DEFAULT_REFRESH_DAYS)))
+    except ValueError:
+        return DEFAULT_REFRESH_DAYS
+
+
+def _naive(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts
+
+
+def _key_path(key):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+    return os.path.join(get_cache_dir(), f"{safe}.parquet")
+
+
+def _manifest_path():
+    return os.path.join(get_cache_dir(), MANIFEST_FILENAME)
+
+
+def load_manifest():
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except Exception as e:
+        print(f"Data cache manifest read error: {e}")
+        return {}
+
+
+def _update_manifest(entries):
+    with _MANIFEST_LOCK:
+        manifest = load_manifest()
+        manifest.update(entries)
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        tmp_path = _manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, _manifest_path())
+
+
+def read_frame(key):
+    path = _key_path(key)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Data cache read error ({key}): {e}")
+        return pd.DataFrame()
+
+
+def write_frame(key, frame):
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        path = _key_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Data cache write error ({key}): {e}")
+        return False
+
+
+def _merge(cached, fresh):
+    if cached.empty:
+        return fresh.sort_index()
+    if fresh.empty:
+        return cached
+    merged = pd.concat([cached, fresh])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def plan_fetch(entry, start, end, refresh_days=None):
+    """
+    Returns the (start, end) range that still has to be downloaded for a key
+    whose manifest entry is `entry`, or None when the cache already covers it.
+    A range starting before the cached coverage is fetched in full.
+    """
+    start = _naive(start)
+    end = _naive(end)
+    refresh_days = get_refresh_days() if refresh_days is None else refresh_days
+    if not entry:
+        return start, end
+    covered_start = _naive(entry["start"])
+    covered_end = _naive(entry["end"])
+    last_date = _naive(entry.get("last_date") or entry["end"])
+    if start < covered_start:
+        return start, end
+    tail_start = max(start, min(covered_end, last_date) - timedelta(days=refresh_days))
+    if tail_start >= end:
+        return None
+    return tail_start, end
+
+
+def _record(key, entry, frame, start, end):
+    previous_start = _naive(entry["start"]) if entry else _naive(start)
+    previous_end = _naive(entry["end"]) if entry else _naive(end)
+    last_date = frame.index.max() if not frame.empty else None
+    return {
+        key: {
+            "start": min(previous_start, _naive(start)).strftime("%Y-%m-%d"),
+            "end": max(previous_end, _naive(end)).strftime("%Y-%m-%d %H:%M:%S"),
+            "last_date": last_date.strftime("%Y-%m-%d") if last_date is not None else None,
+            "rows": int(len(frame)),
+            "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+    }
+
+
+def _split_yahoo(raw, tickers):
+    """Splits a yf.download result into one OHLCV frame per ticker."""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    if isinstance(raw.columns, pd.MultiIndex):
+        level = 1 if set(tickers) & set(raw.columns.get_level_values(1)) else 0
+        for ticker in tickers:
+            if ticker in raw.columns.get_level_values(level):
+                frame = raw.xs(ticker, axis=1, level=level).dropna(how="all")
+                frame.columns.name = None
+                if not frame.empty:
+                    frames[ticker] = frame
+    elif len(tickers) == 1:
+        frame = raw.dropna(how="all")
+        if not frame.empty:
+            frames[tickers[0]] = frame
+    return frames
+
+
+def _join_yahoo(frames, start, end):
+    """Rebuilds the yf.download (Price, Ticker) column layout from per-ticker frames."""
+    sliced = {ticker: frame.loc[_naive(start):_naive(end)] for ticker, frame in frames.items()}
+    sliced = {ticker: frame for ticker, frame in sliced.items() if not frame.empty}
+    if not sliced:
+        return pd.DataFrame()
+    joined = pd.concat(sliced, axis=1)
+    joined = joined.swaplevel(0, 1, axis=1).sort_index(axis=1)
+    joined.columns.names = ["Price", "Ticker"]
+    joined.index.name = "Date"
+    return joined
+
+
+def _rebased(cached, fresh, tolerance=ADJUSTMENT_TOLERANCE):
+    """
+    True when the re-downloaded overlap disagrees with the cached closes, i.e.
+    a split or dividend re-adjusted the whole history since it was cached. The
+    last cached bar is skipped: it may have been stored intraday.
+    """
+    if "Close" not in cached.columns or "Close" not in fresh.columns:
+        return False
+    overlap = cached.index[:-1].intersection(fresh.index)
+    if overlap.empty:
+        return False
+    old = cached.loc[overlap, "Close"]
+    new = fresh.loc[overlap, "Close"]
+    return bool(((new / old - 1).abs() > tolerance).any())
+
+
+def cached_yahoo_download(tickers, start, end, downloader):
+    """
+    Yahoo download through the local cache. Returns the same (Price, Ticker)
+    MultiIndex frame yf.download gives for a list of tickers. Only the tail not
+    yet held (plus the refresh overlap) is requested, one batch per fetch range.
+
+    A ticker whose overlap rows no longer match the cache (split/dividend
+    re-adjustment) is re-downloaded in full. A ticker whose refresh returns
+    nothing is left out of the result, as it would be without the cache, so
+    callers see it missing rather than served stale.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    if not cache_enabled():
+        return downloader(tickers, start, end)
+
+    manifest = load_manifest()
+    entries = {}
+    frames = {}
+    pending = {}
+    for ticker in tickers:
+        key = f"yahoo_{ticker}"
+        entry = manifest.get(key)
+        cached = read_frame(key) if entry else pd.DataFrame()
+        if entry and cached.empty:
+            entry = None
+        entries[key] = entry
+        frames[ticker] = cached
+        fetch_range = plan_fetch(entry, start, end)
+        if fetch_range is not None:
+            pending.setdefault(fetch_range, []).append(ticker)
+
+    updates = {}
+    failed = []
+    rebase = {}
+    for (fetch_start, fetch_end), group in pending.items():
+        print(f"Data cache: requesting {len(group)} Yahoo ticker(s) from {fetch_start.date()}")
+        fresh = _split_yahoo(downloader(group, fetch_start, fetch_end), group)
+        for ticker in group:
+            key = f"yahoo_{ticker}"
+            if ticker not in fresh:
+                failed.append(ticker)
+                continue
+            if not frames[ticker].empty and _rebased(frames[ticker], fresh[ticker]):
+                full_start = min(_naive(entries[key]["start"]), _naive(start))
+                rebase.setdefault((full_start, fetch_end), []).append(ticker)
+                continue
+            merged = _merge(frames[ticker], fresh[ticker])
+            frames[ticker] = merged
+            if write_frame(key, merged):
+                updates.update(_record(key, entries[key], merged, start, end))
+
+    for (fetch_start, fetch_end), group in rebase.items():
+        print(f"Data cache: price adjustment changed for {', '.join(group)}; re-requesting full history")
+        fresh = _split_yahoo(downloader(group, fetch_start, fetch_end), group)
+        for ticker in group:
+            key = f"yahoo_{ticker}"
+            if ticker not in fresh:
+                failed.append(ticker)
+                continue
+            frames[ticker] = fresh[ticker].sort_index()
+            if write_frame(key, frames[ticker]):
+                updates.update(_record(key, None, frames[ticker], fetch_start, end))
+    if updates:
+        _update_manifest(updates)
+
+    if failed:
+        print(f"Data cache: Yahoo refresh failed for {', '.join(failed)}; not serving stale cached rows")
+        for ticker in failed:
+            frames[ticker] = pd.DataFrame()
+
+    return _join_yahoo({t: f for t, f in frames.items() if not f.empty}, start, end)
+
+
+def cached_fred(series, start, end, reader):
+    """
+    FRED download through the local cache. Returns the same frame
+    web.DataReader(series, "fred", start, end) gives (before any ffill).
+    """
+    series = list(series)
+    if not cache_enabled():
+        return reader(series, start, end)
+
+    manifest = load_manifest()
+    entries = {}
+    columns = {}
+    pending = {}
+    for name in series:
+        key = f"fred_{name}"
+        entry = manifest.get(key)
+        cached = read_frame(key) if entry else pd.DataFrame()
+        if entry and cached.empty:
+            entry = None
+        entries[key] = entry
+        columns[name] = cached[name] if name in cached.columns else pd.Series(dtype=float, name=name)
+        fetch_range = plan_fetch(entry, start, end)
+        if fetch_range is not None:
+            pending.setdefault(fetch_range, []).append(name)
+
+    updates = {}
+    for (fetch_start, fetch_end), group in pending.items():
+        print(f"Data cache: requesting {len(group)} FRED series from {fetch_start.date()}")
+        try:
+            fresh = reader(group, fetch_start, fetch_end)
+        except Exception as e:
+            if all(columns[name].empty for name in group):
+                raise
+            print(f"Data cache: FRED refresh failed, serving cached rows ({e})")
+            continue
+        for name in group:
+            if fresh is None or name not in fresh.columns:
+                continue
+            key = f"fred_{name}"
+            merged = _merge(columns[name].to_frame(), fresh[[name]])
+            columns[name] = merged[name]
+            if write_frame(key, merged):
+                updates.update(_record(key, entries[key], merged, start, end))
+    if updates:
+        _update_manifest(updates)
+
+    available = [columns[name] for name in series if not columns[name].empty]
+    if not available:
+        return pd.DataFrame()
+    frame = pd.concat(available, axis=1).loc[_naive(start):_naive(end)]
+    frame.index.name = "DATE"
+    return frame
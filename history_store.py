@@ -5,6 +5,7 @@ import sqlite3
 import time
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
 import requests
 
 DEFAULT_DB_PATH = os.environ.get("HISTORY_DB_PATH", os.path.join("output", "history.db"))
@@ -146,6 +147,19 @@ def ensure_db(db_path):
             conn.execute(
                 f"ALTER TABLE daily_snapshots ADD COLUMN {column_name} {column_type}"
             )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signal_events (
+                date TEXT NOT NULL,
+                signal TEXT NOT NULL,
+                detail TEXT,
+                PRIMARY KEY (date, signal)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_signal_events_signal_date ON signal_events (signal, date)"
+        )
         conn.commit()
 
 
@@ -297,6 +311,35 @@ def upsert_daily_snapshot(db_path, snapshot):
         conn.commit()
 
 
+def write_snapshots(db_path, snapshots, signal_events=()):
+    """
+    Upserts many daily snapshots and their (date, signal, detail) signal
+    events in one transaction; nothing is written if any row fails.
+    """
+    columns = ", ".join(COLUMNS)
+    placeholders = ", ".join(["?"] * len(COLUMNS))
+    updates = ", ".join([f"{col}=excluded.{col}" for col in COLUMNS if col != "date"])
+
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            f"""
+            INSERT INTO daily_snapshots ({columns})
+            VALUES ({placeholders})
+            ON CONFLICT(date) DO UPDATE SET {updates}
+            """,
+            [[snapshot.get(col) for col in COLUMNS] for snapshot in snapshots],
+        )
+        conn.executemany(
+            """
+            INSERT INTO signal_events (date, signal, detail)
+            VALUES (?, ?, ?)
+            ON CONFLICT(date, signal) DO UPDATE SET detail=excluded.detail
+            """,
+            list(signal_events),
+        )
+        conn.commit()
+
+
 def update_regime_fields(db_path, date_str, regime):
     if not regime:
         return
@@ -333,6 +376,18 @@ def fetch_recent_history(db_path, limit):
     return [dict(row) for row in reversed(rows)]
 
 
+def fetch_history_before(db_path, date_str, limit):
+    """The last `limit` snapshots dated before date_str, oldest first."""
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT * FROM daily_snapshots WHERE date < ? ORDER BY date DESC LIMIT ?",
+            (date_str, limit),
+        ).fetchall()
+
+    return [dict(row) for row in reversed(rows)]
+
+
 def fetch_history(db_path):
     with sqlite3.connect(db_path) as conn:
         conn.row_factory = sqlite3.Row
@@ -350,9 +405,64 @@ def prune_history(db_path, retention_days):
     cutoff = (datetime.now(timezone.utc).date() - timedelta(days=retention_days)).isoformat()
     with sqlite3.connect(db_path) as conn:
         conn.execute("DELETE FROM daily_snapshots WHERE date < ?", (cutoff,))
+        conn.execute("DELETE FROM signal_events WHERE date < ?", (cutoff,))
+        conn.commit()
+
+
+def record_signal_events(db_path, date_str, events):
+    """
+    Stores the tracked signals that fired on date_str.
+    events: iterable of (signal, detail); a repeat run on the same day
+    overwrites the detail.
+    """
+    rows = [(date_str, signal, detail) for signal, detail in events]
+    if not rows:
+        return
+
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO signal_events (date, signal, detail)
+            VALUES (?, ?, ?)
+            ON CONFLICT(date, signal) DO UPDATE SET detail=excluded.detail
+            """,
+            rows,
+        )
         conn.commit()
 
 
+def fetch_signal_dates(db_path, signal, start_date=None, end_date=None):
+    """Dates (YYYY-MM-DD, ascending) on which signal fired within [start_date, end_date]."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            """
+            SELECT date FROM signal_events
+            WHERE signal = ? AND date >= ? AND date <= ?
+            ORDER BY date ASC
+            """,
+            (signal, start_date or "0000-00-00", end_date or "9999-99-99"),
+        ).fetchall()
+
+    return [row[0] for row in rows]
+
+
+def signal_combo_in_window(db_path, signal_a, signal_b, end_date, window_days):
+    """
+    True when both signals fired within [end_date - window_days, end_date].
+    Each side is one range probe on the (signal, date) index.
+    """
+    end_day = datetime.strptime(end_date, "%Y-%m-%d").date()
+    start_date = (end_day - timedelta(days=window_days)).isoformat()
+    probe = "EXISTS (SELECT 1 FROM signal_events WHERE signal = ? AND date >= ? AND date <= ?)"
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute(
+            f"SELECT {probe} AND {probe}",
+            (signal_a, start_date, end_date, signal_b, start_date, end_date),
+        ).fetchone()
+
+    return bool(row and row[0])
+
+
 def _get_float_env(name, default):
     try:
         return float(os.environ.get(name, default))
@@ -470,6 +580,11 @@ def _load_calibration(path):
         min_samples = int(payload.get("min_samples", min_samples_fallback))
     except (TypeError, ValueError):
         min_samples = min_samples_fallback
+    # Files written before the window was recorded keep the caller's window
+    try:
+        window_days = int(payload["window_days"]) if payload.get("window_days") is not None else None
+    except (TypeError, ValueError):
+        window_days = None
 
     return {
         "value_type": value_type,
@@ -479,13 +594,75 @@ def _load_calibration(path):
             "phase3_enter": phase3_enter,
             "phase3_exit": phase3_exit,
         },
+        "window_days": window_days,
         "lookback_days": lookback_days,
         "min_samples": min_samples,
     }
 
 
+# Every environment variable the regime settings read; the cached config is
+# rebuilt when one of them or the calibration file changes.
+REGIME_ENV_VARS = (
+    "PHASE_2_THRESHOLD",
+    "PHASE_2_EXIT_THRESHOLD",
+    "PHASE_3_THRESHOLD",
+    "PHASE_3_EXIT_THRESHOLD",
+    "REGIME_Z_PHASE2_ENTER",
+    "REGIME_Z_PHASE2_EXIT",
+    "REGIME_Z_PHASE3_ENTER",
+    "REGIME_Z_PHASE3_EXIT",
+    "REGIME_PCT_PHASE2_ENTER",
+    "REGIME_PCT_PHASE2_EXIT",
+    "REGIME_PCT_PHASE3_ENTER",
+    "REGIME_PCT_PHASE3_EXIT",
+    "REGIME_METHOD",
+    "REGIME_Z_LOOKBACK",
+    "REGIME_PCT_LOOKBACK",
+    "REGIME_AUTO_Z_MIN_SAMPLES",
+    "REGIME_AUTO_PCT_MIN_SAMPLES",
+    "CALIBRATION_MIN_SAMPLES",
+)
+_REGIME_CONFIG = {}
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_regime_config(path=None):
+    """
+    Thresholds, calibration and method settings of the regime, parsed once
+    and reused until the calibration file (mtime/size) or one of
+    REGIME_ENV_VARS changes. Treat the returned dict as read-only.
+    """
+    path = path or DEFAULT_CALIBRATION_PATH
+    key = (path, _file_version(path), tuple(os.environ.get(name) for name in REGIME_ENV_VARS))
+    if _REGIME_CONFIG.get("key") == key:
+        return _REGIME_CONFIG["config"]
+
+    method = os.environ.get("REGIME_METHOD", "auto").lower()
+    if method not in SUPPORTED_REGIME_METHODS:
+        method = "auto"
+    config = {
+        "thresholds": _get_regime_thresholds(),
+        "calibration": _load_calibration(path),
+        "method": method,
+        "z_lookback": _get_int_env("REGIME_Z_LOOKBACK", "180"),
+        "pct_lookback": _get_int_env("REGIME_PCT_LOOKBACK", "180"),
+        "z_min": _get_int_env("REGIME_AUTO_Z_MIN_SAMPLES", "90"),
+        "pct_min": _get_int_env("REGIME_AUTO_PCT_MIN_SAMPLES", "180"),
+    }
+    _REGIME_CONFIG.clear()
+    _REGIME_CONFIG.update({"key": key, "config": config})
+    return config
+
+
 def phase_from_score(score):
-    thresholds = _get_regime_thresholds()["absolute"]
+    thresholds = get_regime_config()["thresholds"]["absolute"]
     if score is None:
         return "Fase desconocida"
     if score >= thresholds["phase3_enter"]:
@@ -528,22 +705,17 @@ def _percentile_rank(values, current_value):
 
 
 def _select_regime_method(scores):
-    method = os.environ.get("REGIME_METHOD", "auto").lower()
-    if method not in SUPPORTED_REGIME_METHODS:
-        method = "auto"
+    config = get_regime_config()
+    method = config["method"]
     if method != "auto":
         return method
 
-    calibration = _load_calibration(DEFAULT_CALIBRATION_PATH)
-    if calibration:
+    if config["calibration"]:
         return "calibrated"
 
-    z_min = _get_int_env("REGIME_AUTO_Z_MIN_SAMPLES", "90")
-    pct_min = _get_int_env("REGIME_AUTO_PCT_MIN_SAMPLES", "180")
-
-    if len(scores) >= pct_min:
+    if len(scores) >= config["pct_min"]:
         return "percentile"
-    if len(scores) >= z_min:
+    if len(scores) >= config["z_min"]:
         return "zscore"
     return "absolute"
 
@@ -556,19 +728,18 @@ def regime_history_limit(window_days, trend_days, min_days):
         (trend_days * 2) if trend_days > 0 else 0,
     )
 
-    method = os.environ.get("REGIME_METHOD", "auto").lower()
-    if method not in SUPPORTED_REGIME_METHODS:
-        method = "auto"
-
-    z_lookback = _get_int_env("REGIME_Z_LOOKBACK", "180")
-    pct_lookback = _get_int_env("REGIME_PCT_LOOKBACK", "180")
-    z_min = _get_int_env("REGIME_AUTO_Z_MIN_SAMPLES", "90")
-    pct_min = _get_int_env("REGIME_AUTO_PCT_MIN_SAMPLES", "180")
-    calibration = _load_calibration(DEFAULT_CALIBRATION_PATH)
+    config = get_regime_config()
+    method = config["method"]
+    z_lookback = config["z_lookback"]
+    pct_lookback = config["pct_lookback"]
+    z_min = config["z_min"]
+    pct_min = config["pct_min"]
+    calibration = config["calibration"]
 
     calibration_limit = 0
     if calibration:
         calibration_limit = max(
+            calibration.get("window_days") or 0,
             calibration.get("lookback_days") or 0,
             calibration.get("min_samples") or 0,
         )
@@ -607,6 +778,24 @@ def compute_regime(history_rows, window_days, trend_days, min_days):
             "regime_method": None,
         }
 
+    config = get_regime_config()
+    method = _select_regime_method(scores)
+    thresholds = config["thresholds"]
+    z_lookback = config["z_lookback"]
+    pct_lookback = config["pct_lookback"]
+    regime_value = None
+
+    # A calibration's thresholds only fit regime values built with its own
+    # window and lookback, so those replace the configured ones.
+    calibration = config["calibration"] if method == "calibrated" else None
+    if calibration:
+        method = calibration["value_type"]
+        if calibration["window_days"] is not None:
+            window_days = calibration["window_days"]
+        z_lookback = pct_lookback = calibration["lookback_days"]
+    elif method == "calibrated":
+        method = "absolute"
+
     window_scores = scores[-window_days:] if window_days > 0 else scores
     regime_score = sum(window_scores) / len(window_scores)
 
@@ -618,51 +807,35 @@ def compute_regime(history_rows, window_days, trend_days, min_days):
     if not previous_phase and scores:
         previous_phase = phase_from_score(scores[-1])
 
-    method = _select_regime_method(scores)
-    thresholds = _get_regime_thresholds()
-    regime_value = None
-    method_thresholds = thresholds["absolute"]
-
-    if method == "calibrated":
-        calibration = _load_calibration(DEFAULT_CALIBRATION_PATH)
-        if calibration:
-            method = calibration["value_type"]
-            method_thresholds = calibration["thresholds"]
-        else:
-            method = "absolute"
-
     if method == "zscore":
-        lookback = _get_int_env("REGIME_Z_LOOKBACK", "180")
-        sample = scores[-lookback:] if lookback > 0 else scores
+        sample = scores[-z_lookback:] if z_lookback > 0 else scores
         mean = sum(sample) / len(sample)
         variance = sum((x - mean) ** 2 for x in sample) / len(sample)
         std = variance ** 0.5
         if std > 0:
             regime_value = (regime_score - mean) / std
-            method_thresholds = thresholds["zscore"]
         else:
             method = "absolute"
 
     if method == "percentile":
-        lookback = _get_int_env("REGIME_PCT_LOOKBACK", "180")
-        sample = scores[-lookback:] if lookback > 0 else scores
+        sample = scores[-pct_lookback:] if pct_lookback > 0 else scores
         regime_value = _percentile_rank(sample, regime_score)
-        method_thresholds = thresholds["percentile"]
 
     if method == "absolute":
         regime_value = regime_score
-        method_thresholds = thresholds["absolute"]
 
+    if calibration and method == calibration["value_type"]:
+        method_thresholds = calibration["thresholds"]
+    else:
+        method_thresholds = thresholds[method]
     regime_phase = _apply_hysteresis(regime_value, previous_phase, method_thresholds)
 
     confidence = "Alta" if len(window_scores) >= min_days else "Baja"
     if method == "zscore":
-        z_min = _get_int_env("REGIME_AUTO_Z_MIN_SAMPLES", "90")
-        if len(scores) < z_min:
+        if len(scores) < config["z_min"]:
             confidence = "Baja"
     if method == "percentile":
-        pct_min = _get_int_env("REGIME_AUTO_PCT_MIN_SAMPLES", "180")
-        if len(scores) < pct_min:
+        if len(scores) < config["pct_min"]:
             confidence = "Baja"
 
     trend = "Estable"
@@ -687,3 +860,171 @@ def compute_regime(history_rows, window_days, trend_days, min_days):
         "regime_method": method,
         "regime_value": None if regime_value is None else round(regime_value, 2),
     }
+
+
+def _trailing_windows(values, ends, lengths, width):
+    """
+    Row r holds the last lengths[r] (at most width) entries of values before
+    index ends[r], right-aligned and NaN-padded on the left.
+    """
+    padded = np.concatenate([np.full(width, np.nan), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width)[ends].copy()
+    windows[np.arange(width)[None, :] < (width - np.minimum(lengths, width))[:, None]] = np.nan
+    return windows
+
+
+def compute_regime_series(
+    phase_scores,
+    window_days,
+    trend_days,
+    min_days,
+    history_limit=None,
+    prior_phases=None,
+    method=None,
+    lookback_days=None,
+):
+    """
+    compute_regime for every row of a phase_score series at once.
+
+    Row i sees the rows up to itself (the last `history_limit` of them when
+    given), like compute_regime on that day's history; the hysteresis runs as
+    one sequential pass over the phases. The leading len(prior_phases) rows
+    are stored history: they feed the windows and carry their given phases,
+    and only the rows after them are returned. `method` overrides
+    REGIME_METHOD and `lookback_days` both REGIME_Z_LOOKBACK and
+    REGIME_PCT_LOOKBACK. In calibrated mode the calibration's window_days and
+    lookback_days replace window_days and the configured lookbacks.
+
+    Returns a dict of arrays: regime_score, regime_value, regime_trend_score
+    (unrounded floats, NaN where undefined), regime_phase, regime_trend,
+    regime_confidence, regime_method (objects) and regime_samples (how many
+    scores the row sees).
+    """
+    scores = np.array([np.nan if s is None else s for s in phase_scores], dtype=float)
+    prior_phases = list(prior_phases or [])
+    first = len(prior_phases)
+    rows = len(scores) - first
+    valid = ~np.isnan(scores)
+    compact = scores[valid]
+
+    # Scores available to each row: the valid ones among its history rows
+    ends = np.cumsum(valid)
+    available = ends.copy()
+    if history_limit:
+        shifted = np.concatenate([np.zeros(history_limit, dtype=int), ends])[:len(ends)]
+        available = ends - shifted
+    ends, available = ends[first:], available[first:]
+    has_scores = available > 0
+
+    def trailing_mean(length):
+        width = max(int(length.max()), 1) if len(length) else 1
+        windows = _trailing_windows(compact, ends, length, width)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nansum(windows, axis=1) / length, windows
+
+    config = get_regime_config()
+    thresholds = config["thresholds"]
+    calibration = config["calibration"]
+    selected = method.lower() if method else config["method"]
+    if selected not in SUPPORTED_REGIME_METHODS:
+        selected = "auto"
+    calibrated = calibration is not None and selected in {"auto", "calibrated"}
+    if calibrated:
+        if calibration["window_days"] is not None:
+            window_days = calibration["window_days"]
+        if lookback_days is None:
+            lookback_days = calibration["lookback_days"]
+
+    window_len = np.minimum(window_days, available) if window_days > 0 else available
+    regime_score, _ = trailing_mean(window_len)
+
+    z_lookback = config["z_lookback"] if lookback_days is None else lookback_days
+    pct_lookback = config["pct_lookback"] if lookback_days is None else lookback_days
+    z_min = config["z_min"]
+    pct_min = config["pct_min"]
+
+    if selected == "auto":
+        methods = np.where(
+            available >= pct_min, "percentile", np.where(available >= z_min, "zscore", "absolute")
+        ).astype(object)
+        if calibration:
+            methods[:] = calibration["value_type"]
+    elif selected == "calibrated":
+        methods = np.full(rows, calibration["value_type"] if calibration else "absolute", dtype=object)
+    else:
+        methods = np.full(rows, selected, dtype=object)
+
+    regime_value = regime_score.copy()
+
+    z_rows = methods == "zscore"
+    if z_rows.any():
+        z_len = np.minimum(z_lookback, available) if z_lookback > 0 else available
+        mean, windows = trailing_mean(z_len)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.nansum((windows - mean[:, None]) ** 2, axis=1) / z_len)
+            z_value = (regime_score - mean) / std
+        usable = z_rows & (std > 0)
+        regime_value[usable] = z_value[usable]
+        methods[z_rows & ~usable] = "absolute"
+
+    pct_rows = methods == "percentile"
+    if pct_rows.any():
+        pct_len = np.minimum(pct_lookback, available) if pct_lookback > 0 else available
+        _, windows = trailing_mean(pct_len)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rank = (windows < regime_score[:, None]).sum(axis=1) / pct_len * 100
+        regime_value[pct_rows] = rank[pct_rows]
+
+    confidence = np.where(window_len >= min_days, "Alta", "Baja").astype(object)
+    confidence[z_rows & (methods == "zscore") & (available < z_min)] = "Baja"
+    confidence[pct_rows & (available < pct_min)] = "Baja"
+
+    trend = np.full(rows, "Estable", dtype=object)
+    trend_score = np.full(rows, np.nan)
+    if trend_days > 0:
+        has_trend = available >= trend_days * 2
+        if has_trend.any():
+            windows = _trailing_windows(compact, ends, np.full(rows, trend_days * 2), trend_days * 2)
+            with np.errstate(invalid="ignore"):
+                previous = windows[:, :trend_days].sum(axis=1) / trend_days
+                recent = windows[:, trend_days:].sum(axis=1) / trend_days
+            trend_score = np.where(has_trend, recent - previous, np.nan)
+            trend[trend_score >= 0.5] = "Ascendente"
+            trend[trend_score <= -0.5] = "Descendente"
+
+    # Hysteresis: each row starts from the latest phase within its history
+    phases = np.full(rows, None, dtype=object)
+    last_phase, last_row = None, None
+    for row, phase in enumerate(prior_phases):
+        if phase:
+            last_phase, last_row = phase, row
+    row_thresholds = dict(thresholds)
+    if calibrated:
+        row_thresholds[calibration["value_type"]] = calibration["thresholds"]
+    for i in range(rows):
+        if not has_scores[i]:
+            continue
+        row = first + i
+        previous = last_phase if last_row is not None and (not history_limit or row - last_row < history_limit) else None
+        if not previous:
+            previous = phase_from_score(compact[ends[i] - 1])
+        row_method = methods[i]
+        phases[i] = _apply_hysteresis(regime_value[i], previous, row_thresholds[row_method])
+        last_phase, last_row = phases[i], row
+
+    empty = ~has_scores
+    regime_score[empty] = np.nan
+    regime_value[empty] = np.nan
+    methods[empty] = None
+    trend[empty] = None
+    confidence[empty] = "Baja"
+    return {
+        "regime_score": regime_score,
+        "regime_value": regime_value,
+        "regime_phase": phases,
+        "regime_trend": trend,
+        "regime_trend_score": trend_score,
+        "regime_confidence": confidence,
+        "regime_method": methods,
+        "regime_samples": available,
+    }
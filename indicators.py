@@ -0,0 +1,126 @@
+import pandas as pd
+
+import rolling_stats
+
+
+# --- TECHNICAL INDICATORS ---
+def rsi(series, period=14):
+    """Standard RSI: 100 - (100 / (1 + RS))."""
+    if series.empty or len(series) < period:
+        return pd.Series([50.0] * len(series), index=series.index)
+    delta = series.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def normalize_tnx(series):
+    """
+    Normalize ^TNX units if Yahoo returns yield * 10.
+    Heuristic: if median > 20, assume scaled and divide by 10.
+    """
+    if series is None or series.empty:
+        return series
+    median_val = series.median(skipna=True)
+    if pd.notna(median_val) and median_val > 20:
+        return series / 10.0
+    return series
+
+
+# --- ADAPTIVE THRESHOLDS ---
+def calculate_z_score_threshold(series, window=250, num_std=2.0):
+    """
+    Calculates an adaptive threshold based on z-score (mean + N*std).
+    Returns (threshold, z_score) tuple.
+
+    Args:
+        series: pandas Series of historical values
+        window: lookback period (default 250 trading days = ~1 year)
+        num_std: number of standard deviations above mean (default 2.0)
+
+    Returns:
+        (threshold_value, current_z_score) or (None, None) if insufficient data
+    """
+    # Only the trailing window is needed for the newest point (see rolling_stats)
+    return rolling_stats.z_score_threshold(series, window=window, num_std=num_std)
+
+
+def calculate_percentile_threshold(series, window=250, percentile=95):
+    """
+    Calculates an adaptive threshold based on rolling percentile.
+    Returns (threshold, current_percentile) tuple.
+
+    Args:
+        series: pandas Series of historical values
+        window: lookback period (default 250 trading days)
+        percentile: percentile level (default 95 = top 5%)
+
+    Returns:
+        (threshold_value, current_percentile) or (None, None) if insufficient data
+    """
+    # Threshold and rank come from one sorted window (see rolling_stats)
+    return rolling_stats.percentile_threshold(series, window=window, percentile=percentile)
+
+
+# --- MEMOIZED INDICATOR SET ---
+class IndicatorSet:
+    """
+    Indicator series for one input frame, each computed at most once.
+
+    The live path reads the last row of a series (`.iloc[-1]`), the backtest
+    uses the full column; both get the same numbers from the same code.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._cache = {}
+
+    def _memo(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def has(self, col):
+        return col in self.frame.columns
+
+    def rsi(self, col, period=14):
+        """RSI of a column; a neutral 50 series when the column is missing."""
+        def build():
+            if not self.has(col):
+                return pd.Series(50.0, index=self.frame.index)
+            return rsi(self.frame[col], period)
+        return self._memo(("rsi", col, period), build)
+
+    def rolling(self, col, window, stat="mean"):
+        """Rolling mean/std/max/min of a column."""
+        return self._memo(("rolling", col, window, stat), lambda: getattr(self.frame[col].rolling(window=window), stat)())
+
+    def rsi_rolling(self, col, window, stat="max", period=14):
+        """Rolling mean/std/max/min of a column's RSI."""
+        return self._memo(
+            ("rsi_rolling", col, window, stat, period),
+            lambda: getattr(self.rsi(col, period).rolling(window=window), stat)(),
+        )
+
+    def z_threshold(self, col, window=250, num_std=2.0):
+        """Full-column adaptive z-score threshold (NaN where unavailable)."""
+        return self._memo(
+            ("z_threshold", col, window, num_std),
+            lambda: rolling_stats.z_score_threshold_series(self.frame[col], window, num_std),
+        )
+
+    def pct_threshold(self, col, window=250, percentile=95):
+        """Full-column adaptive percentile threshold (NaN where unavailable)."""
+        return self._memo(
+            ("pct_threshold", col, window, percentile),
+            lambda: rolling_stats.percentile_threshold_series(self.frame[col], window, percentile),
+        )
+
+    def z_score(self, col, window=250):
+        """Full-column z-score of each row against its trailing window (NaN where unavailable)."""
+        return self._memo(("z_score", col, window), lambda: rolling_stats.z_score_series(self.frame[col], window))
+
+    def pct_rank(self, col, window=250):
+        """Full-column percentile rank of each row within its trailing window."""
+        return self._memo(("pct_rank", col, window), lambda: rolling_stats.percentile_rank_series(self.frame[col], window))
@@ -0,0 +1,132 @@
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_RESULTS_DIR = os.path.join("output", "results")
+DEFAULT_TAG = "default"
+PART_FILENAME = "part.parquet"
+
+CATEGORY_COLUMNS = ["Event", "Asset", "EventDetail"]
+# 0/1 flags and small counts; every other numeric column is stored as float32
+INT8_COLUMNS = [
+    "IsClusterStart",
+    "DepressionScore",
+    "DepressionFlag",
+    "Depress_NBER_Recession",
+    "Depress_EquityCrash",
+    "Depress_CreditFreeze",
+    "Depress_LaborShock",
+    "Depress_HousingBust",
+    "Depress_Interbank",
+]
+
+
+def get_results_dir():
+    return os.environ.get("BACKTEST_RESULTS_DIR", DEFAULT_RESULTS_DIR)
+
+
+def _safe(value):
+    return re.sub(r"[^A-Za-z0-9_.^-]", "_", str(value))
+
+
+def _tag_dir(tag, base_dir=None):
+    return Path(base_dir or get_results_dir()) / f"tag={_safe(tag or DEFAULT_TAG)}"
+
+
+def typed_results(df):
+    """
+    Backtest result rows with compact dtypes: categorical Event/Asset/EventDetail,
+    int8 flags, float32 measurements and a datetime Date.
+    """
+    typed = df.copy()
+    if "Date" in typed.columns:
+        typed["Date"] = pd.to_datetime(typed["Date"])
+    for col in typed.columns:
+        if col in CATEGORY_COLUMNS:
+            typed[col] = typed[col].astype("category")
+        elif col in INT8_COLUMNS:
+            typed[col] = pd.to_numeric(typed[col], errors="coerce").fillna(0).astype("int8")
+        elif col != "Date":
+            typed[col] = pd.to_numeric(typed[col], errors="coerce").astype("float32")
+    return typed
+
+
+def write_results(df, tag=None, base_dir=None):
+    """
+    Writes one Parquet file per Event under <results dir>/tag=<tag>/Event=<event>/,
+    replacing the previous results of that tag. Returns the tag directory.
+    """
+    target = _tag_dir(tag, base_dir)
+    staging = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    typed = typed_results(df)
+    for event, part in typed.groupby("Event", observed=True, sort=True):
+        part_dir = staging / f"Event={_safe(event)}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part.drop(columns=["Event"]).reset_index(drop=True).to_parquet(part_dir / PART_FILENAME, index=False)
+    staging.mkdir(parents=True, exist_ok=True)
+
+    retired = target.with_name(f"{target.name}.old")
+    shutil.rmtree(retired, ignore_errors=True)
+    if target.exists():
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    return target
+
+
+def list_events(tag=None, base_dir=None):
+    target = _tag_dir(tag, base_dir)
+    if not target.exists():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in target.iterdir() if p.is_dir() and p.name.startswith("Event="))
+
+
+def load_results(tag=None, columns=None, events=None, base_dir=None):
+    """
+    Reads stored results, touching only the partitions of `events` (all when
+    None) and only `columns` (all when None). Returns an empty frame when the
+    tag has not been written.
+    """
+    available = list_events(tag, base_dir)
+    wanted = available if events is None else [e for e in events if _safe(e) in available]
+    file_columns = None if columns is None else [c for c in columns if c != "Event"]
+
+    frames = []
+    for event in wanted:
+        path = _tag_dir(tag, base_dir) / f"Event={_safe(event)}" / PART_FILENAME
+        part = pd.read_parquet(path, columns=file_columns)
+        if columns is None or "Event" in columns:
+            part.insert(1 if len(part.columns) and part.columns[0] == "Date" else 0, "Event", event)
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+
+    df = pd.concat(frames, ignore_index=True)
+    if "Event" in df.columns:
+        df["Event"] = df["Event"].astype(pd.CategoricalDtype(sorted(available)))
+    for col in ("Asset", "EventDetail"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    if "Date" in df.columns:
+        df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def export_csv(path, tag=None, base_dir=None):
+    """Writes the stored results of `tag` as the legacy one-file CSV."""
+    df = load_results(tag, base_dir=base_dir)
+    if df.empty:
+        return None
+    if "Date" in df.columns:
+        df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    return path
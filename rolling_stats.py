@@ -0,0 +1,189 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Fixed-size rolling window with push-one-value updates.
+
+    Mean/variance come from running Welford sums (O(1) per push) and quantiles
+    and ranks from a sorted copy of the window: reads are O(1)/O(log W), but
+    keeping the copy sorted shifts the list, O(W) per push. from_values sorts
+    once, O(W log W). Paths that need a value for every row should use the
+    *_series batch forms instead. Like pandas' rolling(window) with default
+    min_periods, statistics are only available once the window holds
+    `window` non-NaN values.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = int(window)
+        self._values = deque()
+        self._sorted = []
+        self._nan_count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+    @classmethod
+    def from_values(cls, values, window):
+        """Window holding the last `window` of values, sorted once rather than per push."""
+        rolling = cls(window)
+        for value in list(values)[-rolling.window:]:
+            value = float(value) if value is not None else math.nan
+            rolling._values.append(value)
+            rolling._accumulate(value)
+        rolling._sorted = sorted(v for v in rolling._values if not math.isnan(v))
+        return rolling
+
+    def extend(self, values):
+        for value in values:
+            self.push(value)
+        return self
+
+    def push(self, value):
+        value = float(value) if value is not None else math.nan
+        self._values.append(value)
+        self._add(value)
+        if len(self._values) > self.window:
+            self._remove(self._values.popleft())
+        return self
+
+    def _add(self, value):
+        if not math.isnan(value):
+            insort(self._sorted, value)
+        self._accumulate(value)
+
+    def _accumulate(self, value):
+        if math.isnan(value):
+            self._nan_count += 1
+            return
+        count = len(self._values) - self._nan_count
+        delta = value - self._mean
+        self._mean += delta / count
+        self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value):
+        if math.isnan(value):
+            self._nan_count -= 1
+            return
+        del self._sorted[bisect_left(self._sorted, value)]
+        count = len(self._sorted)
+        if count == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = value - self._mean
+        self._mean -= delta / count
+        self._m2 -= delta * (value - self._mean)
+
+    @property
+    def ready(self):
+        return len(self._values) == self.window and self._nan_count == 0
+
+    @property
+    def last(self):
+        return self._values[-1] if self._values else None
+
+    def mean(self):
+        return self._mean if self.ready else None
+
+    def std(self):
+        """Sample standard deviation (ddof=1), matching pandas' rolling std."""
+        if not self.ready or self.window < 2:
+            return None
+        if self._sorted[0] == self._sorted[-1]:
+            return 0.0
+        return math.sqrt(max(self._m2, 0.0) / (self.window - 1))
+
+    def quantile(self, q):
+        """Linear-interpolated quantile, same convention as pandas' rolling quantile."""
+        if not self.ready:
+            return None
+        position = q * (len(self._sorted) - 1)
+        lower = int(math.floor(position))
+        low_value = self._sorted[lower]
+        if position == lower:
+            return low_value
+        high_value = self._sorted[lower + 1]
+        return low_value + (high_value - low_value) * (position - lower)
+
+    def rank(self, value=None):
+        """Share of window values strictly below value (default: newest), in percent."""
+        if not self._values:
+            return None
+        value = self.last if value is None else value
+        return bisect_left(self._sorted, value) / len(self._values) * 100
+
+    def z_score_threshold(self, num_std=2.0):
+        """(mean + num_std * std, z-score of the newest value) or (None, None)."""
+        mean = self.mean()
+        std = self.std()
+        if mean is None or std is None or std == 0:
+            return None, None
+        threshold = mean + (num_std * std)
+        z_score = (self.last - mean) / std
+        return threshold, z_score
+
+    def percentile_threshold(self, percentile=95):
+        """(rolling percentile threshold, percentile rank of the newest value) or (None, None)."""
+        threshold = self.quantile(percentile / 100.0)
+        if threshold is None:
+            return None, None
+        return threshold, self.rank()
+
+
+def _tail_window(series, window):
+    if len(series) < window:
+        return None
+    return RollingWindow.from_values(series.iloc[-window:].to_numpy(dtype=float), window)
+
+
+def z_score_threshold(series, window=250, num_std=2.0):
+    """(threshold, z_score) for the last point of series, or (None, None)."""
+    rolling = _tail_window(series, window)
+    if rolling is None:
+        return None, None
+    return rolling.z_score_threshold(num_std)
+
+
+def percentile_threshold(series, window=250, percentile=95):
+    """(threshold, percentile rank) for the last point of series, or (None, None)."""
+    rolling = _tail_window(series, window)
+    if rolling is None:
+        return None, None
+    return rolling.percentile_threshold(percentile)
+
+
+def z_score_threshold_series(series, window=250, num_std=2.0):
+    """Batch form of z_score_threshold: the threshold for every row (NaN where unavailable)."""
+    rolling_mean = series.rolling(window=window).mean()
+    rolling_std = series.rolling(window=window).std()
+    threshold = rolling_mean + (num_std * rolling_std)
+    return threshold.where(rolling_std.notna() & rolling_mean.notna() & (rolling_std != 0))
+
+
+def percentile_threshold_series(series, window=250, percentile=95):
+    """Batch form of percentile_threshold: the threshold for every row (NaN where unavailable)."""
+    return series.rolling(window=window).quantile(percentile / 100.0)
+
+
+def percentile_rank_series(series, window=250):
+    """Batch percentile rank of every row within its trailing window (share strictly below, in percent)."""
+    below = series.rolling(window=window).rank(method="min") - 1
+    return below / window * 100
+
+
+def z_score_series(series, window=250):
+    """Batch z-score of every row against its trailing window (NaN where std is missing or zero)."""
+    rolling_mean = series.rolling(window=window).mean()
+    rolling_std = series.rolling(window=window).std()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (series - rolling_mean) / rolling_std
+    return z_score.where(rolling_std.notna() & (rolling_std != 0))
@@ -1,7 +1,11 @@
+import hashlib
+import json
 import os
 import sys
 from datetime import datetime, timedelta, time as dt_time, timezone
 
+import pandas as pd
+
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
@@ -39,46 +43,79 @@ def _default_state():
     }
 
 
-def main():
-    days = int(os.environ.get("BACKFILL_DAYS", "365"))
-    start_override = _parse_date(os.environ.get("BACKFILL_START_DATE"))
-    end_override = _parse_date(os.environ.get("BACKFILL_END_DATE"))
+TRACKED_SIGNALS = [
+    "SOLVENCY_DEATH",
+    "SUGAR_CRASH",
+    "EM_CURRENCY_STRESS",
+    "WAR_PROTOCOL",
+    "INTERBANK_STRESS",
+    "LABOUR_SHOCK",
+    "FLASH_MOVE",
+]
 
-    end_date = end_override or datetime.now(timezone.utc)
-    if start_override:
-        start_date = start_override
-    else:
-        start_date = end_date - timedelta(days=days)
 
-    db_path = os.environ.get("HISTORY_DB_PATH", os.path.join("output", "history.db"))
-    retention_days = int(os.environ.get("HISTORY_RETENTION_DAYS", "365"))
+def _snapshot(day_dt, analysis):
+    return {
+        "date": day_dt.strftime("%Y-%m-%d"),
+        "run_ts": day_dt.isoformat(),
+        "run_id": None,
+        "run_event": "backfill",
+        "run_attempt": None,
+        "event": analysis.get("event"),
+        "stress_score": analysis.get("stress_score"),
+        "stress_level": analysis.get("stress_level"),
+        "phase_daily": analysis.get("phase_daily"),
+        "phase_score": float(analysis.get("stress_score")) if analysis.get("stress_score") is not None else None,
+        "regime_phase": None,
+        "regime_score": None,
+        "regime_trend": None,
+        "regime_confidence": None,
+        "cycle_phase": analysis.get("cycle_phase"),
+        "cycle_trend": analysis.get("cycle_trend"),
+        "cycle_confidence": analysis.get("cycle_confidence"),
+        "cycle_pressure": analysis.get("cycle_pressure"),
+        "cycle_spec": analysis.get("cycle_spec"),
+        "cycle_index": analysis.get("cycle_index"),
+        "cycle_break_risk": analysis.get("cycle_break_risk"),
+        "cycle_near_break": analysis.get("cycle_near_break"),
+        "spx": analysis.get("spx"),
+        "vix": analysis.get("vix"),
+        "spread": analysis.get("spread"),
+        "us10y": analysis.get("us10y"),
+        "dxy": analysis.get("dxy"),
+        "net_liq_b": analysis.get("net_liq_b"),
+        "gold": analysis.get("gold"),
+        "btc": analysis.get("btc_price"),
+        "triggers": ",".join(analysis.get("trigger_events") or []),
+        "reason": analysis.get("reason"),
+    }
 
-    sync_gist = os.environ.get("BACKFILL_SYNC_GIST", "false").lower() == "true"
-    history_load_state = True
 
-    if sync_gist and sentinel.GIST_TOKEN and sentinel.STATE_GIST_ID:
-        history_load_state = history_store.load_db_from_gist(
-            sentinel.GIST_TOKEN,
-            sentinel.STATE_GIST_ID,
-            db_path,
-            os.environ.get("HISTORY_GIST_FILENAME", "history.db.b64"),
-        )
+def _regime_settings():
+    risk_window = int(os.environ.get("RISK_WINDOW_DAYS", os.environ.get("REGIME_WINDOW_DAYS", "14")))
+    risk_trend = int(os.environ.get("RISK_TREND_DAYS", os.environ.get("REGIME_TREND_DAYS", "7")))
+    risk_min = int(os.environ.get("RISK_MIN_DAYS", os.environ.get("REGIME_MIN_DAYS", "7")))
+    history_limit = history_store.regime_history_limit(
+        risk_window,
+        risk_trend,
+        risk_min,
+    )
+    return risk_window, risk_trend, risk_min, history_limit
 
-    history_store.ensure_db(db_path)
 
-    market_data, wpm_data, fred_data, housing_data = sentinel.get_data(
-        start_date=start_date,
-        end_date=end_date,
-    )
+def _apply_state_update(state, analysis):
+    if analysis.get("state_update"):
+        for key, value in analysis["state_update"].items():
+            state[key] = value
 
-    if market_data.empty:
-        print("No market data available for backfill window.")
-        return
 
+def backfill_loop(db_path, market_data, wpm_data, fred_data, housing_data):
+    """Day-by-day backfill: one analyse_market call and DB round trip per day."""
     state = _default_state()
 
     dates = sorted({idx.date() for idx in market_data.index})
     total = len(dates)
+    risk_window, risk_trend, risk_min, history_limit = _regime_settings()
 
     for idx, day in enumerate(dates, start=1):
         day_dt = datetime.combine(day, dt_time.min)
@@ -95,58 +132,19 @@ def main():
             housing_slice,
             state,
             end_date=day_dt,
+            signal_db_path=db_path,
         )
+        _apply_state_update(state, analysis)
 
-        if analysis.get("state_update"):
-            for key, value in analysis["state_update"].items():
-                state[key] = value
-
-        date_str = day_dt.strftime("%Y-%m-%d")
-        snapshot = {
-            "date": date_str,
-            "run_ts": day_dt.isoformat(),
-            "run_id": None,
-            "run_event": "backfill",
-            "run_attempt": None,
-            "event": analysis.get("event"),
-            "stress_score": analysis.get("stress_score"),
-            "stress_level": analysis.get("stress_level"),
-            "phase_daily": analysis.get("phase_daily"),
-            "phase_score": float(analysis.get("stress_score")) if analysis.get("stress_score") is not None else None,
-            "regime_phase": None,
-            "regime_score": None,
-            "regime_trend": None,
-            "regime_confidence": None,
-            "cycle_phase": analysis.get("cycle_phase"),
-            "cycle_trend": analysis.get("cycle_trend"),
-            "cycle_confidence": analysis.get("cycle_confidence"),
-            "cycle_pressure": analysis.get("cycle_pressure"),
-            "cycle_spec": analysis.get("cycle_spec"),
-            "cycle_index": analysis.get("cycle_index"),
-            "cycle_break_risk": analysis.get("cycle_break_risk"),
-            "cycle_near_break": analysis.get("cycle_near_break"),
-            "spx": analysis.get("spx"),
-            "vix": analysis.get("vix"),
-            "spread": analysis.get("spread"),
-            "us10y": analysis.get("us10y"),
-            "dxy": analysis.get("dxy"),
-            "net_liq_b": analysis.get("net_liq_b"),
-            "gold": analysis.get("gold"),
-            "btc": analysis.get("btc_price"),
-            "triggers": ",".join(analysis.get("trigger_events") or []),
-            "reason": analysis.get("reason"),
-        }
-
+        snapshot = _snapshot(day_dt, analysis)
+        date_str = snapshot["date"]
         history_store.upsert_daily_snapshot(db_path, snapshot)
-
-        risk_window = int(os.environ.get("RISK_WINDOW_DAYS", os.environ.get("REGIME_WINDOW_DAYS", "14")))
-        risk_trend = int(os.environ.get("RISK_TREND_DAYS", os.environ.get("REGIME_TREND_DAYS", "7")))
-        risk_min = int(os.environ.get("RISK_MIN_DAYS", os.environ.get("REGIME_MIN_DAYS", "7")))
-        history_limit = history_store.regime_history_limit(
-            risk_window,
-            risk_trend,
-            risk_min,
+        history_store.record_signal_events(
+            db_path,
+            date_str,
+            [(item["signal"], item["detail"]) for item in analysis.get("signal_events") or []],
         )
+
         history_rows = history_store.fetch_recent_history(db_path, history_limit)
         regime = history_store.compute_regime(
             history_rows,
@@ -159,6 +157,238 @@ def main():
         if idx % 25 == 0 or idx == total:
             print(f"Backfill {idx}/{total}: {date_str} -> {analysis.get('event')}")
 
+
+def _rows_path(path):
+    return f"{os.path.splitext(path)[0]}.rows.jsonl"
+
+
+def _data_key(frames, last_date):
+    """Fingerprint of every input frame up to last_date, so revised upstream data voids the checkpoint."""
+    digest = hashlib.sha1()
+    for frame in frames:
+        prefix = frame.loc[:last_date] if frame is not None and not frame.empty else pd.DataFrame()
+        digest.update(repr((list(prefix.columns), len(prefix))).encode())
+        if not prefix.empty:
+            digest.update(pd.util.hash_pandas_object(prefix, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _load_checkpoint(path, start, frames):
+    """
+    The saved state plus the snapshots/signal events of every checkpointed
+    chunk, or None when there is none or it no longer matches the start date
+    or the input data up to its last day. A later end date (new bars) keeps it.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            checkpoint = json.load(handle)
+        with open(_rows_path(path), "r", encoding="utf-8") as handle:
+            chunks = [json.loads(line) for line in handle.readlines()[: checkpoint.get("chunks", 0)]]
+    except (OSError, ValueError) as exc:
+        print(f"Backfill checkpoint unreadable, starting over: {exc}")
+        return None
+    if checkpoint.get("start") != start:
+        print("Backfill checkpoint belongs to another start date; starting over.")
+        return None
+    if checkpoint.get("data_key") != _data_key(frames, checkpoint.get("last_date")):
+        print("Backfill input data changed since the checkpoint; starting over.")
+        return None
+    if len(chunks) != checkpoint.get("chunks"):
+        print("Backfill checkpoint rows are incomplete; starting over.")
+        return None
+    # Drop any chunk appended after the last state save (interrupted write).
+    with open(_rows_path(path), "w", encoding="utf-8") as handle:
+        handle.writelines(json.dumps(chunk) + "\n" for chunk in chunks)
+    checkpoint["snapshots"] = [snapshot for chunk in chunks for snapshot in chunk["snapshots"]]
+    checkpoint["signal_events"] = [tuple(item) for chunk in chunks for item in chunk["signal_events"]]
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint, snapshots, signal_events):
+    """
+    Appends the snapshots and signal events since the previous save as one
+    line of the rows file, then replaces the small state file, so each save
+    costs only the new rows.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(_rows_path(path), "a", encoding="utf-8") as handle:
+        handle.write(json.dumps({"snapshots": snapshots, "signal_events": signal_events}, default=_json_scalar) + "\n")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(checkpoint, handle, default=_json_scalar)
+    os.replace(tmp_path, path)
+
+
+def _clear_checkpoint(path):
+    for stale in (path, _rows_path(path)):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def _json_scalar(value):
+    # numpy scalars (bool_, int64) that json cannot encode on its own
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _seed_recent_signals(state, db_path, first_day):
+    """Signals stored in the 30 days before the window, as the live combos would see them."""
+    start = (first_day - timedelta(days=30)).strftime("%Y-%m-%d")
+    end = (first_day - timedelta(days=1)).strftime("%Y-%m-%d")
+    for signal in TRACKED_SIGNALS:
+        for date_str in history_store.fetch_signal_dates(db_path, signal, start, end):
+            sentinel.add_signal_to_history(state, signal, _parse_date(date_str))
+
+
+def backfill_vectorized(db_path, market_data, wpm_data, fred_data, housing_data, checkpoint_path=None, checkpoint_every=250):
+    """
+    Batch backfill: every day's analysis comes from sentinel.analyse_market_history,
+    the regime columns from one in-memory pass over the score series, and all
+    rows are written in a single transaction. The state and the rows so far
+    are checkpointed every `checkpoint_every` days; a rerun from the same
+    start date whose input data is unchanged up to the last checkpointed day
+    resumes after it, even if the window now ends later.
+    """
+    dates = market_data.index
+    start = f"{dates[0]:%Y-%m-%d}"
+    frames = (market_data, wpm_data, fred_data, housing_data)
+    checkpoint = _load_checkpoint(checkpoint_path, start, frames)
+    if checkpoint:
+        state = checkpoint["state"]
+        sentinel.normalize_recent_signals(state)
+        snapshots = checkpoint["snapshots"]
+        signal_events = checkpoint["signal_events"]
+        chunks = checkpoint["chunks"]
+        after = checkpoint["last_date"]
+        print(f"Resuming backfill after {after} ({len(snapshots)} days done).")
+    else:
+        if checkpoint_path:
+            _clear_checkpoint(checkpoint_path)
+        state = _default_state()
+        _seed_recent_signals(state, db_path, dates[0].to_pydatetime())
+        snapshots = []
+        signal_events = []
+        chunks = 0
+        after = None
+    saved_snapshots, saved_events = len(snapshots), len(signal_events)
+
+    total = len(dates)
+    for day, analysis in sentinel.analyse_market_history(
+        market_data,
+        wpm_data,
+        fred_data,
+        housing_data,
+        state,
+        after=after,
+    ):
+        _apply_state_update(state, analysis)
+        snapshot = _snapshot(datetime.combine(day.date(), dt_time.min), analysis)
+        snapshots.append(snapshot)
+        signal_events.extend(
+            (snapshot["date"], item["signal"], item["detail"]) for item in analysis.get("signal_events") or []
+        )
+
+        done = len(snapshots)
+        if checkpoint_path and checkpoint_every > 0 and done % checkpoint_every == 0:
+            chunks += 1
+            _save_checkpoint(
+                checkpoint_path,
+                {
+                    "start": start,
+                    "data_key": _data_key(frames, snapshot["date"]),
+                    "last_date": snapshot["date"],
+                    "state": sentinel.serialize_state(state),
+                    "chunks": chunks,
+                },
+                snapshots[saved_snapshots:],
+                signal_events[saved_events:],
+            )
+            saved_snapshots, saved_events = len(snapshots), len(signal_events)
+        if done % 250 == 0 or done == total:
+            print(f"Backfill {done}/{total}: {snapshot['date']} -> {analysis.get('event')}")
+
+    if not snapshots:
+        return
+
+    # Regime columns: each day sees the stored days before the window and the
+    # backfilled days up to itself, with their regime phases already assigned.
+    risk_window, risk_trend, risk_min, history_limit = _regime_settings()
+    prior_rows = history_store.fetch_history_before(db_path, snapshots[0]["date"], history_limit)
+    regimes = history_store.compute_regime_series(
+        [row.get("phase_score") for row in prior_rows + snapshots],
+        risk_window,
+        risk_trend,
+        risk_min,
+        history_limit=history_limit,
+        prior_phases=[row.get("regime_phase") for row in prior_rows],
+    )
+    for idx, snapshot in enumerate(snapshots):
+        has_score = regimes["regime_phase"][idx] is not None
+        snapshot["regime_phase"] = regimes["regime_phase"][idx]
+        snapshot["regime_score"] = round(float(regimes["regime_score"][idx]), 2) if has_score else None
+        snapshot["regime_trend"] = regimes["regime_trend"][idx]
+        snapshot["regime_confidence"] = regimes["regime_confidence"][idx]
+
+    history_store.write_snapshots(db_path, snapshots, signal_events)
+    if checkpoint_path:
+        _clear_checkpoint(checkpoint_path)
+
+
+def main():
+    days = int(os.environ.get("BACKFILL_DAYS", "365"))
+    start_override = _parse_date(os.environ.get("BACKFILL_START_DATE"))
+    end_override = _parse_date(os.environ.get("BACKFILL_END_DATE"))
+
+    end_date = end_override or datetime.now(timezone.utc)
+    if start_override:
+        start_date = start_override
+    else:
+        start_date = end_date - timedelta(days=days)
+
+    db_path = os.environ.get("HISTORY_DB_PATH", os.path.join("output", "history.db"))
+    retention_days = int(os.environ.get("HISTORY_RETENTION_DAYS", "365"))
+
+    sync_gist = os.environ.get("BACKFILL_SYNC_GIST", "false").lower() == "true"
+    history_load_state = True
+
+    if sync_gist and sentinel.GIST_TOKEN and sentinel.STATE_GIST_ID:
+        history_load_state = history_store.load_db_from_gist(
+            sentinel.GIST_TOKEN,
+            sentinel.STATE_GIST_ID,
+            db_path,
+            os.environ.get("HISTORY_GIST_FILENAME", "history.db.b64"),
+        )
+
+    history_store.ensure_db(db_path)
+
+    market_data, wpm_data, fred_data, housing_data = sentinel.get_data(
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    if market_data.empty:
+        print("No market data available for backfill window.")
+        return
+
+    engine = os.environ.get("BACKFILL_ENGINE", "vectorized").lower()
+    if engine == "loop":
+        backfill_loop(db_path, market_data, wpm_data, fred_data, housing_data)
+    else:
+        backfill_vectorized(
+            db_path,
+            market_data,
+            wpm_data,
+            fred_data,
+            housing_data,
+            checkpoint_path=os.environ.get(
+                "BACKFILL_CHECKPOINT_PATH", os.path.join("output", "cache", "backfill_checkpoint.json")
+            ),
+            checkpoint_every=int(os.environ.get("BACKFILL_CHECKPOINT_DAYS", "250")),
+        )
+
     history_store.prune_history(db_path, retention_days)
 
     if sync_gist and sentinel.GIST_TOKEN and sentinel.STATE_GIST_ID:
@@ -0,0 +1,60 @@
+import os
+import sys
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import data_cache
+import sentinel
+
+
+def _get_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return int(default)
+
+
+def _transitions(history):
+    phases = history["cycle_phase"]
+    changed = phases.ne(phases.shift()) & phases.notna() & phases.shift().notna()
+    return history.loc[changed, ["cycle_phase"]].assign(previous_phase=phases.shift()[changed])
+
+
+def main():
+    start_year = _get_int("CYCLE_BACKTEST_START_YEAR", 1990)
+    output_path = os.environ.get("CYCLE_BACKTEST_PATH", os.path.join("output", "cycle_phase_backtest.csv"))
+
+    print("Fetching FRED Housing Data...")
+    try:
+        housing = data_cache.cached_fred(
+            sentinel.HOUSING_SERIES, datetime(start_year, 1, 1), datetime.now(), sentinel.fetch_fred
+        ).ffill()
+    except Exception as e:
+        print(f"FRED Housing Error: {e}")
+        return
+
+    history = sentinel.cycle_phase_history(housing)
+    if history.empty:
+        print("No housing history available for the cycle backtest.")
+        return
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    history.to_csv(output_path, index_label="date")
+
+    scored = history[history["cycle_phase"].notna()]
+    print(f"Cycle phases saved to {output_path} ({len(scored)} months scored)")
+    print(scored["cycle_phase"].value_counts().to_string())
+
+    transitions = _transitions(history)
+    print(f"\nTransitions: {len(transitions)}")
+    for month, row in transitions.iterrows():
+        print(f"  {month.strftime('%Y-%m')}: {row['previous_phase']} -> {row['cycle_phase']}")
+
+
+if __name__ == "__main__":
+    main()
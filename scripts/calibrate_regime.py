@@ -1,8 +1,10 @@
 import json
+import multiprocessing
 import os
 import sys
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
 import pandas as pd
 import pandas_datareader.data as web
 
@@ -27,13 +29,6 @@ def _get_float(name, default):
         return float(default)
 
 
-def _percentile_rank(values, current_value):
-    if not values:
-        return None
-    count = sum(1 for v in values if v < current_value)
-    return (count / len(values)) * 100
-
-
 def _f1_score(tp, fp, fn):
     if tp == 0:
         return 0.0
@@ -44,34 +39,72 @@ def _f1_score(tp, fp, fn):
     return 2 * precision * recall / (precision + recall)
 
 
-def _best_threshold(values, labels, direction="ge"):
-    if not values:
+OBJECTIVES = {"f1", "precision", "lead_time"}
+
+
+def _threshold_sweep(values, labels, direction="ge", lead_days=None):
+    """
+    Confusion counts of every distinct value used as a threshold, from one
+    sort: predicting value >= threshold ("ge") or value <= threshold ("le")
+    flags everything above (or below) it, so TP/FP are cumulative label
+    counts over the sorted distinct values. Returns the ascending thresholds
+    and per-threshold tp, fp, fn and the summed lead_days of the true
+    positives (zeros without lead_days).
+    """
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels, dtype=float)
+    lead = np.zeros(len(values)) if lead_days is None else np.nan_to_num(np.asarray(lead_days, dtype=float))
+    thresholds, inverse = np.unique(values, return_inverse=True)
+    positives = np.bincount(inverse, weights=labels, minlength=len(thresholds))
+    negatives = np.bincount(inverse, weights=1 - labels, minlength=len(thresholds))
+    leads = np.bincount(inverse, weights=lead * labels, minlength=len(thresholds))
+
+    def cumulative(counts):
+        return counts[::-1].cumsum()[::-1] if direction == "ge" else counts.cumsum()
+
+    tp = cumulative(positives)
+    fp = cumulative(negatives)
+    fn = positives.sum() - tp
+    return thresholds, tp, fp, fn, cumulative(leads)
+
+
+def _best_threshold(values, labels, direction="ge", objective="f1", recall_floor=0.5, precision_floor=0.5, lead_days=None):
+    """
+    Threshold maximising `objective` over every distinct value, in one sorted
+    sweep; ties keep the smallest threshold. Returns (threshold, F1 at it).
+
+    objective: "f1"; "precision" (highest precision with recall >= recall_floor);
+    "lead_time" (longest mean lead_days of the true positives with recall >=
+    recall_floor and precision >= precision_floor). Without any threshold
+    meeting the floors, F1 decides.
+    """
+    pairs = [(v, label) for v, label in zip(values, labels) if v is not None]
+    if not pairs:
         return None, 0.0
 
-    pairs = sorted(zip(values, labels), key=lambda x: x[0])
-    thresholds = sorted({v for v, _ in pairs})
-
-    best_threshold = thresholds[0]
-    best_f1 = 0.0
+    thresholds, tp, fp, fn, leads = _threshold_sweep(
+        [v for v, _ in pairs],
+        [label for _, label in pairs],
+        direction,
+        None if lead_days is None else [lead for v, lead in zip(values, lead_days) if v is not None],
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(tp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(tp > 0, 2 * precision * recall / (precision + recall), 0.0)
+        mean_lead = np.where(tp > 0, leads / tp, 0.0)
 
-    for threshold in thresholds:
-        tp = fp = fn = 0
-        for value, label in pairs:
-            if value is None:
-                continue
-            prediction = value >= threshold if direction == "ge" else value <= threshold
-            if prediction and label:
-                tp += 1
-            elif prediction and not label:
-                fp += 1
-            elif not prediction and label:
-                fn += 1
-        f1 = _f1_score(tp, fp, fn)
-        if f1 > best_f1:
-            best_f1 = f1
-            best_threshold = threshold
+    score = f1
+    eligible = recall >= recall_floor
+    if objective == "lead_time":
+        eligible &= precision >= precision_floor
+    if objective in {"precision", "lead_time"} and eligible.any():
+        score = np.where(eligible, precision if objective == "precision" else mean_lead, -np.inf)
 
-    return best_threshold, best_f1
+    best = int(np.argmax(score))
+    if score[best] <= 0:
+        return float(thresholds[0]), 0.0
+    return float(thresholds[best]), float(f1[best])
 
 
 def _validate_thresholds(phase2_enter, phase2_exit, phase3_enter, phase3_exit):
@@ -86,29 +119,385 @@ def _validate_thresholds(phase2_enter, phase2_exit, phase3_enter, phase3_exit):
     return phase2_enter, phase2_exit, phase3_enter, phase3_exit
 
 
-def _build_labels(usrec_daily, dates, lookahead_days):
-    labels = []
-    for day in dates:
-        start = day + timedelta(days=1)
-        end = day + timedelta(days=lookahead_days)
-        window = usrec_daily.loc[start:end]
-        label = 1 if not window.empty and window.max() >= 1 else 0
-        labels.append(label)
+def _build_label_grid(usrec_daily, dates, horizons):
+    """
+    Recession labels of every date for several lookahead horizons at once:
+    1 when USREC is >= 1 on any day in (date, date + horizon], else 0 (also
+    when that window has no data). Each window is a difference of the
+    running count of recession days, so every horizon costs two searches.
+    Returns {horizon: int array aligned with dates}.
+    """
+    index = usrec_daily.index
+    recession_count = np.concatenate([[0], np.cumsum(usrec_daily.to_numpy() >= 1)])
+    days = pd.DatetimeIndex(dates)
+    starts = index.searchsorted(days + pd.Timedelta(days=1), side="left")
+    labels = {}
+    for horizon in horizons:
+        ends = index.searchsorted(days + pd.Timedelta(days=horizon), side="right")
+        ends = np.maximum(ends, starts)
+        labels[horizon] = (recession_count[ends] > recession_count[starts]).astype(int)
     return labels
 
 
+def _build_labels(usrec_daily, dates, lookahead_days):
+    return _build_label_grid(usrec_daily, dates, [lookahead_days])[lookahead_days].tolist()
+
+
+def _lead_days(usrec_daily, dates):
+    """Days from each date to the next recession day (NaN when none follows)."""
+    recession_days = usrec_daily.index[usrec_daily.to_numpy() >= 1]
+    positions = recession_days.searchsorted(pd.DatetimeIndex(dates), side="right")
+    leads = np.full(len(dates), np.nan)
+    found = positions < len(recession_days)
+    leads[found] = (recession_days[positions[found]] - pd.DatetimeIndex(dates)[found]).days
+    return leads
+
+
+def _regime_samples(dates, scores, window_days, lookback, value_type, min_samples):
+    """
+    Regime value of every day as the live regime computes it, keeping days
+    with a score and at least min_samples scores in the lookback; days whose
+    z-score spread is zero fall back to another method and are skipped.
+    Returns (values, usable mask aligned with dates).
+    """
+    regimes = history_store.compute_regime_series(
+        scores, window_days, 0, 0, method=value_type, lookback_days=lookback
+    )
+    sample_sizes = regimes["regime_samples"]
+    if lookback > 0:
+        sample_sizes = np.minimum(sample_sizes, lookback)
+    usable = (
+        np.array([score is not None for score in scores], dtype=bool)
+        & (sample_sizes >= min_samples)
+        & (regimes["regime_method"] == value_type)
+    )
+    return regimes["regime_value"][usable], usable
+
+
+def _fit_thresholds(values, labels_phase2, labels_phase3, objective="f1", recall_floor=0.5, precision_floor=0.5, lead_days=None):
+    """Enter/exit thresholds of both phases and the F1 of each on the fitted sample."""
+    # Lead time only ranks entries; exits keep F1 under that objective.
+    enter_options = {"objective": objective, "recall_floor": recall_floor}
+    exit_options = {"objective": "f1" if objective == "lead_time" else objective, "recall_floor": recall_floor}
+    if objective == "lead_time":
+        enter_options["precision_floor"] = precision_floor
+        enter_options["lead_days"] = lead_days
+
+    labels_phase2 = np.asarray(labels_phase2)
+    labels_phase3 = np.asarray(labels_phase3)
+    phase2_enter, f1_phase2 = _best_threshold(values, labels_phase2, direction="ge", **enter_options)
+    phase3_enter, f1_phase3 = _best_threshold(values, labels_phase3, direction="ge", **enter_options)
+    phase2_exit, f1_phase2_exit = _best_threshold(values, 1 - labels_phase2, direction="le", **exit_options)
+    phase3_exit, f1_phase3_exit = _best_threshold(values, 1 - labels_phase3, direction="le", **exit_options)
+
+    phase2_enter, phase2_exit, phase3_enter, phase3_exit = _validate_thresholds(
+        phase2_enter,
+        phase2_exit,
+        phase3_enter,
+        phase3_exit,
+    )
+    return {
+        "phase2_enter": phase2_enter,
+        "phase2_exit": phase2_exit,
+        "phase3_enter": phase3_enter,
+        "phase3_exit": phase3_exit,
+        "f1_phase2_enter": f1_phase2,
+        "f1_phase3_enter": f1_phase3,
+        "f1_phase2_exit": f1_phase2_exit,
+        "f1_phase3_exit": f1_phase3_exit,
+    }
+
+
+def _threshold_f1(values, labels, threshold, direction="ge"):
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels, dtype=bool)
+    predicted = values >= threshold if direction == "ge" else values <= threshold
+    tp = int((predicted & labels).sum())
+    fp = int((predicted & ~labels).sum())
+    fn = int((~predicted & labels).sum())
+    return _f1_score(tp, fp, fn)
+
+
+def _calibration_payload(value_type, fitted, window_days, lookback, min_samples, lookahead_phase2, lookahead_phase3,
+                         sample_size, objective, recall_floor, precision_floor):
+    return {
+        "value_type": value_type,
+        "phase2_enter": round(float(fitted["phase2_enter"]), 4),
+        "phase2_exit": round(float(fitted["phase2_exit"]), 4),
+        "phase3_enter": round(float(fitted["phase3_enter"]), 4),
+        "phase3_exit": round(float(fitted["phase3_exit"]), 4),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "lookahead_phase2_days": lookahead_phase2,
+        "lookahead_phase3_days": lookahead_phase3,
+        "window_days": window_days,
+        "lookback_days": lookback,
+        "min_samples": min_samples,
+        "sample_size": sample_size,
+        "f1_phase2_enter": round(fitted["f1_phase2_enter"], 4),
+        "f1_phase3_enter": round(fitted["f1_phase3_enter"], 4),
+        "f1_phase2_exit": round(fitted["f1_phase2_exit"], 4),
+        "f1_phase3_exit": round(fitted["f1_phase3_exit"], 4),
+        "objective": objective,
+        "recall_floor": recall_floor if objective != "f1" else None,
+        "precision_floor": precision_floor if objective == "lead_time" else None,
+        "note": "Thresholds chosen by maximising F1 for recession/no-recession labels."
+        if objective == "f1"
+        else f"Thresholds chosen by maximising {objective} at recall >= {recall_floor} for recession/no-recession labels.",
+    }
+
+
+def _write_payload(output_path, payload):
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2)
+
+    print("Calibration saved to", output_path)
+    print(json.dumps(payload, indent=2))
+
+
+def _fetch_usrec_daily(start_date, end_date):
+    usrec = web.DataReader("USREC", "fred", start_date, end_date).ffill()
+    return usrec.resample("D").ffill()["USREC"]
+
+
+# --- GRID ---
+# Inputs shared with forked grid workers (set by run_grid, read by
+# _evaluate_grid_point).
+_GRID_CONTEXT = {}
+GRID_COLUMNS = [
+    "window_days",
+    "lookback_days",
+    "value_type",
+    "lookahead_phase2_days",
+    "lookahead_phase3_days",
+    "sample_size",
+    "train_size",
+    "test_size",
+    "oos_f1",
+    "oos_f1_phase2_enter",
+    "oos_f1_phase3_enter",
+    "oos_f1_phase2_exit",
+    "oos_f1_phase3_exit",
+    "train_f1",
+    "phase2_enter",
+    "phase2_exit",
+    "phase3_enter",
+    "phase3_exit",
+    "f1_phase2_enter",
+    "f1_phase3_enter",
+    "f1_phase2_exit",
+    "f1_phase3_exit",
+]
+
+
+def _parse_int_list(raw):
+    return [int(item) for item in str(raw).split(",") if item.strip()]
+
+
+def _parse_lookaheads(raw):
+    """"365:180,540:365" -> [(365, 180), (540, 365)] (phase2 days, phase3 days)."""
+    pairs = []
+    for item in str(raw).split(","):
+        if not item.strip():
+            continue
+        phase2, _, phase3 = item.partition(":")
+        pairs.append((int(phase2), int(phase3 or phase2)))
+    return pairs
+
+
+def calibration_grid(windows, lookbacks, value_types, lookaheads):
+    return [
+        {
+            "window_days": window,
+            "lookback_days": lookback,
+            "value_type": value_type,
+            "lookahead_phase2_days": phase2,
+            "lookahead_phase3_days": phase3,
+        }
+        for window in windows
+        for lookback in lookbacks
+        for value_type in value_types
+        for phase2, phase3 in lookaheads
+    ]
+
+
+def _evaluate_grid_point(point):
+    """
+    Fits one grid point on the training dates (days whose lookahead ends
+    before the holdout start), scores it on the held-out dates and refits it
+    on every date for the final thresholds.
+    """
+    ctx = _GRID_CONTEXT
+    if 0 < point["lookback_days"] < ctx["min_samples"]:
+        # The lookback caps every sample below min_samples (run_grid warns).
+        return dict(point, sample_size=0, train_size=0, test_size=0)
+    phase2, phase3 = point["lookahead_phase2_days"], point["lookahead_phase3_days"]
+    values, usable = _regime_samples(
+        ctx["dates"], ctx["scores"], point["window_days"], point["lookback_days"], point["value_type"], ctx["min_samples"]
+    )
+    labels_phase2 = ctx["labels"][phase2][usable]
+    labels_phase3 = ctx["labels"][phase3][usable]
+    lead_days = ctx["lead_days"][usable]
+    days = ctx["days"][usable]
+
+    row = dict(point, sample_size=len(values))
+    test = days >= ctx["holdout_start"]
+    train = days + pd.Timedelta(days=max(phase2, phase3)) < ctx["holdout_start"]
+    row["train_size"] = int(train.sum())
+    row["test_size"] = int(test.sum())
+    if row["train_size"] < ctx["min_samples"] or not row["test_size"]:
+        return row
+
+    options = ctx["options"]
+    fitted = _fit_thresholds(values[train], labels_phase2[train], labels_phase3[train], lead_days=lead_days[train], **options)
+    row["train_f1"] = float(np.mean([fitted[key] for key in ("f1_phase2_enter", "f1_phase3_enter", "f1_phase2_exit", "f1_phase3_exit")]))
+    row["oos_f1_phase2_enter"] = _threshold_f1(values[test], labels_phase2[test], fitted["phase2_enter"], "ge")
+    row["oos_f1_phase3_enter"] = _threshold_f1(values[test], labels_phase3[test], fitted["phase3_enter"], "ge")
+    row["oos_f1_phase2_exit"] = _threshold_f1(values[test], 1 - labels_phase2[test], fitted["phase2_exit"], "le")
+    row["oos_f1_phase3_exit"] = _threshold_f1(values[test], 1 - labels_phase3[test], fitted["phase3_exit"], "le")
+    row["oos_f1"] = float(np.mean([
+        row[key] for key in ("oos_f1_phase2_enter", "oos_f1_phase3_enter", "oos_f1_phase2_exit", "oos_f1_phase3_exit")
+    ]))
+
+    row.update(_fit_thresholds(values, labels_phase2, labels_phase3, lead_days=lead_days, **options))
+    return row
+
+
+def run_grid(dates, scores, usrec_daily, grid, min_samples, holdout_start, options=None, workers=None):
+    """
+    Evaluates every grid point against one USREC series and returns the
+    leaderboard, best out-of-sample F1 first. Labels for every lookahead are
+    built once; with workers > 1 the points fan out over a forked pool.
+    """
+    days = pd.DatetimeIndex(dates)
+    horizons = sorted({point[key] for point in grid for key in ("lookahead_phase2_days", "lookahead_phase3_days")})
+    _GRID_CONTEXT.clear()
+    _GRID_CONTEXT.update({
+        "dates": dates,
+        "scores": scores,
+        "days": days,
+        "labels": _build_label_grid(usrec_daily, days, horizons),
+        "lead_days": _lead_days(usrec_daily, days),
+        "holdout_start": pd.Timestamp(holdout_start),
+        "min_samples": min_samples,
+        "options": options or {},
+    })
+    short = sorted({point["lookback_days"] for point in grid if 0 < point["lookback_days"] < min_samples})
+    if short:
+        print(f"Calibration grid: lookback(s) {', '.join(map(str, short))} hold fewer than "
+              f"min_samples={min_samples} scores; their points can never qualify and are skipped.")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(grid)))
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    print(f"Calibration grid: {len(grid)} point(s) on {workers if can_fork else 1} worker(s)")
+    try:
+        if workers > 1 and can_fork:
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                rows = pool.map(_evaluate_grid_point, grid)
+        else:
+            rows = [_evaluate_grid_point(point) for point in grid]
+    finally:
+        _GRID_CONTEXT.clear()
+
+    leaderboard = pd.DataFrame(rows).reindex(columns=GRID_COLUMNS)
+    return leaderboard.sort_values(
+        ["oos_f1", "train_f1", "sample_size"], ascending=False, na_position="last", kind="stable"
+    ).reset_index(drop=True)
+
+
+def _holdout_start(dates):
+    override = os.environ.get("CALIBRATION_HOLDOUT_START")
+    if override:
+        return pd.Timestamp(override)
+    fraction = min(max(_get_float("CALIBRATION_HOLDOUT_FRACTION", 0.3), 0.0), 1.0)
+    return pd.Timestamp(dates[min(len(dates) - 1, int(len(dates) * (1 - fraction)))])
+
+
+def main_grid(history, output_path, min_samples, objective, recall_floor, precision_floor):
+    dates = [datetime.strptime(row["date"], "%Y-%m-%d") for row in history]
+    scores = [row.get("phase_score") for row in history]
+    grid = calibration_grid(
+        _parse_int_list(os.environ.get("CALIBRATION_GRID_WINDOWS", "7,14,21,30")),
+        _parse_int_list(os.environ.get("CALIBRATION_GRID_LOOKBACKS", "180,365")),
+        [v.strip().lower() for v in os.environ.get("CALIBRATION_GRID_VALUE_TYPES", "percentile,zscore,absolute").split(",") if v.strip()],
+        _parse_lookaheads(os.environ.get("CALIBRATION_GRID_LOOKAHEADS", "365:180,540:365,180:90")),
+    )
+    invalid = {point["value_type"] for point in grid} - {"percentile", "zscore", "absolute"}
+    if invalid or not grid:
+        print("Invalid calibration grid; value types must be percentile, zscore, or absolute.")
+        return
+
+    max_lookahead = max(max(point["lookahead_phase2_days"], point["lookahead_phase3_days"]) for point in grid)
+    usrec_daily = _fetch_usrec_daily(min(dates), max(dates) + timedelta(days=max_lookahead))
+    holdout_start = _holdout_start(dates)
+    leaderboard = run_grid(
+        dates,
+        scores,
+        usrec_daily,
+        grid,
+        min_samples,
+        holdout_start,
+        options={"objective": objective, "recall_floor": recall_floor, "precision_floor": precision_floor},
+        workers=_get_int("CALIBRATION_WORKERS", os.cpu_count() or 1),
+    )
+
+    leaderboard_path = os.environ.get(
+        "CALIBRATION_LEADERBOARD_PATH", os.path.join("output", "regime_calibration_leaderboard.csv")
+    )
+    leaderboard_dir = os.path.dirname(leaderboard_path)
+    if leaderboard_dir:
+        os.makedirs(leaderboard_dir, exist_ok=True)
+    leaderboard.to_csv(leaderboard_path, index=False)
+    print("Calibration leaderboard saved to", leaderboard_path)
+
+    if leaderboard.empty or pd.isna(leaderboard.loc[0, "oos_f1"]):
+        print("No grid point had enough training and held-out samples.")
+        return
+
+    best = leaderboard.iloc[0]
+    payload = _calibration_payload(
+        best["value_type"],
+        best,
+        int(best["window_days"]),
+        int(best["lookback_days"]),
+        min_samples,
+        int(best["lookahead_phase2_days"]),
+        int(best["lookahead_phase3_days"]),
+        int(best["sample_size"]),
+        objective,
+        recall_floor,
+        precision_floor,
+    )
+    payload.update({
+        "holdout_start": holdout_start.strftime("%Y-%m-%d"),
+        "oos_f1": round(float(best["oos_f1"]), 4),
+        "grid_size": len(grid),
+    })
+    _write_payload(output_path, payload)
+
+
 def main():
     db_path = os.environ.get("HISTORY_DB_PATH", os.path.join("output", "history.db"))
     output_path = os.environ.get("REGIME_CALIBRATION_PATH", os.path.join("output", "regime_calibration.json"))
+    min_samples = _get_int("CALIBRATION_MIN_SAMPLES", 120)
+
+    objective = os.environ.get("CALIBRATION_OBJECTIVE", "f1").lower()
+    if objective not in OBJECTIVES:
+        print("Invalid CALIBRATION_OBJECTIVE; use f1, precision, or lead_time.")
+        return
+    recall_floor = _get_float("CALIBRATION_RECALL_FLOOR", 0.5)
+    precision_floor = _get_float("CALIBRATION_PRECISION_FLOOR", 0.5)
 
+    grid_mode = os.environ.get("CALIBRATION_GRID", "false").lower() == "true"
     value_type = os.environ.get("CALIBRATION_VALUE_TYPE", "percentile").lower()
-    if value_type not in {"percentile", "zscore", "absolute"}:
+    if not grid_mode and value_type not in {"percentile", "zscore", "absolute"}:
         print("Invalid CALIBRATION_VALUE_TYPE; use percentile, zscore, or absolute.")
         return
 
     window_days = _get_int("REGIME_WINDOW_DAYS", 14)
     lookback = _get_int("REGIME_PCT_LOOKBACK", 180) if value_type == "percentile" else _get_int("REGIME_Z_LOOKBACK", 180)
-    min_samples = _get_int("CALIBRATION_MIN_SAMPLES", 120)
 
     lookahead_phase2 = _get_int("CALIBRATION_LOOKAHEAD_PHASE2_DAYS", 365)
     lookahead_phase3 = _get_int("CALIBRATION_LOOKAHEAD_PHASE3_DAYS", 180)
@@ -118,43 +507,14 @@ def main():
         print("No history available for calibration.")
         return
 
+    if grid_mode:
+        main_grid(history, output_path, min_samples, objective, recall_floor, precision_floor)
+        return
+
     dates = [datetime.strptime(row["date"], "%Y-%m-%d") for row in history]
     scores = [row.get("phase_score") for row in history]
-
-    regime_scores = []
-    regime_values = []
-    usable_dates = []
-
-    for idx, score in enumerate(scores):
-        if score is None:
-            continue
-
-        start = max(0, idx - window_days + 1)
-        window_scores = [s for s in scores[start:idx + 1] if s is not None]
-        if not window_scores:
-            continue
-        regime_score = sum(window_scores) / len(window_scores)
-
-        sample_start = max(0, idx - lookback + 1)
-        sample = [s for s in scores[sample_start:idx + 1] if s is not None]
-        if len(sample) < min_samples:
-            continue
-
-        if value_type == "percentile":
-            regime_value = _percentile_rank(sample, regime_score)
-        elif value_type == "zscore":
-            mean = sum(sample) / len(sample)
-            variance = sum((x - mean) ** 2 for x in sample) / len(sample)
-            std = variance ** 0.5
-            if std == 0:
-                continue
-            regime_value = (regime_score - mean) / std
-        else:
-            regime_value = regime_score
-
-        regime_scores.append(regime_score)
-        regime_values.append(regime_value)
-        usable_dates.append(dates[idx])
+    regime_values, usable = _regime_samples(dates, scores, window_days, lookback, value_type, min_samples)
+    usable_dates = [day for day, keep in zip(dates, usable) if keep]
 
     if len(regime_values) < min_samples:
         print("Not enough samples for calibration after filtering.")
@@ -162,54 +522,33 @@ def main():
 
     start_date = min(usable_dates)
     end_date = max(usable_dates) + timedelta(days=max(lookahead_phase2, lookahead_phase3))
-
-    usrec = web.DataReader("USREC", "fred", start_date, end_date).ffill()
-    usrec_daily = usrec.resample("D").ffill()["USREC"]
-
-    labels_phase2 = _build_labels(usrec_daily, usable_dates, lookahead_phase2)
-    labels_phase3 = _build_labels(usrec_daily, usable_dates, lookahead_phase3)
-
-    phase2_enter, f1_phase2 = _best_threshold(regime_values, labels_phase2, direction="ge")
-    phase3_enter, f1_phase3 = _best_threshold(regime_values, labels_phase3, direction="ge")
-
-    phase2_exit, f1_phase2_exit = _best_threshold(regime_values, [1 - v for v in labels_phase2], direction="le")
-    phase3_exit, f1_phase3_exit = _best_threshold(regime_values, [1 - v for v in labels_phase3], direction="le")
-
-    phase2_enter, phase2_exit, phase3_enter, phase3_exit = _validate_thresholds(
-        phase2_enter,
-        phase2_exit,
-        phase3_enter,
-        phase3_exit,
+    usrec_daily = _fetch_usrec_daily(start_date, end_date)
+
+    label_grid = _build_label_grid(usrec_daily, usable_dates, {lookahead_phase2, lookahead_phase3})
+    fitted = _fit_thresholds(
+        regime_values,
+        label_grid[lookahead_phase2],
+        label_grid[lookahead_phase3],
+        objective=objective,
+        recall_floor=recall_floor,
+        precision_floor=precision_floor,
+        lead_days=_lead_days(usrec_daily, usable_dates) if objective == "lead_time" else None,
     )
 
-    payload = {
-        "value_type": value_type,
-        "phase2_enter": round(float(phase2_enter), 4),
-        "phase2_exit": round(float(phase2_exit), 4),
-        "phase3_enter": round(float(phase3_enter), 4),
-        "phase3_exit": round(float(phase3_exit), 4),
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "lookahead_phase2_days": lookahead_phase2,
-        "lookahead_phase3_days": lookahead_phase3,
-        "window_days": window_days,
-        "lookback_days": lookback,
-        "min_samples": min_samples,
-        "sample_size": len(regime_values),
-        "f1_phase2_enter": round(f1_phase2, 4),
-        "f1_phase3_enter": round(f1_phase3, 4),
-        "f1_phase2_exit": round(f1_phase2_exit, 4),
-        "f1_phase3_exit": round(f1_phase3_exit, 4),
-        "note": "Thresholds chosen by maximising F1 for recession/no-recession labels.",
-    }
-
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-
-    print("Calibration saved to", output_path)
-    print(json.dumps(payload, indent=2))
+    payload = _calibration_payload(
+        value_type,
+        fitted,
+        window_days,
+        lookback,
+        min_samples,
+        lookahead_phase2,
+        lookahead_phase3,
+        len(regime_values),
+        objective,
+        recall_floor,
+        precision_floor,
+    )
+    _write_payload(output_path, payload)
 
 
 if __name__ == "__main__":
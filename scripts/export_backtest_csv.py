@@ -0,0 +1,24 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import results_store
+
+
+def main():
+    tag = os.environ.get("BACKTEST_TAG")
+    suffix = f"_{tag}" if tag else ""
+    output_path = os.environ.get("BACKTEST_CSV_PATH", os.path.join("output", f"maximalist_backtest{suffix}.csv"))
+
+    path = results_store.export_csv(output_path, tag)
+    if path is None:
+        print(f"No stored backtest results in {results_store.get_results_dir()}. Run `python backtest.py` first.")
+        return
+    print(f"Backtest results exported to {path}")
+
+
+if __name__ == "__main__":
+    main()
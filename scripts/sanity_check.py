@@ -1,6 +1,11 @@
+import os
 import sys
-from pathlib import Path
-import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import results_store
 
 REQUIRED_COLUMNS = {
     "Date",
@@ -29,13 +34,13 @@ def warn(msg):
 
 
 def main():
-    csv_path = Path("output/maximalist_backtest.csv")
-    if not csv_path.exists():
-        fail("output/maximalist_backtest.csv not found. Run `python backtest.py` first.")
+    tag = os.environ.get("BACKTEST_TAG")
+    if not results_store.list_events(tag):
+        fail(f"No stored backtest results in {results_store.get_results_dir()}. Run `python backtest.py` first.")
 
-    df = pd.read_csv(csv_path)
+    df = results_store.load_results(tag)
     if df.empty:
-        fail("Backtest CSV is empty.")
+        fail("Stored backtest results are empty.")
 
     missing = REQUIRED_COLUMNS - set(df.columns)
     if missing:
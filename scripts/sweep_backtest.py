@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import backtest
+
+DEFAULT_GRID = {
+    "vix_ceiling": [12.0, 13.0, 14.0, 15.0],
+    "spread_threshold": [4.5, 5.0, 5.5],
+}
+
+
+def _get_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return int(default)
+
+
+def load_grid(raw):
+    """SWEEP_GRID may hold inline JSON or the path of a JSON file."""
+    if not raw:
+        return DEFAULT_GRID
+    if os.path.exists(raw):
+        with open(raw, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    return json.loads(raw)
+
+
+def main():
+    output_path = os.environ.get("SWEEP_OUTPUT_PATH", os.path.join("output", "parameter_sweep.csv"))
+    workers = _get_int("SWEEP_WORKERS", os.cpu_count() or 1)
+    try:
+        grid = load_grid(os.environ.get("SWEEP_GRID"))
+    except (OSError, ValueError) as e:
+        print(f"Invalid SWEEP_GRID: {e}")
+        return
+
+    market_df, fred_df, housing_df = backtest.fetch_historical_data()
+    if market_df is None or market_df.empty:
+        print("No market data available for the sweep.")
+        return
+
+    try:
+        table = backtest.run_parameter_sweep(market_df, fred_df, housing_df, grid, workers=workers)
+    except ValueError as e:
+        print(f"Invalid SWEEP_GRID: {e}")
+        return
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    table.to_csv(output_path, index=False)
+    print(f"Parameter sweep saved to {output_path} ({len(table)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+import bisect
 import html
 import json
 import os
 import re
+import threading
 import time
 from datetime import datetime, timedelta, timezone
 
@@ -11,7 +13,11 @@ import requests
 import yfinance as yf
 from google import genai
 
+import data_cache
 import history_store
+import indicators
+import rolling_stats
+from indicators import normalize_tnx
 from telegram_format import sanitize_telegram_html
 
 # --- CONFIGURATION ---
@@ -47,6 +53,8 @@ HISTORY_RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", "365"))
 RISK_WINDOW_DAYS = int(os.environ.get("RISK_WINDOW_DAYS", os.environ.get("REGIME_WINDOW_DAYS", "14")))
 RISK_TREND_DAYS = int(os.environ.get("RISK_TREND_DAYS", os.environ.get("REGIME_TREND_DAYS", "7")))
 RISK_MIN_DAYS = int(os.environ.get("RISK_MIN_DAYS", os.environ.get("REGIME_MIN_DAYS", "7")))
+FETCH_DEADLINE_SECONDS = float(os.environ.get("FETCH_DEADLINE_SECONDS", "300"))
+HEDGED_FALLBACKS = os.environ.get("HEDGED_FALLBACKS", "true").strip().lower() not in {"0", "false", "no", "off"}
 CYCLE_LOOKBACK_DAYS = int(os.environ.get("CYCLE_LOOKBACK_DAYS", str(365 * 10)))
 CYCLE_TREND_MONTHS = int(os.environ.get("CYCLE_TREND_MONTHS", "12"))
 CYCLE_STARTS_Z_MONTHS = int(os.environ.get("CYCLE_STARTS_Z_MONTHS", "60"))
@@ -209,6 +217,8 @@ def load_state():
         else:
             for key in default_state["recent_signals"]:
                 state["recent_signals"].setdefault(key, [])
+        # Held in memory as sorted day ordinals; save_state writes dates back
+        normalize_recent_signals(state)
 
         # Ensure daily_alerts exists and is for today (reset if new day)
         today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
@@ -244,7 +254,7 @@ def save_state(state):
         payload = {
             "files": {
                 "state.json": {
-                    "content": json.dumps(state, indent=2)
+                    "content": json.dumps(serialize_state(state), indent=2)
                 }
             }
         }
@@ -261,6 +271,61 @@ def save_state(state):
         print(f"State save error: {e}")
 
 
+# --- SIGNAL HISTORY ---
+# recent_signals values are sorted, de-duplicated date.toordinal() ints in
+# memory and "YYYY-MM-DD" strings in the saved state.
+def _signal_ordinals(values):
+    ordinals = set()
+    for value in values or []:
+        if isinstance(value, int):
+            ordinals.add(value)
+            continue
+        try:
+            ordinals.add(datetime.strptime(str(value), "%Y-%m-%d").toordinal())
+        except ValueError:
+            continue
+    return sorted(ordinals)
+
+
+def _day_ordinal(current_date):
+    if current_date.tzinfo is not None:
+        current_date = current_date.replace(tzinfo=None)
+    return current_date.toordinal()
+
+
+def normalize_recent_signals(state):
+    """Converts stored recent_signals dates to sorted day ordinals (in place)."""
+    signals = state.get("recent_signals")
+    if not signals:
+        return
+    for signal_name, values in signals.items():
+        if not all(isinstance(v, int) for v in values) or any(b <= a for a, b in zip(values, values[1:])):
+            signals[signal_name] = _signal_ordinals(values)
+
+
+def _signal_days(state, signal_name):
+    signals = state.get("recent_signals") or {}
+    values = signals.get(signal_name) or []
+    if values and not all(isinstance(v, int) for v in values):
+        normalize_recent_signals(state)
+        values = signals.get(signal_name) or []
+    return values
+
+
+def serialize_state(state):
+    """Copy of state with recent_signals written back as YYYY-MM-DD strings."""
+    if "recent_signals" not in state:
+        return state
+    serialized = dict(state)
+    serialized["recent_signals"] = {
+        signal_name: [
+            datetime.fromordinal(v).strftime("%Y-%m-%d") for v in _signal_ordinals(values)
+        ]
+        for signal_name, values in state["recent_signals"].items()
+    }
+    return serialized
+
+
 def clean_old_signals(state, current_date, window_days=30):
     """
     Removes signals older than window_days from recent_signals tracking.
@@ -268,52 +333,49 @@ def clean_old_signals(state, current_date, window_days=30):
     if "recent_signals" not in state:
         return
 
-    if current_date.tzinfo is not None:
-        current_date = current_date.replace(tzinfo=None)
-    current_day = current_date.date()
-
-    for signal_name in state["recent_signals"]:
-        # Filter out dates older than window_days
-        state["recent_signals"][signal_name] = [
-            date_str for date_str in state["recent_signals"][signal_name]
-            if (current_day - datetime.strptime(date_str, "%Y-%m-%d").date()).days <= window_days
-        ]
+    cutoff = _day_ordinal(current_date) - window_days
+    for signal_name in list(state["recent_signals"]):
+        days = _signal_days(state, signal_name)
+        state["recent_signals"][signal_name] = days[bisect.bisect_left(days, cutoff):]
 
 
-def check_temporal_combo(state, signal_a, signal_b, window_days=30):
+def check_temporal_combo(state, signal_a, signal_b, window_days=30, db_path=None, as_of=None):
     """
     Checks if both signal_a and signal_b have fired within the last window_days.
     Returns True if combo detected.
+    With db_path, the signal_events table in the history DB is checked as well
+    (both signals within [as_of - window_days, as_of]).
     """
-    if "recent_signals" not in state:
+    if _state_temporal_combo(state, signal_a, signal_b, window_days):
+        return True
+    if not db_path:
+        return False
+    as_of = as_of or datetime.now(timezone.utc)
+    try:
+        return history_store.signal_combo_in_window(
+            db_path, signal_a, signal_b, as_of.strftime("%Y-%m-%d"), window_days
+        )
+    except Exception as e:
+        print(f"Signal history query error: {e}")
         return False
 
-    dates_a = state["recent_signals"].get(signal_a, [])
-    dates_b = state["recent_signals"].get(signal_b, [])
 
-    if not dates_a or not dates_b:
+def _state_temporal_combo(state, signal_a, signal_b, window_days):
+    if "recent_signals" not in state:
         return False
 
-    parsed_a = []
-    parsed_b = []
-    for date_str in dates_a:
-        try:
-            parsed_a.append(datetime.strptime(date_str, "%Y-%m-%d").date())
-        except ValueError:
-            continue
-    for date_str in dates_b:
-        try:
-            parsed_b.append(datetime.strptime(date_str, "%Y-%m-%d").date())
-        except ValueError:
-            continue
-
-    if not parsed_a or not parsed_b:
+    days_a = _signal_days(state, signal_a)
+    days_b = _signal_days(state, signal_b)
+    if not days_a or not days_b:
         return False
 
-    for day_a in parsed_a:
-        for day_b in parsed_b:
-            if abs((day_a - day_b).days) <= window_days:
-                return True
+    # Binary-search the longer list for each day of the shorter one
+    if len(days_a) > len(days_b):
+        days_a, days_b = days_b, days_a
+    for day in days_a:
+        pos = bisect.bisect_left(days_b, day - window_days)
+        if pos < len(days_b) and days_b[pos] <= day + window_days:
+            return True
     return False
 
 
@@ -333,12 +395,12 @@ def add_signal_to_history(state, signal_name, current_date):
             "FLASH_MOVE": []
         }
 
-    if signal_name not in state["recent_signals"]:
-        state["recent_signals"][signal_name] = []
-
-    date_str = current_date.strftime("%Y-%m-%d")
-    if date_str not in state["recent_signals"][signal_name]:
-        state["recent_signals"][signal_name].append(date_str)
+    days = _signal_days(state, signal_name)
+    state["recent_signals"][signal_name] = days
+    day = _day_ordinal(current_date)
+    pos = bisect.bisect_left(days, day)
+    if pos == len(days) or days[pos] != day:
+        days.insert(pos, day)
 
 
 def get_macro_event(date):
@@ -463,6 +525,12 @@ def collect_stale_data(df, fred_df, housing_df, end_date):
 
 
 # --- DATA FETCHING ---
+# yf.download keeps module-level state (shared._DFS) and is not thread-safe,
+# so Yahoo calls are serialised while FRED sources run alongside them.
+_YAHOO_LOCK = threading.Lock()
+LAST_FETCH_REPORT = []
+
+
 def download_with_backoff(tickers, start, end, retries=3):
     """
     Downloads data with exponential backoff (5s, 15s, 30s) to handle API hiccups.
@@ -470,7 +538,8 @@ def download_with_backoff(tickers, start, end, retries=3):
     delays = [5, 15, 30]
     for i in range(retries + 1):
         try:
-            df = yf.download(tickers, start=start, end=end, progress=False)
+            with _YAHOO_LOCK:
+                df = yf.download(tickers, start=start, end=end, progress=False)
             if not df.empty:
                 return df
         except Exception as e:
@@ -482,233 +551,233 @@ def download_with_backoff(tickers, start, end, retries=3):
             time.sleep(wait)
     return pd.DataFrame()
 
-def normalize_tnx(series):
-    """
-    Normalize ^TNX units if Yahoo returns yield * 10.
-    Heuristic: if median > 20, assume scaled and divide by 10.
-    """
-    if series is None or series.empty:
-        return series
-    median_val = series.median(skipna=True)
-    if pd.notna(median_val) and median_val > 20:
-        return series / 10.0
-    return series
+def fetch_fred(series, start, end):
+    """Raw FRED download; get_data routes it through the local data cache."""
+    return web.DataReader(series, "fred", start, end)
 
 
-def get_data(start_date=None, end_date=None):
+def run_fetch_stage(sources, deadline_seconds=None):
     """
-    Fetches market data from Yahoo Finance and macro data from FRED.
-    Returns close prices, WPM full OHLCV, and FRED macro indicators.
-    Implements retry logic and SPY fallback for SPX outages.
+    Runs independent fetch callables concurrently under one overall deadline.
 
-    Note: Fetches 365 days (250+ trading days) to support adaptive thresholds.
-    """
-    cache_dir = os.environ.get("YFINANCE_CACHE_DIR", "/tmp/yfinance-cache")
-    try:
-        yf.set_tz_cache_location(cache_dir)
-    except Exception as e:
-        print(f"YFinance cache setup warning: {e}")
-
-    end_date = end_date or datetime.now(timezone.utc)
-    if end_date.tzinfo is not None:
-        end_date = end_date.replace(tzinfo=None)
-    start_date = start_date or (end_date - timedelta(days=365))
-
-    print("Fetching Market Data...")
-
-    tickers = [
-        "^TNX",       # 10 Year Treasury Yield
-        "^SPX",       # S&P 500 Index
-        "^VIX",       # Volatility Index
-        "CL=F",       # Crude Oil Futures
-        "GC=F",       # Gold Futures
-        "SI=F",       # Silver Futures
-        "HG=F",       # Copper Futures
-        "HRC=F",      # Steel (Hot Rolled Coil) Futures
-        "ITA",        # Aerospace & Defense ETF
-        "DX-Y.NYB",   # US Dollar Index
-        "WPM",        # Wheaton Precious Metals
-        "BTC-USD",    # Bitcoin
-    ]
+    Args:
+        sources: dict of name -> zero-argument callable returning a DataFrame
 
-    # Primary Download with Retry
-    raw_data = download_with_backoff(tickers, start_date, end_date)
-    raw_data = raw_data.ffill()
+    Returns:
+        (results, report): results maps name -> DataFrame (empty on error/timeout);
+        report lists {source, status, seconds, rows} per source.
+    """
+    deadline_seconds = FETCH_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    outcomes = {}
 
-    # Handle MultiIndex vs Single Level
-    if not raw_data.empty:
-        if isinstance(raw_data.columns, pd.MultiIndex):
-            data = raw_data['Close'].copy()
+    def worker(name, func):
+        started = time.monotonic()
+        try:
+            frame = func()
+            status = "ok" if frame is not None and not frame.empty else "empty"
+        except Exception as e:
+            print(f"{name} fetch error: {e}")
+            frame, status = pd.DataFrame(), "error"
+        outcomes[name] = (frame, status, time.monotonic() - started)
+
+    stage_start = time.monotonic()
+    threads = []
+    for name, func in sources.items():
+        thread = threading.Thread(target=worker, args=(name, func), name=f"fetch-{name}", daemon=True)
+        thread.start()
+        threads.append((name, thread))
+    for _, thread in threads:
+        thread.join(max(0.0, deadline_seconds - (time.monotonic() - stage_start)))
+
+    results = {}
+    report = []
+    for name, _ in threads:
+        if name in outcomes:
+            frame, status, seconds = outcomes[name]
         else:
-            data = raw_data.copy()
-    else:
-        data = pd.DataFrame()
+            frame, status, seconds = pd.DataFrame(), "timeout", time.monotonic() - stage_start
+        frame = frame if frame is not None else pd.DataFrame()
+        results[name] = frame
+        report.append({"source": name, "status": status, "seconds": round(seconds, 2), "rows": int(len(frame))})
+
+    summary = " | ".join(f"{r['source']} {r['status']} {r['seconds']:.1f}s ({r['rows']} rows)" for r in report)
+    print(f"Fetch stage ({time.monotonic() - stage_start:.1f}s): {summary}")
+    return results, report
+
+
+MARKET_TICKERS = [
+    "^TNX",       # 10 Year Treasury Yield
+    "^SPX",       # S&P 500 Index
+    "^VIX",       # Volatility Index
+    "CL=F",       # Crude Oil Futures
+    "GC=F",       # Gold Futures
+    "SI=F",       # Silver Futures
+    "HG=F",       # Copper Futures
+    "HRC=F",      # Steel (Hot Rolled Coil) Futures
+    "ITA",        # Aerospace & Defense ETF
+    "DX-Y.NYB",   # US Dollar Index
+    "WPM",        # Wheaton Precious Metals
+    "BTC-USD",    # Bitcoin
+]
+
+# (target, backup, name) proxies for critical sensors
+MARKET_FALLBACKS = [
+    ("^SPX", "SPY", "S&P 500"),        # SPY ETF as proxy for Index
+    ("BTC-USD", "BTC=F", "Bitcoin"),   # Futures as proxy for Spot
+    ("CL=F", "BZ=F", "Crude Oil"),     # Brent as proxy for WTI
+    ("^TNX", "^TYX", "10Y Yield"),     # 30Y Yield as proxy for 10Y
+    ("^VIX", "^VXO", "VIX"),           # VXO (OEX Vol) as proxy for VIX
+    ("GC=F", "GLD", "Gold"),           # ETF as proxy
+    ("SI=F", "SLV", "Silver"),         # ETF as proxy
+    ("HG=F", "CPER", "Copper"),        # ETF as proxy
+    ("HRC=F", "SLX", "Steel"),         # ETF as proxy
+    ("ITA", "XAR", "Defense"),         # ETF as proxy
+]
+FRED_SERIES = ["BAMLH0A0HYM2", "RRPONTSYD", "WALCL", "WTREGEN", "ICSA", "SOFR", "DFF"]
+HOUSING_SERIES = ["HOUST", "MORTGAGE30US", "CSUSHPINSA", "DRSFRMACBS"]
+
+
+def _fetch_market_ohlcv(start_date, end_date):
+    """
+    Primary Yahoo batch, kept with every OHLCV field. In hedged mode the
+    fallback symbols ride along in the same batch, so a missing sensor is
+    replaced from data already in hand instead of a new download (and its
+    backoff sleeps) after the primary has failed. A sensor missing from the
+    batch without its backup (or any sensor, in sequential mode) triggers one
+    backup download, merged into the same frame.
+    """
+    print("Fetching Market Data...")
+    batch = list(MARKET_TICKERS)
+    if HEDGED_FALLBACKS:
+        batch += [backup for _, backup, _ in MARKET_FALLBACKS if backup not in batch]
+
+    # Primary Download with Retry (only the tail missing from the local cache)
+    raw_data = data_cache.cached_yahoo_download(batch, start_date, end_date, download_with_backoff)
+
+    closes = ohlcv_field(raw_data, "Close")
+    available = {t for t in closes.columns if not closes[t].dropna().empty}
+    backups = []
+    for target, backup, name in MARKET_FALLBACKS:
+        if target in available or (HEDGED_FALLBACKS and backup in available):
+            continue
+        # Neither sensor came back (e.g. the whole hedged batch failed):
+        # fetch the backup on its own, as in sequential mode.
+        print(f"⚠️ WARNING: {target} ({name}) missing. Attempting fallback to {backup}...")
+        backup_data = data_cache.cached_yahoo_download([backup], start_date, end_date, download_with_backoff)
+        if not backup_data.empty:
+            backups.append(backup_data)
+    if backups:
+        raw_data = pd.concat([raw_data] + backups, axis=1)
+    return raw_data
+
+
+def ohlcv_field(raw_data, field="Close"):
+    """One OHLCV field (Close, Volume, High, ...) for every ticker of a Yahoo batch."""
+    if raw_data is None or raw_data.empty:
+        return pd.DataFrame()
+    if isinstance(raw_data.columns, pd.MultiIndex):
+        if field not in raw_data.columns.get_level_values(0):
+            return pd.DataFrame()
+        return raw_data[field]
+    return raw_data
+
+
+def ticker_ohlcv(raw_data, ticker):
+    """Full OHLCV frame for one ticker of a Yahoo batch, on that ticker's own trading days."""
+    if raw_data is None or raw_data.empty or not isinstance(raw_data.columns, pd.MultiIndex):
+        return pd.DataFrame()
+    if ticker not in raw_data.columns.get_level_values(1):
+        return pd.DataFrame()
+    frame = raw_data.xs(ticker, axis=1, level=1).dropna(how="all")
+    return frame.ffill()
+
+
+def market_closes(raw_data):
+    """Close-price frame of the primary sensors, with proxy fallbacks injected where missing."""
+    closes = ohlcv_field(raw_data, "Close").ffill()
+    data = closes[[t for t in closes.columns if t in MARKET_TICKERS]].copy()
 
     # Normalize TNX unit scale if needed
     if "^TNX" in data.columns:
         data["^TNX"] = normalize_tnx(data["^TNX"])
 
     # --- FALLBACK SYSTEM ---
-    def process_fallback(target, backup, name):
-        """Checks if target is missing and tries to fetch backup."""
-        is_missing = True
+    for target, backup, name in MARKET_FALLBACKS:
         if target in data.columns and not data[target].dropna().empty:
-            is_missing = False
-        
-        if is_missing:
-            print(f"⚠️ WARNING: {target} ({name}) missing. Attempting fallback to {backup}...")
-            backup_data = download_with_backoff([backup], start_date, end_date)
-            
-            if not backup_data.empty:
-                # Extract Close series safely
-                if isinstance(backup_data.columns, pd.MultiIndex):
-                    # Try to find 'Close' -> 'Ticker'
-                    if 'Close' in backup_data.columns and backup in backup_data['Close'].columns:
-                        series = backup_data['Close'][backup]
-                    else:
-                        series = backup_data.iloc[:, 0] # Best guess
-                elif 'Close' in backup_data.columns:
-                    series = backup_data['Close']
-                else:
-                    series = backup_data.iloc[:, 0]
-                
-                # Inject into main dataframe
-                data[target] = series
-                print(f"✅ FALLBACK SUCCESS: {backup} injected as {target} proxy.")
-            else:
-                print(f"❌ FALLBACK FAILED: {backup} also unavailable.")
-
-    # Apply Fallbacks for Critical Sensors
-    process_fallback("^SPX", "SPY", "S&P 500")        # SPY ETF as proxy for Index
-    process_fallback("BTC-USD", "BTC=F", "Bitcoin")   # Futures as proxy for Spot
-    process_fallback("CL=F", "BZ=F", "Crude Oil")     # Brent as proxy for WTI
-    process_fallback("^TNX", "^TYX", "10Y Yield")     # 30Y Yield as proxy for 10Y
-    process_fallback("^VIX", "^VXO", "VIX")           # VXO (OEX Vol) as proxy for VIX
-    process_fallback("GC=F", "GLD", "Gold")           # ETF as proxy
-    process_fallback("SI=F", "SLV", "Silver")         # ETF as proxy
-    process_fallback("HG=F", "CPER", "Copper")        # ETF as proxy
-    process_fallback("HRC=F", "SLX", "Steel")         # ETF as proxy
-    process_fallback("ITA", "XAR", "Defense")         # ETF as proxy
-
-    # Fetch WPM separately for Volume data with RETRY logic
-    try:
-        wpm_raw = download_with_backoff(["WPM"], start_date, end_date)
-        wpm_raw = wpm_raw.ffill()
-        if isinstance(wpm_raw.columns, pd.MultiIndex):
-            wpm_full = wpm_raw.droplevel(1, axis=1)
+            continue
+        if HEDGED_FALLBACKS:
+            print(f"⚠️ WARNING: {target} ({name}) missing. Using hedged fallback {backup}...")
+        if backup in closes.columns and not closes[backup].dropna().empty:
+            # Inject into main dataframe
+            data[target] = closes[backup]
+            print(f"✅ FALLBACK SUCCESS: {backup} injected as {target} proxy.")
         else:
-            wpm_full = wpm_raw
-    except Exception as e:
-        print(f"WPM Download Error: {e}")
-        wpm_full = pd.DataFrame()
+            print(f"❌ FALLBACK FAILED: {backup} also unavailable.")
+
+    return data
 
-    # FRED Data (Macro Plumbing)
+
+def _fetch_fred_macro(start_date, end_date):
+    """FRED Data (Macro Plumbing)."""
     print("Fetching FRED Data...")
     try:
-        fred_data = web.DataReader(
-            ["BAMLH0A0HYM2", "RRPONTSYD", "WALCL", "WTREGEN", "ICSA", "SOFR", "DFF"],
-            "fred",
-            start_date,
-            end_date,
-        )
-        fred_data = fred_data.ffill()
+        fred_data = data_cache.cached_fred(FRED_SERIES, start_date, end_date, fetch_fred)
+        return fred_data.ffill()
     except Exception as e:
         print(f"FRED Error: {e}")
-        fred_data = pd.DataFrame()
+        return pd.DataFrame()
+
 
-    # FRED Housing Data (longer lookback needed for monthly/quarterly series)
+def _fetch_fred_housing(start_date, end_date):
+    """FRED Housing Data (longer lookback needed for monthly/quarterly series)."""
     print("Fetching FRED Housing Data...")
-    if start_date:
-        housing_start = start_date - timedelta(days=CYCLE_LOOKBACK_DAYS)
-    else:
-        housing_start = end_date - timedelta(days=CYCLE_LOOKBACK_DAYS)
+    housing_start = start_date - timedelta(days=CYCLE_LOOKBACK_DAYS)
     try:
-        housing_data = web.DataReader(
-            ["HOUST", "MORTGAGE30US", "CSUSHPINSA", "DRSFRMACBS"],
-            "fred",
-            housing_start,
-            end_date,
-        )
-        housing_data = housing_data.ffill()
+        housing_data = data_cache.cached_fred(HOUSING_SERIES, housing_start, end_date, fetch_fred)
+        return housing_data.ffill()
     except Exception as e:
         print(f"FRED Housing Error: {e}")
-        housing_data = pd.DataFrame()
+        return pd.DataFrame()
 
-    return data, wpm_full, fred_data, housing_data
 
-
-# --- TECHNICAL INDICATORS ---
-def rsi(series, period=14):
-    """Standard RSI: 100 - (100 / (1 + RS))."""
-    if series.empty or len(series) < period:
-        return pd.Series([50.0] * len(series))
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-
-# --- ADAPTIVE THRESHOLDS ---
-def calculate_z_score_threshold(series, window=250, num_std=2.0):
+def get_data(start_date=None, end_date=None, include_ohlcv=False):
     """
-    Calculates an adaptive threshold based on z-score (mean + N*std).
-    Returns (threshold, z_score) tuple.
-
-    Args:
-        series: pandas Series of historical values
-        window: lookback period (default 250 trading days = ~1 year)
-        num_std: number of standard deviations above mean (default 2.0)
-
-    Returns:
-        (threshold_value, current_z_score) or (None, None) if insufficient data
-    """
-    if len(series) < window:
-        return None, None
-
-    # Calculate rolling statistics
-    rolling_mean = series.rolling(window=window).mean().iloc[-1]
-    rolling_std = series.rolling(window=window).std().iloc[-1]
-
-    if pd.isna(rolling_mean) or pd.isna(rolling_std) or rolling_std == 0:
-        return None, None
-
-    threshold = rolling_mean + (num_std * rolling_std)
-    current_value = series.iloc[-1]
-    z_score = (current_value - rolling_mean) / rolling_std if rolling_std > 0 else 0
-
-    return threshold, z_score
-
-
-def calculate_percentile_threshold(series, window=250, percentile=95):
-    """
-    Calculates an adaptive threshold based on rolling percentile.
-    Returns (threshold, current_percentile) tuple.
+    Fetches market data from Yahoo Finance and macro data from FRED.
+    Returns close prices, WPM full OHLCV, and FRED macro indicators.
+    Implements retry logic and SPY fallback for SPX outages.
 
-    Args:
-        series: pandas Series of historical values
-        window: lookback period (default 250 trading days)
-        percentile: percentile level (default 95 = top 5%)
+    Close prices and WPM OHLCV come from one Yahoo batch. With include_ohlcv=True
+    the full (Price, Ticker) frame is returned as a fifth element so any
+    ticker's Volume/High/Low can be read via ohlcv_field/ticker_ohlcv.
 
-    Returns:
-        (threshold_value, current_percentile) or (None, None) if insufficient data
+    Note: Fetches 365 days (250+ trading days) to support adaptive thresholds.
+    Sources are fetched concurrently under FETCH_DEADLINE_SECONDS; the
+    per-source timing/outcome of the last call is kept in LAST_FETCH_REPORT.
     """
-    if len(series) < window:
-        return None, None
-
-    # Calculate rolling percentile threshold
-    rolling_window = series.rolling(window=window)
-    threshold = rolling_window.quantile(percentile / 100.0).iloc[-1]
+    cache_dir = os.environ.get("YFINANCE_CACHE_DIR", "/tmp/yfinance-cache")
+    try:
+        yf.set_tz_cache_location(cache_dir)
+    except Exception as e:
+        print(f"YFinance cache setup warning: {e}")
 
-    if pd.isna(threshold):
-        return None, None
+    end_date = end_date or datetime.now(timezone.utc)
+    if end_date.tzinfo is not None:
+        end_date = end_date.replace(tzinfo=None)
+    start_date = start_date or (end_date - timedelta(days=365))
 
-    # Calculate current value's percentile rank within the window
-    recent_data = series.iloc[-window:]
-    current_value = series.iloc[-1]
-    current_pctl = (recent_data < current_value).sum() / len(recent_data) * 100
+    results, report = run_fetch_stage({
+        "yahoo": lambda: _fetch_market_ohlcv(start_date, end_date),
+        "fred": lambda: _fetch_fred_macro(start_date, end_date),
+        "housing": lambda: _fetch_fred_housing(start_date, end_date),
+    })
+    LAST_FETCH_REPORT[:] = report
 
-    return threshold, current_pctl
+    raw_data = results["yahoo"]
+    data = market_closes(raw_data)
+    wpm_full = ticker_ohlcv(raw_data, "WPM")
+    if include_ohlcv:
+        return data, wpm_full, results["fred"], results["housing"], raw_data
+    return data, wpm_full, results["fred"], results["housing"]
 
 
 def map_risk_level(phase_label):
@@ -844,47 +913,36 @@ def dedupe_active_triggers(active_triggers):
     return deduped
 
 
-def compute_cycle_context(housing_df, previous_phase=None, context_metrics=None):
+CYCLE_SCORE_COLUMNS = ["pressure", "spec", "metrics_used", "cycle_index"]
+
+
+def _empty_cycle_context():
+    return {
+        "cycle_phase": None,
+        "cycle_trend": None,
+        "cycle_confidence": None,
+        "cycle_pressure": None,
+        "cycle_spec": None,
+        "cycle_index": None,
+        "cycle_break_risk": None,
+        "cycle_near_break": None,
+    }
+
+
+def compute_cycle_scores(housing_df):
     """
-    Builds long-cycle context from housing/credit fundamentals.
-    Uses multi-year windows and monthly data (not short-term risk regime).
+    Scores every month of the housing history at once (rolling 60/36/12-month
+    windows). Returns a month-end indexed frame with pressure, spec,
+    metrics_used and cycle_index, starting at the first month any housing
+    series is available; empty when nothing usable is present.
     """
-    if housing_df is None or housing_df.empty:
-        return {
-            "cycle_phase": None,
-            "cycle_trend": None,
-            "cycle_confidence": None,
-            "cycle_pressure": None,
-            "cycle_spec": None,
-            "cycle_index": None,
-            "cycle_break_risk": None,
-            "cycle_near_break": None,
-        }
-
-    if not isinstance(housing_df.index, pd.DatetimeIndex):
-        return {
-            "cycle_phase": None,
-            "cycle_trend": None,
-            "cycle_confidence": None,
-            "cycle_pressure": None,
-            "cycle_spec": None,
-            "cycle_index": None,
-            "cycle_break_risk": None,
-            "cycle_near_break": None,
-        }
+    empty = pd.DataFrame(columns=CYCLE_SCORE_COLUMNS)
+    if housing_df is None or housing_df.empty or not isinstance(housing_df.index, pd.DatetimeIndex):
+        return empty
 
-    monthly = housing_df.resample("M").last().ffill()
+    monthly = housing_df.resample("ME").last().ffill()
     if monthly.empty:
-        return {
-            "cycle_phase": None,
-            "cycle_trend": None,
-            "cycle_confidence": None,
-            "cycle_pressure": None,
-            "cycle_spec": None,
-            "cycle_index": None,
-            "cycle_break_risk": None,
-            "cycle_near_break": None,
-        }
+        return empty
 
     def _series(name):
         if name not in monthly.columns:
@@ -899,116 +957,101 @@ def compute_cycle_context(housing_df, previous_phase=None, context_metrics=None)
 
     available_series = [s for s in (starts, mortgage, prices, delinq) if s is not None]
     if not available_series:
-        return {
-            "cycle_phase": None,
-            "cycle_trend": None,
-            "cycle_confidence": None,
-            "cycle_pressure": None,
-            "cycle_spec": None,
-            "cycle_index": None,
-            "cycle_break_risk": None,
-            "cycle_near_break": None,
-        }
-
-    max_months = max(len(s) for s in available_series)
-
-    def _score_at(pos):
-        pressure = 0
-        spec = 0
-        metrics_used = 0
-
-        if starts is not None:
-            starts_hist = starts.iloc[:pos + 1].dropna()
-            if len(starts_hist) >= CYCLE_STARTS_Z_MONTHS:
-                window = starts_hist.iloc[-CYCLE_STARTS_Z_MONTHS:]
-                mean = window.mean()
-                std = window.std()
-                if std > 0:
-                    starts_z = (window.iloc[-1] - mean) / std
-                else:
-                    starts_z = 0
-                metrics_used += 1
-                if starts_z < -1.0:
-                    pressure += 2
-                if starts_z > 0.5:
-                    spec += 1
-            if len(starts_hist) >= 36:
-                ma_short = starts_hist.iloc[-12:].mean()
-                ma_long = starts_hist.iloc[-36:].mean()
-                if ma_long > 0:
-                    starts_trend = (ma_short - ma_long) / ma_long * 100
-                    metrics_used += 1
-                    if starts_trend < -3.0:
-                        pressure += 1
-                    if starts_trend > 3.0:
-                        spec += 1
-
-        if mortgage is not None:
-            mort_hist = mortgage.iloc[:pos + 1].dropna()
-            if len(mort_hist) >= 60:
-                mort_avg = mort_hist.iloc[-60:].mean()
-                gap = mort_hist.iloc[-1] - mort_avg
-                metrics_used += 1
-                if gap > 0.75:
-                    pressure += 1
-                if gap <= 0.0:
-                    spec += 1
-
-        if delinq is not None:
-            del_hist = delinq.iloc[:pos + 1].dropna()
-            if len(del_hist) >= 13:
-                change = del_hist.iloc[-1] - del_hist.iloc[-13]
-                metrics_used += 1
-                if change > 0.2:
-                    pressure += 1
-
-        if prices is not None:
-            price_hist = prices.iloc[:pos + 1].dropna()
-            if len(price_hist) >= 13:
-                yoy = (price_hist.iloc[-1] / price_hist.iloc[-13] - 1) * 100
-                metrics_used += 1
-                if yoy < 0:
-                    pressure += 1
-                if yoy >= 6:
-                    spec += 1
-            if len(price_hist) >= 7:
-                sixm = (price_hist.iloc[-1] / price_hist.iloc[-7] - 1) * 100
-                metrics_used += 1
-                if sixm >= 3:
-                    spec += 1
-
-        cycle_index = pressure + (spec * 0.5)
-        return {
+        return empty
+
+    index = monthly.index[monthly.index >= min(s.index[0] for s in available_series)]
+    pressure = pd.Series(0, index=index)
+    spec = pd.Series(0, index=index)
+    metrics_used = pd.Series(0, index=index)
+
+    def _on_months(flags):
+        return flags.reindex(index, fill_value=False).astype(bool).astype(int)
+
+    def _history(series):
+        return pd.Series(range(1, len(series) + 1), index=series.index)
+
+    if starts is not None:
+        count = _history(starts)
+        mean = starts.rolling(CYCLE_STARTS_Z_MONTHS).mean()
+        std = starts.rolling(CYCLE_STARTS_Z_MONTHS).std()
+        starts_z = ((starts - mean) / std).where(std > 0, 0.0)
+        has_z = count >= CYCLE_STARTS_Z_MONTHS
+        metrics_used += _on_months(has_z)
+        pressure += 2 * _on_months(has_z & (starts_z < -1.0))
+        spec += _on_months(has_z & (starts_z > 0.5))
+
+        ma_short = starts.rolling(12).mean()
+        ma_long = starts.rolling(36).mean()
+        starts_trend = (ma_short - ma_long) / ma_long * 100
+        has_trend = (count >= 36) & (ma_long > 0)
+        metrics_used += _on_months(has_trend)
+        pressure += _on_months(has_trend & (starts_trend < -3.0))
+        spec += _on_months(has_trend & (starts_trend > 3.0))
+
+    if mortgage is not None:
+        gap = mortgage - mortgage.rolling(60).mean()
+        has_gap = _history(mortgage) >= 60
+        metrics_used += _on_months(has_gap)
+        pressure += _on_months(has_gap & (gap > 0.75))
+        spec += _on_months(has_gap & (gap <= 0.0))
+
+    if delinq is not None:
+        change = delinq - delinq.shift(12)
+        has_change = _history(delinq) >= 13
+        metrics_used += _on_months(has_change)
+        pressure += _on_months(has_change & (change > 0.2))
+
+    if prices is not None:
+        count = _history(prices)
+        yoy = (prices / prices.shift(12) - 1) * 100
+        has_yoy = count >= 13
+        metrics_used += _on_months(has_yoy)
+        pressure += _on_months(has_yoy & (yoy < 0))
+        spec += _on_months(has_yoy & (yoy >= 6))
+        sixm = (prices / prices.shift(6) - 1) * 100
+        has_sixm = count >= 7
+        metrics_used += _on_months(has_sixm)
+        spec += _on_months(has_sixm & (sixm >= 3))
+
+    return pd.DataFrame(
+        {
             "pressure": pressure,
             "spec": spec,
             "metrics_used": metrics_used,
-            "cycle_index": cycle_index,
-        }
+            "cycle_index": pressure + (spec * 0.5),
+        },
+        index=index,
+    )
+
+
+def compute_cycle_context(housing_df, previous_phase=None, context_metrics=None, scores=None):
+    """
+    Builds long-cycle context from housing/credit fundamentals.
+    Uses multi-year windows and monthly data (not short-term risk regime).
+    Reads the current month and the trend month from compute_cycle_scores
+    (pass `scores` when they are already computed for housing_df).
+    """
+    if scores is None:
+        scores = compute_cycle_scores(housing_df)
+    if scores.empty:
+        return _empty_cycle_context()
 
+    max_months = len(scores)
     last_pos = max_months - 1
-    current = _score_at(last_pos)
-    if not current or current["metrics_used"] == 0:
-        return {
-            "cycle_phase": None,
-            "cycle_trend": None,
-            "cycle_confidence": None,
-            "cycle_pressure": None,
-            "cycle_spec": None,
-            "cycle_index": None,
-            "cycle_break_risk": None,
-            "cycle_near_break": None,
-        }
+    current = scores.iloc[last_pos]
+    if current["metrics_used"] == 0:
+        return _empty_cycle_context()
 
     context_pressure, context_spec = cycle_context_adjustments(context_metrics)
-    pressure = current["pressure"] + context_pressure
-    spec = current["spec"] + context_spec
+    pressure = int(current["pressure"]) + context_pressure
+    spec = int(current["spec"]) + context_spec
     phase = classify_cycle_phase(pressure, spec)
     phase = enforce_cycle_phase_sequence(previous_phase, phase)
 
     trend = "Estable"
     if last_pos >= CYCLE_TREND_MONTHS:
-        previous = _score_at(last_pos - CYCLE_TREND_MONTHS)
-        if previous and previous["metrics_used"] > 0:
+        previous = scores.iloc[last_pos - CYCLE_TREND_MONTHS]
+        if previous["metrics_used"] > 0:
             delta = current["cycle_index"] - previous["cycle_index"]
             if delta >= 1:
                 trend = "Ascendente"
@@ -1031,201 +1074,499 @@ def compute_cycle_context(housing_df, previous_phase=None, context_metrics=None)
         "cycle_confidence": confidence,
         "cycle_pressure": pressure,
         "cycle_spec": spec,
-        "cycle_index": round(cycle_index, 2),
+        "cycle_index": round(float(cycle_index), 2),
         "cycle_break_risk": break_risk_label,
         "cycle_near_break": near_break,
     }
 
 
-# --- THE LOGIC CORE ---
-def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
+def cycle_phase_history(housing_df, initial_phase=None):
     """
-    Analyses raw data against the Foldvary parameters.
-    Also checks for exit signals if positions are held.
+    Replays the long-cycle phase month by month from compute_cycle_scores,
+    applying enforce_cycle_phase_sequence to each transition (housing inputs
+    only; no live macro context adjustments).
     """
-    end_date = end_date or datetime.now(timezone.utc)
+    scores = compute_cycle_scores(housing_df)
+    if scores.empty:
+        return pd.DataFrame(columns=CYCLE_SCORE_COLUMNS + ["candidate_phase", "cycle_phase", "cycle_trend", "cycle_break_risk", "cycle_near_break"])
+
+    index_values = scores["cycle_index"]
+    delta = index_values - index_values.shift(CYCLE_TREND_MONTHS)
+    prior_used = scores["metrics_used"].shift(CYCLE_TREND_MONTHS) > 0
+    trends = pd.Series("Estable", index=scores.index)
+    trends[prior_used & (delta >= 1)] = "Ascendente"
+    trends[prior_used & (delta <= -1)] = "Descendente"
+
+    rows = []
+    phase = initial_phase
+    for month, pressure, spec, used, trend in zip(
+        scores.index, scores["pressure"], scores["spec"], scores["metrics_used"], trends
+    ):
+        if used == 0:
+            rows.append((None, phase, trend, None, None))
+            continue
+        candidate = classify_cycle_phase(pressure, spec)
+        phase = enforce_cycle_phase_sequence(phase, candidate)
+        label, near_break = cycle_break_risk_label(phase, pressure, spec, trend)
+        rows.append((candidate, phase, trend, label, near_break))
+
+    history = scores.copy()
+    history[["candidate_phase", "cycle_phase", "cycle_trend", "cycle_break_risk", "cycle_near_break"]] = pd.DataFrame(
+        rows, index=scores.index
+    )
+    return history
 
-    if df.empty:
-        return {"event": "DATA_OUTAGE", "missing": ["all_market_data"]}
 
-    # Helper to extract latest prices safely
-    def get_latest(ticker):
-        if ticker in df.columns and not pd.isna(df[ticker].iloc[-1]):
-            return df[ticker].iloc[-1]
-        return None
+# --- THE LOGIC CORE ---
+FLASH_MOVE_TICKERS = {
+    "^TNX": "Bonos 10Y",
+    "^SPX": "S&P 500",
+    "CL=F": "Petróleo",
+    "GC=F": "Oro",
+    "BTC-USD": "Bitcoin",
+    "DX-Y.NYB": "Dólar (DXY)",
+    "^VIX": "VIX"
+}
 
-    us10y = get_latest("^TNX")
-    spx = get_latest("^SPX")
-    btc = get_latest("BTC-USD")
-    wpm = get_latest("WPM")
 
-    # Critical Outage Check: These are mandatory for the core model logic.
-    critical = {"us10y": us10y, "spx": spx}
-    missing = [k for k, v in critical.items() if v is None]
-    if missing:
-        return {"event": "DATA_OUTAGE", "missing": missing}
+def _iter_market_inputs(df, wpm_df, fred_df, housing_df, positions, prefix_lengths):
+    """
+    The inputs analyse_market reads, for every df row position in `positions`
+    (rows of a core-sensor outage yield {"missing": [...]}). This is the one
+    place trigger inputs are derived, shared by the live and batch paths.
+
+    prefix_lengths(index) gives, per df row, how many rows of a secondary
+    series (FRED, housing, WPM volume) that row sees. Indicator series are
+    computed once over the full frames and read by position (every rolling
+    window is causal, so row i of the full series is the last row of the
+    prefix), including the 250-day adaptive thresholds.
+    """
+    # Each indicator series is computed once; every row reads its position.
+    ind = indicators.IndicatorSet(df)
+    prices = {ticker: df[ticker].to_numpy(dtype=float) for ticker in df.columns}
 
-    data_warnings = collect_stale_data(df, fred_df, housing_df, end_date)
+    rsi_values = {
+        ticker: ind.rsi(ticker).to_numpy(dtype=float)
+        for ticker in ("WPM", "BTC-USD", "^TNX", "^SPX")
+    }
+    spx_high_50 = spx_low_20 = gold_high_20 = us10y_sma_250 = wpm_lower_band = None
+    if "^SPX" in df.columns:
+        spx_high_50 = ind.rolling("^SPX", 50, "max").to_numpy()
+        spx_low_20 = ind.rolling("^SPX", 20, "min").to_numpy()
+    spx_rsi_high_50 = ind.rsi_rolling("^SPX", 50, "max").to_numpy()
+    if "GC=F" in df.columns:
+        gold_high_20 = ind.rolling("GC=F", 20, "max").to_numpy()
+    if "^TNX" in df.columns:
+        us10y_sma_250 = ind.rolling("^TNX", 250, "mean").to_numpy()
+    if "WPM" in df.columns:
+        wpm_lower_band = (ind.rolling("WPM", 20, "mean") - (2 * ind.rolling("WPM", 20, "std"))).to_numpy()
+
+    # Adaptive thresholds as (threshold, z-score or percentile rank) series
+    adaptive = {}
+    for ticker in ("^TNX", "CL=F"):
+        if ticker in df.columns:
+            adaptive[ticker] = (ind.z_threshold(ticker, 250, 2.0).to_numpy(), ind.z_score(ticker, 250).to_numpy())
+    if "DX-Y.NYB" in df.columns:
+        adaptive["DX-Y.NYB"] = (ind.pct_threshold("DX-Y.NYB", 250, 95).to_numpy(), ind.pct_rank("DX-Y.NYB", 250).to_numpy())
+
+    def adaptive_at(values, row):
+        threshold, score = values
+        return (None, None) if pd.isna(threshold[row]) else (threshold[row], score[row])
+
+    has_wpm_volume = not wpm_df.empty and "Volume" in wpm_df.columns
+    if has_wpm_volume:
+        wpm_rows = prefix_lengths(wpm_df.index)
+        wpm_volume = wpm_df["Volume"].to_numpy(dtype=float)
+        wpm_volume_avg = wpm_df["Volume"].rolling(window=20).mean().to_numpy()
+
+    # FRED macros: raw last rows, and the dropna'd series the live path reads
+    fred_rows = prefix_lengths(fred_df.index) if not fred_df.empty else None
+    fred_values = {
+        name: fred_df[name].to_numpy(dtype=float)
+        for name in ("BAMLH0A0HYM2", "RRPONTSYD", "WALCL", "WTREGEN")
+        if not fred_df.empty and name in fred_df.columns
+    }
+    icsa = None
+    if not fred_df.empty and "ICSA" in fred_df.columns:
+        icsa = fred_df["ICSA"].dropna()
+        icsa_rows = prefix_lengths(icsa.index)
+        icsa_values = icsa.to_numpy(dtype=float)
+        icsa_4w = icsa.rolling(window=20).mean().to_numpy()
+        icsa_6m = icsa.rolling(window=26 * 5).min().to_numpy()
+        icsa_adaptive = (
+            rolling_stats.z_score_threshold_series(icsa, 250, 2.0).to_numpy(),
+            rolling_stats.z_score_series(icsa, 250).to_numpy(),
+        )
+    has_sofr = not fred_df.empty and "SOFR" in fred_df.columns and "DFF" in fred_df.columns
+    if has_sofr:
+        sofr_series = fred_df["SOFR"].dropna()
+        dff_series = fred_df["DFF"].dropna()
+        sofr_rows = prefix_lengths(sofr_series.index)
+        dff_rows = prefix_lengths(dff_series.index)
+        sofr_values = sofr_series.to_numpy(dtype=float)
+        dff_values = dff_series.to_numpy(dtype=float)
+    has_net_liq = not fred_df.empty and "WALCL" in fred_df.columns
+    if has_net_liq:
+        net_liq_series = fred_df["WALCL"] - (fred_df["WTREGEN"] + fred_df["RRPONTSYD"])
+        net_liq_values = net_liq_series.to_numpy(dtype=float)
+        net_liq_sma_values = net_liq_series.rolling(window=10).mean().to_numpy()
+        spread_series = fred_df["BAMLH0A0HYM2"].dropna()
+        spread_rows = prefix_lengths(spread_series.index)
+        spread_confirm = ((spread_series > 5.0).astype(int).rolling(window=3).sum() == 3).to_numpy()
+
+    has_housing = not housing_df.empty
+    if has_housing:
+        housing_rows = prefix_lengths(housing_df.index)
+        has_mortgage = "MORTGAGE30US" in housing_df.columns
+        if has_mortgage:
+            mortgage = housing_df["MORTGAGE30US"].dropna()
+            mortgage_rows = prefix_lengths(mortgage.index)
+            mortgage_values = mortgage.to_numpy(dtype=float)
+            rate_52w_values = housing_df["MORTGAGE30US"].rolling(window=252).mean().to_numpy()
+        houst = housing_df["HOUST"].dropna()
+        houst_rows = prefix_lengths(houst.index)
+        houst_values = houst.to_numpy(dtype=float)
+        houst_12m_max_values = houst.rolling(window=12).max().to_numpy()
+        houst_mean_values = houst.rolling(window=504).mean().to_numpy()
+        houst_std_values = houst.rolling(window=504).std().to_numpy()
+        case_shiller = housing_df["CSUSHPINSA"].dropna()
+        cs_rows = prefix_lengths(case_shiller.index)
+        cs_values = case_shiller.to_numpy(dtype=float)
+        delinquency = housing_df["DRSFRMACBS"].dropna()
+        delinq_rows = prefix_lengths(delinquency.index)
+        delinq_values = delinquency.to_numpy(dtype=float)
 
-    # Safe Defaults for Auxiliary Metrics (Updated for 2026 Baseline)
-    # Uses these ONLY if primary AND backup feeds fail completely.
-    dxy = get_latest("DX-Y.NYB") or 96.00
-    oil = get_latest("CL=F") or 65.00
-    gold = get_latest("GC=F") or 5200.00
-    silver = get_latest("SI=F") or 100.00
-    copper = get_latest("HG=F") or 6.00
-    steel = get_latest("HRC=F") or 960.00
-    ita = get_latest("ITA") or 230.00
-    vix = get_latest("^VIX") or 18.00
-    wpm_val = wpm or 150.00 # Fallback for price
-
-    # FRED Macros
-    spread = fred_df["BAMLH0A0HYM2"].iloc[-1] if not fred_df.empty and "BAMLH0A0HYM2" in fred_df.columns else 3.5
-    rrp = fred_df["RRPONTSYD"].iloc[-1] if not fred_df.empty and "RRPONTSYD" in fred_df.columns else 500
-    fed_assets = fred_df["WALCL"].iloc[-1] if not fred_df.empty and "WALCL" in fred_df.columns else 7000000
-    tga = fred_df["WTREGEN"].iloc[-1] if not fred_df.empty and "WTREGEN" in fred_df.columns else 700000
-
-    net_liquidity = fed_assets - (tga + rrp)
-
-    # Unemployment Claims (ICSA) - weekly recession indicator
-    icsa_current = None
-    icsa_4w_avg = None
-    icsa_6m_low = None
-    labour_shock = False
+    for i in positions:
+        n = i + 1
 
-    if not fred_df.empty and "ICSA" in fred_df.columns:
-        icsa_series = fred_df["ICSA"].dropna()
-        if len(icsa_series) >= 26 * 5:  # 26 weeks * 5 trading days ~= 6 months
-            icsa_current = icsa_series.iloc[-1]
-            icsa_4w_avg = icsa_series.rolling(window=20).mean().iloc[-1]  # 4 weeks * 5 days
-            icsa_6m_low = icsa_series.rolling(window=26 * 5).min().iloc[-1]
+        def get_latest(ticker):
+            values = prices.get(ticker)
+            if values is not None and not pd.isna(values[i]):
+                return values[i]
+            return None
+
+        us10y = get_latest("^TNX")
+        spx = get_latest("^SPX")
+        btc = get_latest("BTC-USD")
+        wpm = get_latest("WPM")
+
+        # Critical Outage Check: These are mandatory for the core model logic.
+        critical = {"us10y": us10y, "spx": spx}
+        missing = [k for k, v in critical.items() if v is None]
+        if missing:
+            yield {"missing": missing}
+            continue
+
+        # Safe Defaults for Auxiliary Metrics (Updated for 2026 Baseline)
+        # Uses these ONLY if primary AND backup feeds fail completely.
+        dxy = get_latest("DX-Y.NYB") or 96.00
+        oil = get_latest("CL=F") or 65.00
+        gold = get_latest("GC=F") or 5200.00
+        silver = get_latest("SI=F") or 100.00
+        copper = get_latest("HG=F") or 6.00
+        steel = get_latest("HRC=F") or 960.00
+        ita = get_latest("ITA") or 230.00
+        vix = get_latest("^VIX") or 18.00
+        wpm_val = wpm or 150.00 # Fallback for price
+
+        # FRED Macros
+        f = fred_rows[i] if fred_rows is not None else 0
+
+        def fred_last(name, default):
+            return fred_values[name][f - 1] if f and name in fred_values else default
+
+        spread = fred_last("BAMLH0A0HYM2", 3.5)
+        net_liquidity = fred_last("WALCL", 7000000) - (fred_last("WTREGEN", 700000) + fred_last("RRPONTSYD", 500))
+
+        # Unemployment Claims (ICSA) - weekly recession indicator
+        icsa_current = None
+        icsa_4w_avg = None
+        icsa_6m_low = None
+        icsa_zscore = None
+        labour_shock = False
+        if icsa is not None and icsa_rows[i] >= 26 * 5:  # 26 weeks * 5 trading days ~= 6 months
+            k = icsa_rows[i]
+            icsa_current = icsa_values[k - 1]
+            icsa_4w_avg = icsa_4w[k - 1]  # 4 weeks * 5 days
+            icsa_6m_low = icsa_6m[k - 1]
 
             # Trigger: Adaptive Z-Score (Mean + 2.0 StdDev over 1 year)
             # Replaces arbitrary fixed % thresholds with statistical anomaly detection.
-            icsa_threshold, icsa_zscore = calculate_z_score_threshold(icsa_series, window=250, num_std=2.0)
-
+            icsa_threshold, icsa_zscore = adaptive_at(icsa_adaptive, k - 1)
             if icsa_threshold and icsa_4w_avg > icsa_threshold:
                 labour_shock = True
 
-    # SOFR vs Fed Funds (interbank stress indicator)
-    sofr = None
-    fed_funds = None
-    interbank_stress = False
-
-    if not fred_df.empty and "SOFR" in fred_df.columns and "DFF" in fred_df.columns:
-        sofr_series = fred_df["SOFR"].dropna()
-        dff_series = fred_df["DFF"].dropna()
-        if len(sofr_series) > 0 and len(dff_series) > 0:
-            sofr = sofr_series.iloc[-1]
-            fed_funds = dff_series.iloc[-1]
+        # SOFR vs Fed Funds (interbank stress indicator)
+        sofr = None
+        fed_funds = None
+        interbank_stress = False
+        if f and has_sofr and sofr_rows[i] > 0 and dff_rows[i] > 0:
+            sofr = sofr_values[sofr_rows[i] - 1]
+            fed_funds = dff_values[dff_rows[i] - 1]
             # SOFR spiking above Fed Funds (>10bps) = interbank stress
             if sofr > fed_funds + 0.10:
                 interbank_stress = True
 
-    # Net Liquidity SMA (reduced from 20 to 10 for faster BTC signals)
-    if not fred_df.empty and len(fred_df) >= 10 and "WALCL" in fred_df.columns:
-        net_liq_series = fred_df["WALCL"] - (fred_df["WTREGEN"] + fred_df["RRPONTSYD"])
-        net_liq_sma = net_liq_series.rolling(window=10).mean().iloc[-1]
-        net_liq_prev = net_liq_series.iloc[-2]
-        net_liq_sma_prev = net_liq_series.rolling(window=10).mean().iloc[-2]
-
-        spread_series = fred_df["BAMLH0A0HYM2"].dropna()
-        spread_3d_confirm = (
-            len(spread_series) >= 3
-            and all(spread_series.iloc[-i] > 5.0 for i in range(1, 4))
+        # Net Liquidity SMA (reduced from 20 to 10 for faster BTC signals)
+        if has_net_liq and f >= 10:
+            net_liq_sma = net_liq_sma_values[f - 1]
+            net_liq_prev = net_liq_values[f - 2]
+            net_liq_sma_prev = net_liq_sma_values[f - 2]
+            spread_3d_confirm = bool(spread_rows[i] >= 3 and spread_confirm[spread_rows[i] - 1])
+        else:
+            net_liq_sma = net_liquidity
+            net_liq_prev = net_liquidity
+            net_liq_sma_prev = net_liquidity
+            spread_3d_confirm = False
+
+        # A prefix shorter than the RSI period reads as a neutral 50
+        wpm_rsi_val, btc_rsi_val, us10y_rsi_val, spx_rsi_val = (
+            rsi_values[ticker][i] if n >= 14 else 50.0
+            for ticker in ("WPM", "BTC-USD", "^TNX", "^SPX")
         )
-    else:
-        net_liq_sma = net_liquidity
-        net_liq_prev = net_liquidity
-        net_liq_sma_prev = net_liquidity
-        spread_3d_confirm = False
-
-    wpm_rsi_val = rsi(df["WPM"]).iloc[-1] if "WPM" in df.columns else 50.0
-    btc_rsi_val = rsi(df["BTC-USD"]).iloc[-1] if "BTC-USD" in df.columns else 50.0
-    us10y_rsi_val = rsi(df["^TNX"]).iloc[-1] if "^TNX" in df.columns else 50.0
-    spx_rsi_val = rsi(df["^SPX"]).iloc[-1] if "^SPX" in df.columns else 50.0
-
-    # WPM Check needs valid dataframe context
-    if len(df) > 1 and "WPM" in df.columns:
-        wpm_price_yest = df["WPM"].iloc[-2]
-        wpm_crash = wpm_val < (wpm_price_yest * 0.95)
-    else:
-        wpm_crash = False
-
-    wpm_vol = wpm_df["Volume"].iloc[-1] if not wpm_df.empty and "Volume" in wpm_df.columns else 0
-    wpm_vol_avg = wpm_df["Volume"].rolling(window=20).mean().iloc[-1] if not wpm_df.empty and "Volume" in wpm_df.columns else 1
 
-    spx_high_50 = df["^SPX"].rolling(window=50).max().iloc[-1] if len(df) >= 50 else spx
-    spx_rsi_series = rsi(df["^SPX"])
-    spx_rsi_high_50 = spx_rsi_series.rolling(window=50).max().iloc[-1] if len(spx_rsi_series) >= 50 else 50.0
+        # WPM Check needs valid dataframe context
+        if n > 1 and "WPM" in prices:
+            wpm_crash = wpm_val < (prices["WPM"][i - 1] * 0.95)
+        else:
+            wpm_crash = False
+
+        w = wpm_rows[i] if has_wpm_volume else 0
+        wpm_vol = wpm_volume[w - 1] if w else 0
+        wpm_vol_avg = wpm_volume_avg[w - 1] if w else 1
+
+        spx_high = spx_high_50[i] if n >= 50 else spx
+        spx_rsi_high = spx_rsi_high_50[i] if n >= 50 else 50.0
+        gold_high = gold_high_20[i - 1] if n >= 21 and gold_high_20 is not None else gold
+        spx_low = spx_low_20[i - 1] if n >= 21 else spx
+
+        # Housing data (the core Foldvary variable - land/real estate cycle).
+        # HOUST = Housing Starts (thousands, monthly). A rollover signals construction bust.
+        # MORTGAGE30US = 30-Year Fixed Rate (weekly). Elevated rates squeeze credit.
+        # CSUSHPINSA = Case-Shiller National Home Price Index (monthly, ~2mo lag).
+        # DRSFRMACBS = Mortgage Delinquency Rate (quarterly).
+        h = housing_rows[i] if has_housing else 0
+        if h:
+            m = mortgage_rows[i] if has_mortgage else 0
+            mortgage_rate = (mortgage_values[m - 1] if m else float("nan")) if has_mortgage else 6.0
+            k = houst_rows[i]
+            if k >= 12:
+                houst_current = houst_values[k - 1]
+                houst_12m_max = houst_12m_max_values[k - 1]
+                houst_decline_pct = (houst_12m_max - houst_current) / houst_12m_max * 100
+            else:
+                houst_current = 0
+                houst_decline_pct = 0
+
+            c = cs_rows[i]
+            if c >= 6:
+                cs_current = cs_values[c - 1]
+                cs_6m_ago = cs_values[c - 6]
+                cs_momentum = (cs_current - cs_6m_ago) / cs_6m_ago * 100
+            else:
+                cs_current = 0
+                cs_momentum = 0
 
-    gold_high_20 = df["GC=F"].rolling(window=20).max().iloc[-2] if len(df) >= 21 and "GC=F" in df.columns else gold
-    spx_low_20 = df["^SPX"].rolling(window=20).min().iloc[-2] if len(df) >= 21 else spx
+            d = delinq_rows[i]
+            if d >= 2:
+                delinq_current = delinq_values[d - 1]
+                delinq_rising = delinq_current > delinq_values[d - 2]
+            else:
+                delinq_current = 0
+                delinq_rising = False
+
+            # HOUSING_BUST trigger:
+            # Housing starts collapsing statistically (Z-Score < -1.5) while rates are rising
+            # Replaces fixed 15% decline and 6.5% rate with statistical deviation logic.
+            # Data is daily (ffilled), so 2-year lookback = ~504 trading days
+            if k >= 252:
+                houst_mean = houst_mean_values[k - 1]
+                houst_std = houst_std_values[k - 1]
+                houst_zscore = (houst_current - houst_mean) / houst_std if houst_std > 0 else 0
+            else:
+                houst_zscore = 0
 
-    # Housing data (the core Foldvary variable - land/real estate cycle).
-    # HOUST = Housing Starts (thousands, monthly). A rollover signals construction bust.
-    # MORTGAGE30US = 30-Year Fixed Rate (weekly). Elevated rates squeeze credit.
-    # CSUSHPINSA = Case-Shiller National Home Price Index (monthly, ~2mo lag).
-    # DRSFRMACBS = Mortgage Delinquency Rate (quarterly).
-    if not housing_df.empty:
-        mortgage_rate = housing_df["MORTGAGE30US"].dropna().iloc[-1] if "MORTGAGE30US" in housing_df.columns else 6.0
-        houst = housing_df["HOUST"].dropna()
-        if len(houst) >= 12:
-            houst_current = houst.iloc[-1]
-            houst_12m_max = houst.rolling(window=12).max().iloc[-1]
-            houst_decline_pct = (houst_12m_max - houst_current) / houst_12m_max * 100
+            # Housing Bust: Starts are 1.5 deviations BELOW mean AND Rates > 52-week Avg
+            # This confirms "Weak Construction" + "Tightening Credit" relative to recent history
+            rate_52w_avg = rate_52w_values[h - 1] if has_mortgage else 6.0
+            housing_bust = houst_zscore < -1.5 and mortgage_rate > rate_52w_avg
         else:
+            mortgage_rate = 0
             houst_current = 0
             houst_decline_pct = 0
-
-        case_shiller = housing_df["CSUSHPINSA"].dropna()
-        if len(case_shiller) >= 6:
-            cs_current = case_shiller.iloc[-1]
-            cs_6m_ago = case_shiller.iloc[-6]
-            cs_momentum = (cs_current - cs_6m_ago) / cs_6m_ago * 100
-        else:
             cs_current = 0
             cs_momentum = 0
-
-        delinquency = housing_df["DRSFRMACBS"].dropna()
-        if len(delinquency) >= 2:
-            delinq_current = delinquency.iloc[-1]
-            delinq_prev = delinquency.iloc[-2]
-            delinq_rising = delinq_current > delinq_prev
-        else:
             delinq_current = 0
             delinq_rising = False
-
-        # HOUSING_BUST trigger:
-        # Housing starts collapsing statistically (Z-Score < -1.5) while rates are rising
-        # Replaces fixed 15% decline and 6.5% rate with statistical deviation logic.
-        
-        # Calculate Z-Score for Housing Starts (detect abnormal weakness)
-        # Data is daily (ffilled), so 2-year lookback = ~504 trading days
-        if len(houst) >= 252:
-            houst_window = houst.rolling(window=504) # 2 year lookback for housing cycle
-            houst_mean = houst_window.mean().iloc[-1]
-            houst_std = houst_window.std().iloc[-1]
-            houst_zscore = (houst_current - houst_mean) / houst_std if houst_std > 0 else 0
-        else:
+            housing_bust = False
             houst_zscore = 0
-            
-        # Housing Bust: Starts are 1.5 deviations BELOW mean AND Rates > 52-week Avg
-        # This confirms "Weak Construction" + "Tightening Credit" relative to recent history
-        rate_52w_avg = housing_df["MORTGAGE30US"].rolling(window=252).mean().iloc[-1] if "MORTGAGE30US" in housing_df.columns else 6.0
-        
-        housing_bust = houst_zscore < -1.5 and mortgage_rate > rate_52w_avg
-    else:
-        mortgage_rate = 0
-        houst_current = 0
-        houst_decline_pct = 0
-        cs_current = 0
-        cs_momentum = 0
-        delinq_current = 0
-        delinq_rising = False
-        housing_bust = False
-        houst_zscore = 0
-        rate_52w_avg = 0
+            rate_52w_avg = 0
+
+        # --- ADAPTIVE THRESHOLDS ---
+        # Dynamic thresholds over a 250-day lookback replace fixed levels that
+        # break during regime shifts: DXY 95th percentile (CLP_DEVALUATION),
+        # US10Y and oil z-scores (BOND_FREEZE, WAR_PROTOCOL).
+        dxy_threshold, dxy_percentile = None, None
+        us10y_threshold, us10y_zscore = None, None
+        oil_threshold, oil_zscore = None, None
+        if n >= 250:
+            if "DX-Y.NYB" in adaptive:
+                dxy_threshold, dxy_percentile = adaptive_at(adaptive["DX-Y.NYB"], i)
+            if "^TNX" in adaptive:
+                us10y_threshold, us10y_zscore = adaptive_at(adaptive["^TNX"], i)
+            if "CL=F" in adaptive:
+                oil_threshold, oil_zscore = adaptive_at(adaptive["CL=F"], i)
+
+        # EM_CURRENCY_STRESS trend filter: US10Y above its 250-day Moving Average
+        us10y_sma = us10y_sma_250[i] if us10y_sma_250 is not None and n >= 250 else 4.2
+        # WPM Bollinger lower band (Mean - 2*StdDev)
+        wpm_band = wpm_lower_band[i] if wpm_lower_band is not None else None
+
+        # Single-session moves that rolling indicators smooth out
+        flash_moves = []
+        if n > 1:  # Need at least 2 days for comparison
+            for ticker, name in FLASH_MOVE_TICKERS.items():
+                if ticker in prices:
+                    current_price = prices[ticker][i]
+                    prev_price = prices[ticker][i - 1]
+                    if pd.notna(current_price) and pd.notna(prev_price) and prev_price > 0:
+                        pct_change = ((current_price - prev_price) / prev_price) * 100
+                        if abs(pct_change) > 5.0:
+                            flash_moves.append((name, pct_change))
+
+        yield {
+            "us10y": us10y,
+            "spx": spx,
+            "btc": btc,
+            "wpm_val": wpm_val,
+            "dxy": dxy,
+            "oil": oil,
+            "gold": gold,
+            "silver": silver,
+            "copper": copper,
+            "steel": steel,
+            "ita": ita,
+            "vix": vix,
+            "spread": spread,
+            "net_liquidity": net_liquidity,
+            "icsa_current": icsa_current,
+            "icsa_4w_avg": icsa_4w_avg,
+            "icsa_6m_low": icsa_6m_low,
+            "icsa_zscore": icsa_zscore,
+            "labour_shock": labour_shock,
+            "sofr": sofr,
+            "fed_funds": fed_funds,
+            "interbank_stress": interbank_stress,
+            "net_liq_sma": net_liq_sma,
+            "net_liq_prev": net_liq_prev,
+            "net_liq_sma_prev": net_liq_sma_prev,
+            "spread_3d_confirm": spread_3d_confirm,
+            "wpm_rsi_val": wpm_rsi_val,
+            "btc_rsi_val": btc_rsi_val,
+            "us10y_rsi_val": us10y_rsi_val,
+            "spx_rsi_val": spx_rsi_val,
+            "wpm_crash": wpm_crash,
+            "wpm_vol": wpm_vol,
+            "wpm_vol_avg": wpm_vol_avg,
+            "wpm_lower_band": wpm_band,
+            "spx_high_50": spx_high,
+            "spx_rsi_high_50": spx_rsi_high,
+            "gold_high_20": gold_high,
+            "spx_low_20": spx_low,
+            "mortgage_rate": mortgage_rate,
+            "houst_current": houst_current,
+            "houst_decline_pct": houst_decline_pct,
+            "cs_current": cs_current,
+            "cs_momentum": cs_momentum,
+            "delinq_current": delinq_current,
+            "delinq_rising": delinq_rising,
+            "housing_bust": housing_bust,
+            "houst_zscore": houst_zscore,
+            "rate_52w_avg": rate_52w_avg,
+            "dxy_threshold": dxy_threshold,
+            "dxy_percentile": dxy_percentile,
+            "us10y_threshold": us10y_threshold,
+            "us10y_zscore": us10y_zscore,
+            "oil_threshold": oil_threshold,
+            "oil_zscore": oil_zscore,
+            "us10y_sma_250": us10y_sma,
+            "flash_moves": flash_moves,
+        }
+
+
+def _latest_market_inputs(df, wpm_df, fred_df, housing_df):
+    """
+    Every scalar analyse_market reads from its input frames, taken at their
+    last row. Returns {"missing": [...]} when a core series is unavailable.
+    """
+    # The live run sees every FRED/housing/volume row it was given.
+    def whole(index):
+        return [len(index)] * len(df)
+
+    return next(_iter_market_inputs(df, wpm_df, fred_df, housing_df, [len(df) - 1], whole))
+
+
+def _evaluate_market(inputs, state, end_date, housing_df=None, cycle_scores=None, signal_db_path=None, data_warnings=None):
+    """
+    Trigger arbitration, stress score and state updates of analyse_market for
+    one day's inputs (from _latest_market_inputs or market_input_rows).
+    """
+    us10y = inputs["us10y"]
+    spx = inputs["spx"]
+    btc = inputs["btc"]
+    wpm_val = inputs["wpm_val"]
+    dxy = inputs["dxy"]
+    oil = inputs["oil"]
+    gold = inputs["gold"]
+    silver = inputs["silver"]
+    copper = inputs["copper"]
+    steel = inputs["steel"]
+    ita = inputs["ita"]
+    vix = inputs["vix"]
+    spread = inputs["spread"]
+    net_liquidity = inputs["net_liquidity"]
+    icsa_current = inputs["icsa_current"]
+    icsa_4w_avg = inputs["icsa_4w_avg"]
+    icsa_6m_low = inputs["icsa_6m_low"]
+    icsa_zscore = inputs["icsa_zscore"]
+    labour_shock = inputs["labour_shock"]
+    sofr = inputs["sofr"]
+    fed_funds = inputs["fed_funds"]
+    interbank_stress = inputs["interbank_stress"]
+    net_liq_sma = inputs["net_liq_sma"]
+    net_liq_prev = inputs["net_liq_prev"]
+    net_liq_sma_prev = inputs["net_liq_sma_prev"]
+    spread_3d_confirm = inputs["spread_3d_confirm"]
+    wpm_rsi_val = inputs["wpm_rsi_val"]
+    btc_rsi_val = inputs["btc_rsi_val"]
+    us10y_rsi_val = inputs["us10y_rsi_val"]
+    spx_rsi_val = inputs["spx_rsi_val"]
+    wpm_crash = inputs["wpm_crash"]
+    wpm_vol = inputs["wpm_vol"]
+    wpm_vol_avg = inputs["wpm_vol_avg"]
+    wpm_lower_band = inputs["wpm_lower_band"]
+    spx_high_50 = inputs["spx_high_50"]
+    spx_rsi_high_50 = inputs["spx_rsi_high_50"]
+    gold_high_20 = inputs["gold_high_20"]
+    spx_low_20 = inputs["spx_low_20"]
+    mortgage_rate = inputs["mortgage_rate"]
+    houst_current = inputs["houst_current"]
+    houst_decline_pct = inputs["houst_decline_pct"]
+    cs_current = inputs["cs_current"]
+    cs_momentum = inputs["cs_momentum"]
+    delinq_current = inputs["delinq_current"]
+    delinq_rising = inputs["delinq_rising"]
+    housing_bust = inputs["housing_bust"]
+    houst_zscore = inputs["houst_zscore"]
+    rate_52w_avg = inputs["rate_52w_avg"]
+    dxy_threshold = inputs["dxy_threshold"]
+    dxy_percentile = inputs["dxy_percentile"]
+    us10y_threshold = inputs["us10y_threshold"]
+    us10y_zscore = inputs["us10y_zscore"]
+    oil_threshold = inputs["oil_threshold"]
+    oil_zscore = inputs["oil_zscore"]
+    us10y_sma_250 = inputs["us10y_sma_250"]
+    flash_moves = inputs["flash_moves"]
 
     # Stress score (calculated early for use in later logic)
     stress_score = 0
@@ -1239,28 +1580,6 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     if labour_shock: stress_score += 2
     if interbank_stress: stress_score += 2
 
-    # --- ADAPTIVE THRESHOLDS ---
-    # Calculate dynamic thresholds based on historical data (250-day lookback).
-    # These replace fixed thresholds that break during regime shifts.
-
-    # DXY adaptive threshold (for CLP_DEVALUATION replacement)
-    # Use 95th percentile instead of fixed 107
-    dxy_threshold, dxy_percentile = None, None
-    if "DX-Y.NYB" in df.columns and len(df) >= 250:
-        dxy_threshold, dxy_percentile = calculate_percentile_threshold(df["DX-Y.NYB"], window=250, percentile=95)
-
-    # US10Y adaptive threshold (for BOND_FREEZE)
-    # Use z-score (mean + 2*std) instead of fixed 5.5%
-    us10y_threshold, us10y_zscore = None, None
-    if "^TNX" in df.columns and len(df) >= 250:
-        us10y_threshold, us10y_zscore = calculate_z_score_threshold(df["^TNX"], window=250, num_std=2.0)
-
-    # Oil adaptive threshold (for WAR_PROTOCOL)
-    # Use z-score instead of fixed $95
-    oil_threshold, oil_zscore = None, None
-    if "CL=F" in df.columns and len(df) >= 250:
-        oil_threshold, oil_zscore = calculate_z_score_threshold(df["CL=F"], window=250, num_std=2.0)
-
     # Flash move detection (will add to stress score if triggered)
     flash_move_detected = False
 
@@ -1283,21 +1602,21 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     # PRIORITY 2: DEPRESSION WATCH (systemic combos within 30 days)
     # Top combos from depression proxy analysis
     depression_alert_fired = False
-    if check_temporal_combo(state, "SUGAR_CRASH", "INTERBANK_STRESS", window_days=30) and check_temporal_combo(state, "SUGAR_CRASH", "FLASH_MOVE", window_days=30):
+    if check_temporal_combo(state, "SUGAR_CRASH", "INTERBANK_STRESS", window_days=30, db_path=signal_db_path, as_of=end_date) and check_temporal_combo(state, "SUGAR_CRASH", "FLASH_MOVE", window_days=30, db_path=signal_db_path, as_of=end_date):
         active_triggers.append((
             "DEPRESSION_ALERT",
             "⚠️ VIGILANCIA DEPRESIÓN: Euforia + Estrés Interbancario + Shock de Volatilidad (30d)"
         ))
         stress_score += 3
         depression_alert_fired = True
-    elif check_temporal_combo(state, "SUGAR_CRASH", "INTERBANK_STRESS", window_days=30):
+    elif check_temporal_combo(state, "SUGAR_CRASH", "INTERBANK_STRESS", window_days=30, db_path=signal_db_path, as_of=end_date):
         active_triggers.append((
             "DEPRESSION_WATCH",
             "⚠️ VIGILANCIA DEPRESIÓN: Euforia + Estrés Interbancario (30d)"
         ))
         stress_score += 2
         depression_alert_fired = True
-    elif check_temporal_combo(state, "SUGAR_CRASH", "LABOUR_SHOCK", window_days=30):
+    elif check_temporal_combo(state, "SUGAR_CRASH", "LABOUR_SHOCK", window_days=30, db_path=signal_db_path, as_of=end_date):
         active_triggers.append((
             "DEPRESSION_WATCH",
             "⚠️ VIGILANCIA DEPRESIÓN: Euforia + Deterioro Laboral (30d)"
@@ -1309,14 +1628,14 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     # SUGAR_CRASH + EM_CURRENCY_STRESS: 89% crash accuracy (28 occurrences)
     # SOLVENCY_DEATH + WAR_PROTOCOL: 82% crash accuracy (22 occurrences)
     temporal_combo_fired = False
-    if check_temporal_combo(state, "SUGAR_CRASH", "EM_CURRENCY_STRESS", window_days=30):
+    if check_temporal_combo(state, "SUGAR_CRASH", "EM_CURRENCY_STRESS", window_days=30, db_path=signal_db_path, as_of=end_date):
         active_triggers.append((
             "TEMPORAL_CRISIS",
             "⚠️ CONVERGENCIA: SUGAR_CRASH + EM_CURRENCY_STRESS (últimos 30 días) | 89% precisión"
         ))
         stress_score += 2
         temporal_combo_fired = True
-    elif check_temporal_combo(state, "SOLVENCY_DEATH", "WAR_PROTOCOL", window_days=30):
+    elif check_temporal_combo(state, "SOLVENCY_DEATH", "WAR_PROTOCOL", window_days=30, db_path=signal_db_path, as_of=end_date):
         active_triggers.append((
             "TEMPORAL_CRISIS",
             "⚠️ CONVERGENCIA: SOLVENCY_DEATH + WAR_PROTOCOL (últimos 30 días) | 82% precisión"
@@ -1330,12 +1649,7 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
             active_triggers.append(("SOLVENCY_DEATH", f"CRÍTICO: Spread de Crédito ({spread}%) > 5.0%"))
     if wpm_crash and wpm_rsi_val < 30 and wpm_vol > (wpm_vol_avg * 2):
         # Additional check: Bollinger Band Lower Break (Statistical Cheapness)
-        # Calculates dynamic lower band (Mean - 2*StdDev) to confirm price is statistically low
-        wpm_series = df["WPM"]
-        wpm_bb_mean = wpm_series.rolling(window=20).mean().iloc[-1]
-        wpm_bb_std = wpm_series.rolling(window=20).std().iloc[-1]
-        wpm_lower_band = wpm_bb_mean - (2 * wpm_bb_std)
-        
+        # The dynamic lower band (Mean - 2*StdDev) confirms price is statistically low
         if wpm_val < wpm_lower_band:
             active_triggers.append(("BUY_WPM_NOW", f"Oportunidad WPM: Ruptura Banda Bollinger Inferior ({wpm_lower_band:.2f}) + Volumen 2x"))
     if net_liquidity > net_liq_sma and net_liq_prev < net_liq_sma_prev and btc_rsi_val < 60:
@@ -1365,8 +1679,6 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     # EM_CURRENCY_STRESS - Adaptive Percentile Threshold
     # Replaces fixed 107 with 95th percentile over 1 year
     # Replaces fixed 4.2% US10Y with "Above 250-day Moving Average" (Trend Filter)
-    us10y_sma_250 = df["^TNX"].rolling(window=250).mean().iloc[-1] if "^TNX" in df.columns and len(df) >= 250 else 4.2
-    
     if dxy_threshold and dxy and dxy > dxy_threshold and us10y and us10y > us10y_sma_250:
         active_triggers.append(("EM_CURRENCY_STRESS", f"Estrés Cambiario EM: DXY ({dxy:.1f}) en percentil {dxy_percentile:.0f}% + US10Y > SMA250 ({us10y_sma_250:.2f}%)"))
     elif not dxy_threshold and dxy and dxy > 107 and us10y and us10y > 4.2:
@@ -1388,29 +1700,6 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     # --- FLASH MOVE DETECTOR (Black Swan Catch) ---
     # Detects sudden single-session shocks that rolling indicators smooth out.
     # Priority: between entry signals and warnings (notable but not necessarily actionable).
-    flash_tickers = {
-        "^TNX": "Bonos 10Y",
-        "^SPX": "S&P 500",
-        "CL=F": "Petróleo",
-        "GC=F": "Oro",
-        "BTC-USD": "Bitcoin",
-        "DX-Y.NYB": "Dólar (DXY)",
-        "^VIX": "VIX"
-    }
-
-    flash_moves = []
-    if len(df) > 1:  # Need at least 2 days for comparison
-        for ticker, name in flash_tickers.items():
-            if ticker in df.columns:
-                current_price = df[ticker].iloc[-1]
-                prev_price = df[ticker].iloc[-2]
-
-                if pd.notna(current_price) and pd.notna(prev_price) and prev_price > 0:
-                    pct_change = ((current_price - prev_price) / prev_price) * 100
-
-                    if abs(pct_change) > 5.0:
-                        flash_moves.append((name, pct_change))
-
     # Add flash move triggers (prioritize by magnitude)
     if flash_moves:
         flash_move_detected = True
@@ -1551,10 +1840,16 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
             add_signal_to_history(state, trigger_event, end_date)
 
     trigger_events = [evt for evt, _ in active_triggers]
+    signal_events = [
+        {"signal": evt, "detail": detail}
+        for evt, detail in active_triggers
+        if evt in tracked_signals
+    ]
 
     cycle_context = compute_cycle_context(
         housing_df,
         previous_phase=state.get("cycle_phase"),
+        scores=cycle_scores,
         context_metrics={
             "us10y": us10y,
             "mortgage_rate": mortgage_rate,
@@ -1584,6 +1879,7 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
         "cycle_break_risk": cycle_context.get("cycle_break_risk"),
         "cycle_near_break": cycle_context.get("cycle_near_break"),
         "trigger_events": trigger_events,
+        "signal_events": signal_events,
         "state_update": state_update,
         "us10y": round(us10y, 2) if us10y else 0,
         "spread": round(spread, 2),
@@ -1618,6 +1914,101 @@ def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None):
     }
 
 
+def analyse_market(df, wpm_df, fred_df, housing_df, state, end_date=None, signal_db_path=None):
+    """
+    Analyses raw data against the Foldvary parameters.
+    Also checks for exit signals if positions are held.
+    With signal_db_path, temporal combos also see the signal_events table.
+    """
+    end_date = end_date or datetime.now(timezone.utc)
+
+    if df.empty:
+        return {"event": "DATA_OUTAGE", "missing": ["all_market_data"]}
+
+    inputs = _latest_market_inputs(df, wpm_df, fred_df, housing_df)
+    if "missing" in inputs:
+        return {"event": "DATA_OUTAGE", "missing": inputs["missing"]}
+
+    data_warnings = collect_stale_data(df, fred_df, housing_df, end_date)
+    return _evaluate_market(
+        inputs,
+        state,
+        end_date,
+        housing_df=housing_df,
+        signal_db_path=signal_db_path,
+        data_warnings=data_warnings,
+    )
+
+
+# --- BATCH REPLAY ---
+def _prefix_lengths(index, dates):
+    """Rows of a sorted index dated on or before each date (0 when none)."""
+    return index.searchsorted(dates, side="right")
+
+
+def market_input_rows(df, wpm_df, fred_df, housing_df, after=None):
+    """
+    Yields, for every row of df (dated after `after`, when given), what
+    _latest_market_inputs returns when each frame is cut at that row's date
+    (`frame.loc[:date]`), plus the cycle scores of the housing prefix under
+    "cycle_scores".
+    """
+    dates = df.index
+    has_housing = not housing_df.empty
+    housing_rows = _prefix_lengths(housing_df.index, dates) if has_housing else None
+    if has_housing:
+        housing_months = housing_df.index.to_period("M")
+
+    # compute_cycle_scores of a prefix only differs from the previous day's
+    # when the prefix enters a new month or the month's last values change.
+    cycle_cache = {}
+
+    def cycle_scores_for(count):
+        if not has_housing or count == 0 or not isinstance(housing_df.index, pd.DatetimeIndex):
+            return compute_cycle_scores(housing_df.iloc[:count])
+        month = housing_months[count - 1]
+        month_start = housing_months.searchsorted(month, side="left")
+        month_last = housing_df.iloc[month_start:count].ffill().iloc[-1]
+        key = (month, tuple(month_last.fillna(-1e300).tolist()))
+        if key not in cycle_cache:
+            cycle_cache.clear()
+            cycle_cache[key] = compute_cycle_scores(housing_df.iloc[:count])
+        return cycle_cache[key]
+
+    def visible(index):
+        return _prefix_lengths(index, dates)
+
+    first = 0 if after is None else int(dates.searchsorted(pd.Timestamp(after), side="right"))
+    positions = range(first, len(df))
+    for i, inputs in zip(positions, _iter_market_inputs(df, wpm_df, fred_df, housing_df, positions, visible)):
+        if "missing" not in inputs:
+            inputs["cycle_scores"] = cycle_scores_for(housing_rows[i] if has_housing else 0)
+        yield inputs
+
+
+def analyse_market_history(df, wpm_df, fred_df, housing_df, state, signal_db_path=None, after=None):
+    """
+    Batch form of analyse_market over every day of df (after `after`): yields
+    (day, analysis) as if analyse_market had been called on each day's
+    `frame.loc[:day]` slices with end_date=day. The caller applies each
+    analysis' state_update before asking for the next day, exactly as in a
+    day-by-day loop. Stale-data warnings are not computed (data_warnings is
+    None); they only describe a live run's feeds.
+    """
+    days = df.index if after is None else df.index[df.index > pd.Timestamp(after)]
+    for day, inputs in zip(days, market_input_rows(df, wpm_df, fred_df, housing_df, after=after)):
+        if "missing" in inputs:
+            yield day, {"event": "DATA_OUTAGE", "missing": inputs["missing"]}
+            continue
+        yield day, _evaluate_market(
+            inputs,
+            state,
+            day.to_pydatetime(),
+            cycle_scores=inputs["cycle_scores"],
+            signal_db_path=signal_db_path,
+        )
+
+
 # --- THE PERSONA (GEMINI) ---
 def generate_alert_text(data):
     """
@@ -1908,31 +2299,55 @@ REGLAS FINALES
             return sanitize_telegram_html(f"Error en IA: {e}. Datos crudos: {data}")
 
 
-def update_regime_context(analysis):
+def prepare_history_db():
     """
-    Persists daily snapshots in SQLite and enriches the analysis with a multi-day risk regime.
+    Loads the history DB from the gist (when configured) and ensures its schema.
+    Returns {"load_state", "ready", "ops_warnings"} for update_regime_context;
+    ready means signal_events can be queried before the analysis runs.
     """
-    if not analysis or "stress_score" not in analysis:
-        return analysis
-
+    prepared = {"load_state": True, "ready": False, "ops_warnings": []}
     if not HISTORY_DB_PATH:
-        return analysis
-
-    ops_warnings = list(analysis.get("ops_warnings") or [])
+        return prepared
 
     try:
-        history_load_state = True
         if GIST_TOKEN and STATE_GIST_ID:
-            history_load_state = history_store.load_db_from_gist(
+            prepared["load_state"] = history_store.load_db_from_gist(
                 GIST_TOKEN,
                 STATE_GIST_ID,
                 HISTORY_DB_PATH,
                 HISTORY_GIST_FILENAME,
             )
-            if history_load_state is False:
-                ops_warnings.append("HISTORY_GIST_LOAD_FAILED_SKIP_SAVE")
+            if prepared["load_state"] is False:
+                prepared["ops_warnings"].append("HISTORY_GIST_LOAD_FAILED_SKIP_SAVE")
 
         history_store.ensure_db(HISTORY_DB_PATH)
+        prepared["ready"] = True
+    except Exception as exc:
+        print(f"History store error: {exc}")
+        prepared["ops_warnings"].append("HISTORY_STORE_PIPELINE_ERROR")
+    return prepared
+
+
+def update_regime_context(analysis, preloaded_history=None):
+    """
+    Persists daily snapshots in SQLite and enriches the analysis with a multi-day risk regime.
+    preloaded_history is the prepare_history_db() result when the DB was
+    already loaded earlier in the run; otherwise it is loaded here.
+    """
+    if not analysis or "stress_score" not in analysis:
+        return analysis
+
+    if not HISTORY_DB_PATH:
+        return analysis
+
+    ops_warnings = list(analysis.get("ops_warnings") or [])
+
+    try:
+        prepared = preloaded_history or prepare_history_db()
+        history_load_state = prepared["load_state"]
+        ops_warnings.extend(prepared["ops_warnings"])
+        if not prepared["ready"]:
+            raise RuntimeError("history DB unavailable")
 
         date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         snapshot = {
@@ -1971,6 +2386,11 @@ def update_regime_context(analysis):
         }
 
         history_store.upsert_daily_snapshot(HISTORY_DB_PATH, snapshot)
+        history_store.record_signal_events(
+            HISTORY_DB_PATH,
+            date_str,
+            [(item["signal"], item["detail"]) for item in analysis.get("signal_events") or []],
+        )
         history_store.prune_history(HISTORY_DB_PATH, HISTORY_RETENTION_DAYS)
 
         history_limit = history_store.regime_history_limit(
@@ -2136,8 +2556,16 @@ if __name__ == "__main__":
         print(f"Loaded state: {state}")
 
         market_data, wpm_data, fred_data, housing_data = get_data()
-        analysis = analyse_market(market_data, wpm_data, fred_data, housing_data, state)
-        analysis = update_regime_context(analysis)
+        history_db = prepare_history_db()
+        analysis = analyse_market(
+            market_data,
+            wpm_data,
+            fred_data,
+            housing_data,
+            state,
+            signal_db_path=HISTORY_DB_PATH if history_db["ready"] else None,
+        )
+        analysis = update_regime_context(analysis, preloaded_history=history_db)
 
         print(f"Analysis Result: {analysis}")
 
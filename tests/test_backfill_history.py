@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import backfill_history
+import history_store
+
+
+def _inputs(rows=320, seed=4):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2021-01-04", periods=rows)
+
+    def walk(start, vol):
+        return start * np.exp(np.cumsum(rng.normal(0, vol, rows)))
+
+    market = pd.DataFrame(
+        {
+            "^TNX": walk(3.0, 0.03),
+            "^SPX": walk(4000, 0.02),
+            "^VIX": np.clip(walk(18, 0.08), 9, 80),
+            "CL=F": walk(70, 0.04),
+            "GC=F": walk(1800, 0.015),
+            "SI=F": walk(25, 0.03),
+            "HG=F": walk(4, 0.02),
+            "HRC=F": walk(900, 0.02),
+            "ITA": walk(200, 0.02),
+            "DX-Y.NYB": walk(100, 0.01),
+            "WPM": walk(40, 0.04),
+            "BTC-USD": walk(30000, 0.05),
+        },
+        index=idx,
+    )
+    wpm = pd.DataFrame({"Volume": rng.lognormal(14, 0.5, rows)}, index=idx)
+    fidx = pd.date_range(idx[0] - pd.Timedelta(days=400), idx[-1], freq="D")
+    n = len(fidx)
+    fred = pd.DataFrame(
+        {
+            "BAMLH0A0HYM2": 4.5 + np.cumsum(rng.normal(0, 0.05, n)),
+            "RRPONTSYD": np.abs(500 + np.cumsum(rng.normal(0, 10, n))),
+            "WALCL": 7e6 + np.cumsum(rng.normal(0, 5e3, n)),
+            "WTREGEN": 7e5 + np.cumsum(rng.normal(0, 5e3, n)),
+            "ICSA": 2.2e5 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+            "SOFR": 5.0 + rng.normal(0, 0.06, n),
+            "DFF": np.full(n, 5.0),
+        },
+        index=fidx,
+    )
+    midx = pd.date_range("2010-01-31", idx[-1], freq="ME")
+    m = len(midx)
+    housing = pd.DataFrame(
+        {
+            "HOUST": 1300 + 300 * np.sin(np.arange(m) / 14.0) + rng.normal(0, 40, m),
+            "MORTGAGE30US": 5 + 1.5 * np.cos(np.arange(m) / 20.0),
+            "CSUSHPINSA": 150 * np.exp(np.cumsum(0.004 + rng.normal(0, 0.003, m))),
+            "DRSFRMACBS": 3 + rng.normal(0, 0.1, m),
+        },
+        index=midx,
+    ).reindex(pd.date_range(midx[0], idx[-1], freq="D")).ffill()
+    return market, wpm, fred, housing
+
+
+def _table_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in ("daily_snapshots", "signal_events")
+        }
+
+
+def _interrupted(after_days):
+    """analyse_market_history that is interrupted after `after_days` new days."""
+    real = backfill_history.sentinel.analyse_market_history
+
+    def history(*args, **kwargs):
+        for done, item in enumerate(real(*args, **kwargs)):
+            if done == after_days:
+                raise KeyboardInterrupt
+            yield item
+
+    return mock.patch.object(backfill_history.sentinel, "analyse_market_history", side_effect=history)
+
+
+class TestVectorizedBackfill(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.checkpoint = os.path.join(self.dir, "cache", "backfill_checkpoint.json")
+        printed = mock.patch("builtins.print")
+        self.printed = printed.start()
+        self.addCleanup(printed.stop)
+
+    def _db(self, name):
+        path = os.path.join(self.dir, f"{name}.db")
+        history_store.ensure_db(path)
+        return path
+
+    def _run(self, db_path, frames, checkpoint_path=None):
+        backfill_history.backfill_vectorized(db_path, *frames, checkpoint_path=checkpoint_path, checkpoint_every=100)
+
+    def _interrupt(self, db_path, frames, after_days=230):
+        with _interrupted(after_days), self.assertRaises(KeyboardInterrupt):
+            self._run(db_path, frames, self.checkpoint)
+        self.assertTrue(os.path.exists(self.checkpoint))
+        self.assertEqual(_table_rows(db_path)["daily_snapshots"], [])
+
+    def _messages(self):
+        return " ".join(str(call.args[0]) for call in self.printed.call_args_list if call.args)
+
+    def test_resumed_backfill_matches_uninterrupted_run(self):
+        frames = _inputs()
+        expected_db = self._db("expected")
+        self._run(expected_db, frames)
+
+        db_path = self._db("resumed")
+        self._interrupt(db_path, frames)
+        self._run(db_path, frames, self.checkpoint)
+        self.assertIn("Resuming backfill after", self._messages())
+        self.assertEqual(_table_rows(db_path), _table_rows(expected_db))
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertFalse(os.path.exists(backfill_history._rows_path(self.checkpoint)))
+
+        rows = _table_rows(expected_db)
+        self.assertEqual(len(rows["daily_snapshots"]), len(frames[0]))
+        self.assertTrue(rows["signal_events"])
+        phases = [row["regime_phase"] for row in history_store.fetch_history(expected_db)]
+        self.assertTrue(any(phase is not None for phase in phases))
+
+    def test_checkpoint_survives_new_bars(self):
+        full = _inputs()
+        end = full[0].index[260]
+        expected_db = self._db("expected")
+        self._run(expected_db, full)
+
+        db_path = self._db("resumed")
+        self._interrupt(db_path, [frame.loc[:end] for frame in full])
+        self._run(db_path, full, self.checkpoint)
+        self.assertIn("Resuming backfill after", self._messages())
+        self.assertEqual(_table_rows(db_path), _table_rows(expected_db))
+
+    def test_changed_input_data_discards_checkpoint(self):
+        frames = _inputs()
+        db_path = self._db("revised")
+        self._interrupt(db_path, frames)
+
+        market, wpm, fred, housing = frames
+        fred = fred.copy()
+        fred.loc[market.index[50]:market.index[60], "BAMLH0A0HYM2"] += 2.0
+        revised = (market, wpm, fred, housing)
+        self._run(db_path, revised, self.checkpoint)
+        self.assertIn("input data changed", self._messages())
+        self.assertNotIn("Resuming backfill after", self._messages())
+
+        expected_db = self._db("expected")
+        self._run(expected_db, revised)
+        self.assertEqual(_table_rows(db_path), _table_rows(expected_db))
+
+    def test_regime_columns_match_day_by_day_backfill(self):
+        frames = [frame.loc[:"2021-05-31"] for frame in _inputs()]
+        loop_db = self._db("loop")
+        backfill_history.backfill_loop(loop_db, *frames)
+        batch_db = self._db("batch")
+        self._run(batch_db, frames)
+        columns = ["date", "event", "phase_score", "regime_phase", "regime_score", "regime_trend", "regime_confidence"]
+        loop_rows = [[row[c] for c in columns] for row in history_store.fetch_history(loop_db)]
+        batch_rows = [[row[c] for c in columns] for row in history_store.fetch_history(batch_db)]
+        self.assertEqual(batch_rows, loop_rows)
+        self.assertTrue(any(row[3] is not None for row in loop_rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+
+
+def _combo_inputs(rows=900, seed=3):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2001-01-01", periods=rows)
+    matrix = pd.DataFrame(
+        rng.random((rows, len(backtest.COMBO_DISCOVERY_SIGNALS))) < 0.03,
+        index=idx,
+        columns=backtest.COMBO_DISCOVERY_SIGNALS,
+    )
+    market = pd.DataFrame({"^SPX": 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))}, index=idx)
+    score = rng.integers(0, 5, rows)
+    outcomes = pd.DataFrame(
+        {"DepressionScore": score, "DepressionFlag": (score >= 3).astype(int)},
+        index=idx,
+    )
+    return matrix, market, outcomes
+
+
+def _reference_occurrences(matrix, combo, window_days, cooldown_days):
+    """Nested date-loop version of the windowed co-occurrence with cooldown."""
+    fired = {name: [d for d in matrix.index if matrix.at[d, name]] for name in combo}
+    kept = []
+    for day in matrix.index:
+        if not any(matrix.at[day, name] for name in combo):
+            continue
+        complete = all(
+            any(0 <= (day - d).days <= window_days for d in fired[name])
+            for name in combo
+        )
+        if complete and (not kept or (day - kept[-1]).days > cooldown_days):
+            kept.append(day)
+    return kept
+
+
+class TestComboDiscovery(unittest.TestCase):
+    def test_occurrences_match_nested_loop_reference(self):
+        matrix, market, outcomes = _combo_inputs()
+        table = backtest.build_combo_analysis(matrix, market, outcomes, windows=[10, 30], max_size=3, cooldown_days=30)
+        self.assertEqual(list(table.columns), backtest.COMBO_COLUMNS)
+        self.assertEqual(len(table), 2 * (36 + 84))
+
+        rows = table.set_index(["combo", "window_days"])
+        for combo in (("SOLVENCY_DEATH", "SUGAR_CRASH"), ("SUGAR_CRASH", "INTERBANK_STRESS", "FLASH_MOVE")):
+            for window in (10, 30):
+                kept = _reference_occurrences(matrix, combo, window, 30)
+                row = rows.loc[(" + ".join(combo), window)]
+                self.assertEqual(row["occurrences"], len(kept))
+                if kept:
+                    self.assertAlmostEqual(row["depression_rate"], outcomes.loc[kept, "DepressionFlag"].mean() * 100)
+                    self.assertAlmostEqual(row["avg_depression_score"], outcomes.loc[kept, "DepressionScore"].mean())
+
+    def test_improvement_and_classification(self):
+        matrix, market, outcomes = _combo_inputs()
+        table = backtest.build_combo_analysis(matrix, market, outcomes, windows=[30], max_size=2)
+        scored = table.dropna(subset=["depression_rate"])
+        np.testing.assert_allclose(
+            scored["improvement_pp"],
+            scored["depression_rate"] - scored["best_individual_depression_rate"],
+        )
+        strong = (scored["occurrences"] >= backtest.COMBO_MIN_OCCURRENCES) & (
+            scored["improvement_pp"] >= backtest.COMBO_STRONG_IMPROVEMENT_PP
+        )
+        self.assertTrue((scored.loc[strong, "classification"] == "STRONG").all())
+        self.assertTrue((table.loc[~table.index.isin(scored.index[strong]), "classification"] == "TRIVIAL").all())
+        self.assertTrue(table["depression_rate"].dropna().is_monotonic_decreasing)
+
+    def test_generate_combo_analysis_writes_csv(self):
+        matrix, market, outcomes = _combo_inputs(rows=300)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            table = backtest.generate_combo_analysis(matrix, market, outcomes, Path(tmp_dir), "_test")
+            written = pd.read_csv(Path(tmp_dir) / "combo_analysis_test.csv")
+        self.assertEqual(len(written), len(table))
+        self.assertEqual(list(written.columns), backtest.COMBO_COLUMNS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+
+
+def _price_series(rows=400, seed=11):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2000-01-03", periods=rows)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    series = pd.Series(values, index=idx)
+    series.iloc[5:9] = np.nan
+    series.iloc[200] = np.nan
+    series.iloc[-3:] = np.nan
+    return series
+
+
+def _outcome_inputs(rows=700, seed=5):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2005-01-03", periods=rows)
+    market = pd.DataFrame({"^SPX": 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))}, index=idx)
+    market.iloc[40:45, 0] = np.nan
+
+    fidx = pd.date_range("2003-01-01", idx[-1] + pd.Timedelta(days=30), freq="D")
+    n = len(fidx)
+    fred = pd.DataFrame(
+        {
+            "BAMLH0A0HYM2": 4.0 + np.cumsum(rng.normal(0, 0.05, n)),
+            "ICSA": 2.2e5 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+            "SOFR": 1.0 + np.cumsum(rng.normal(0, 0.02, n)),
+            "DFF": 1.0 + np.cumsum(rng.normal(0, 0.02, n)),
+            "USREC": (np.arange(n) // 400 % 3 == 0).astype(float),
+        },
+        index=fidx,
+    )
+    fred.loc[fred.index[::9], "ICSA"] = np.nan
+
+    hidx = pd.date_range("2004-06-01", idx[-1], freq="W-THU")
+    m = len(hidx)
+    housing = pd.DataFrame(
+        {
+            "HOUST": 1500 * np.exp(np.cumsum(rng.normal(0, 0.03, m))),
+            "MORTGAGE30US": 5 + np.cumsum(rng.normal(0, 0.05, m)),
+        },
+        index=hidx,
+    )
+    return market, fred, housing
+
+
+class TestForwardDrawdown(unittest.TestCase):
+    def test_matches_windowed_max_drawdown(self):
+        series = _price_series()
+        for periods in (30, 90, 252):
+            expected = []
+            for i in range(len(series)):
+                end_i = min(i + periods, len(series) - 1)
+                dd = backtest.max_drawdown_pct(series.iloc[i:end_i + 1].dropna())
+                expected.append(np.nan if dd is None else dd)
+            result = backtest.forward_drawdown_pct(series, periods)
+            np.testing.assert_allclose(result.to_numpy(), np.array(expected), rtol=0, atol=1e-12)
+
+    def test_forward_rolling_max(self):
+        series = pd.Series([1.0, np.nan, 3.0, 2.0, np.nan])
+        result = backtest.forward_rolling(series, 2, how="max")
+        np.testing.assert_array_equal(result.to_numpy(), [3.0, 3.0, 3.0, 2.0, np.nan])
+
+
+class TestDepressionOutcomeTable(unittest.TestCase):
+    def test_matches_per_date_outcomes(self):
+        market, fred, housing = _outcome_inputs()
+        precomp = backtest.prepare_depression_inputs(market, fred, housing)
+        table = backtest.build_depression_outcome_table(market, fred, housing, precomp)
+        self.assertEqual(len(table), len(market))
+        for idx in range(0, len(market), 13):
+            expected = backtest.compute_depression_outcomes(market, fred, housing, idx, precomp)
+            row = table.iloc[idx]
+            self.assertEqual(list(expected), list(table.columns))
+            for col, value in expected.items():
+                if value is None or pd.isna(value):
+                    self.assertTrue(pd.isna(row[col]), f"{col} at {idx}")
+                else:
+                    self.assertAlmostEqual(row[col], value, places=6, msg=f"{col} at {idx}")
+
+    def test_cache_round_trip(self):
+        market, fred, housing = _outcome_inputs(rows=300)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "outcomes.pkl"
+            built = backtest.load_depression_outcome_table(market, fred, housing, cache_path=path)
+            self.assertTrue(path.exists())
+            cached = backtest.load_depression_outcome_table(market, fred, housing, cache_path=path)
+            pd.testing.assert_frame_equal(built, cached)
+            changed = market.copy()
+            changed.iloc[-1, 0] *= 0.5
+            rebuilt = backtest.load_depression_outcome_table(changed, fred, housing, cache_path=path)
+            self.assertNotEqual(rebuilt["Depress_SPX_Drawdown_12m"].iloc[-2], built["Depress_SPX_Drawdown_12m"].iloc[-2])
+
+
+class TestEventStudy(unittest.TestCase):
+    def test_forward_matrix_matches_row_loop(self):
+        prices = _price_series()
+        market = pd.DataFrame({"^SPX": prices, "GC=F": prices[::-1].to_numpy() * 0.5}, index=prices.index)
+        values, assets, horizons = backtest.forward_return_matrix(market, ["^SPX", "WPM", "GC=F"], [5, 90, 365])
+        self.assertEqual(assets, ["^SPX", "GC=F"])
+        self.assertEqual(values.shape, (len(market), 2, 3))
+        raw = market.to_numpy(dtype=float)
+        for i in (0, 3, 150, 199, 300, len(market) - 6, len(market) - 1):
+            for a in range(2):
+                for k, h in enumerate(horizons):
+                    if i + h >= len(market):
+                        self.assertTrue(np.isnan(values[i, a, k]))
+                        continue
+                    expected = (raw[i + h, a] - raw[i, a]) / raw[i, a] * 100
+                    np.testing.assert_equal(values[i, a, k], expected)
+
+    def test_event_study_over_cluster_starts(self):
+        prices = _price_series(rows=600)
+        market = pd.DataFrame({"^SPX": prices}, index=prices.index)
+        fired = np.zeros(len(market), dtype=bool)
+        fired[[20, 25, 100, 160, 590]] = True
+        matrix = pd.DataFrame({"SUGAR_CRASH": fired}, index=market.index)
+        forward = backtest.forward_return_matrix(market, ["^SPX"], [10, 30])
+        table = backtest.build_event_study(matrix, forward, dedup_days=30)
+        self.assertEqual(list(table.columns), backtest.EVENT_STUDY_COLUMNS)
+
+        row = table[table["horizon_days"] == 30].iloc[0]
+        starts = [20, 100, 160, 590]
+        returns = forward[0][starts, 0, 1]
+        returns = returns[~np.isnan(returns)]
+        self.assertEqual(row["clusters"], 4)
+        self.assertEqual(row["observations"], len(returns))
+        self.assertAlmostEqual(row["mean_return"], returns.mean())
+        self.assertAlmostEqual(row["median_return"], np.median(returns))
+        self.assertAlmostEqual(row["loss_rate"], (returns < 0).mean() * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
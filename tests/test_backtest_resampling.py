@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+
+
+def _clustered_results(clusters=40, seed=5):
+    """Signal rows in clusters of 1-6 firings; each cluster shares one outcome."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    day = pd.Timestamp("2000-01-03")
+    for c in range(clusters):
+        event = "DEPRESSION_ALERT" if c % 2 else "SUGAR_CRASH"
+        hit = int(rng.random() < (0.8 if event == "DEPRESSION_ALERT" else 0.2))
+        for i in range(int(rng.integers(1, 7))):
+            rows.append({
+                "Date": (day + pd.Timedelta(days=i)).strftime("%Y-%m-%d"),
+                "Event": event,
+                "IsClusterStart": int(i == 0),
+                "DepressionFlag": hit,
+                "Depress_NBER_Recession": hit,
+                "Fwd_90d": -5.0 if hit else 5.0,
+                "Fwd_180d": 5.0 if hit else -5.0,
+            })
+        day += pd.Timedelta(days=60)
+    return pd.DataFrame(rows)
+
+
+class TestBlockResampling(unittest.TestCase):
+    def test_cluster_blocks_follow_cluster_starts(self):
+        df = pd.DataFrame({
+            "Event": ["A", "A", "B", "A", "B", "A"],
+            "IsClusterStart": [1, 0, 1, 1, 0, 0],
+        })
+        blocks = backtest.cluster_blocks(df)
+        self.assertEqual(blocks[0], blocks[1])
+        self.assertEqual(blocks[2], blocks[4])
+        self.assertEqual(blocks[3], blocks[5])
+        self.assertEqual(len(set(blocks)), 3)
+
+    def test_bootstrap_matches_index_resampling(self):
+        df = _clustered_results()
+        hits = backtest.rate_hits(df)
+        sums, counts = backtest.block_totals(hits, backtest.cluster_blocks(df))
+        low, high = backtest.block_bootstrap_ci(sums, counts, 20000, np.random.default_rng(1))
+
+        rng = np.random.default_rng(2)
+        naive = []
+        for _ in range(20000):
+            draw = rng.integers(0, len(counts), len(counts))
+            naive.append(sums[draw, 0].sum() / counts[draw].sum() * 100)
+        np.testing.assert_allclose([low[0], high[0]], np.percentile(naive, [2.5, 97.5]), atol=1.5)
+
+        observed = hits[:, 0].mean() * 100
+        self.assertLessEqual(low[0], observed)
+        self.assertGreaterEqual(high[0], observed)
+
+    def test_permutation_and_worker_independence(self):
+        df = _clustered_results()
+        events = df["Event"].to_numpy()
+        groups = [(ev, np.flatnonzero(events == ev)) for ev in ("DEPRESSION_ALERT", "SUGAR_CRASH")]
+        pools = [("all", np.arange(len(df)), groups)]
+        serial = backtest.resample_rates(df, pools, replicates=500, workers=1)
+        forked = backtest.resample_rates(df, pools + [("other", np.arange(len(df)), [("copy", groups[0][1])])],
+                                         replicates=500, workers=2)
+        self.assertEqual(serial["DEPRESSION_ALERT"], forked["DEPRESSION_ALERT"])
+        self.assertLess(serial["DEPRESSION_ALERT"]["depression_rate_p"], 0.05)
+        self.assertGreater(serial["SUGAR_CRASH"]["depression_rate_p"], 0.5)
+        self.assertEqual(set(serial["SUGAR_CRASH"]), set(backtest.RESAMPLED_COLUMNS))
+
+    def test_summaries_carry_interval_columns(self):
+        df = _clustered_results(clusters=80)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out = Path(tmp_dir)
+            backtest.generate_walkforward_summary(df, out, "", out)
+            backtest.generate_regime_split_summary(df, out, "", out)
+            walkforward = pd.read_csv(out / "walkforward_summary.csv")
+            regime = pd.read_csv(out / "regime_split_summary.csv")
+            markdown = (out / "REGIME_SPLIT_SUMMARY.md").read_text()
+        for table, rate in ((walkforward, "depression_rate"), (regime, "DepressionRate")):
+            for col in backtest.RESAMPLED_COLUMNS:
+                self.assertIn(col, table.columns)
+            self.assertTrue((table["depression_rate_ci_low"] <= table[rate] + 1e-9).all())
+            self.assertTrue((table["depression_rate_ci_high"] >= table[rate] - 1e-9).all())
+        self.assertIn("| CI | p |", markdown)
+
+    def test_summaries_resample_once_for_every_language(self):
+        df = _clustered_results(clusters=80)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out = Path(tmp_dir)
+            with mock.patch.object(backtest, "resample_rates", wraps=backtest.resample_rates) as wrapped:
+                backtest.generate_walkforward_summary(df, out, "", out, langs=("en", "es"))
+                backtest.generate_regime_split_summary(df, out, "", out, langs=("en", "es"))
+            self.assertEqual(wrapped.call_count, 2)
+            for name in ("WALKFORWARD_SUMMARY", "REGIME_SPLIT_SUMMARY"):
+                self.assertTrue((out / f"{name}.md").exists())
+                self.assertTrue((out / f"{name}_es.md").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
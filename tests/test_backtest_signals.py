@@ -0,0 +1,241 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import backtest
+
+
+def _synthetic_inputs(seed, rows=800):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2015-01-01", periods=rows)
+
+    def walk(start, vol, drift=0.0):
+        return start * np.exp(np.cumsum(rng.normal(drift, vol, rows)))
+
+    market = pd.DataFrame(
+        {
+            "^TNX": walk(3.0, 0.02),
+            "^SPX": walk(3000, 0.012, 0.0004),
+            "^VIX": np.clip(walk(12, 0.05), 9, 60),
+            "CL=F": walk(70, 0.025),
+            "GC=F": walk(1800, 0.01),
+            "DX-Y.NYB": walk(100, 0.004),
+            "WPM": walk(40, 0.03),
+            "BTC-USD": walk(20000, 0.04),
+            "WPM_Volume": rng.lognormal(14, 0.6, rows),
+        },
+        index=idx,
+    )
+    market.iloc[100:103, 0] = np.nan
+
+    fidx = pd.date_range("2013-06-01", idx[-1], freq="D")
+    n = len(fidx)
+    fred = pd.DataFrame(
+        {
+            "BAMLH0A0HYM2": 5.0 + np.cumsum(rng.normal(0, 0.05, n)),
+            "RRPONTSYD": np.abs(np.cumsum(rng.normal(0, 10, n))),
+            "WALCL": 4e6 + np.cumsum(rng.normal(0, 5e3, n)),
+            "WTREGEN": 4e5 + np.cumsum(rng.normal(0, 5e3, n)),
+            "ICSA": 2.2e5 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+            "SOFR": 1.05 + np.cumsum(rng.normal(0, 0.02, n)),
+            "DFF": 1.0 + np.cumsum(rng.normal(0, 0.02, n)),
+        },
+        index=fidx,
+    )
+    fred.loc[fred.index[::7], "ICSA"] = np.nan
+
+    hidx = pd.date_range("2000-01-01", idx[-1], freq="W-THU")
+    m = len(hidx)
+    housing = pd.DataFrame(
+        {
+            "HOUST": 1500 * np.exp(np.cumsum(rng.normal(0, 0.03, m))),
+            "MORTGAGE30US": 5 + np.cumsum(rng.normal(0, 0.05, m)),
+        },
+        index=hidx,
+    )
+    return market, fred, housing
+
+
+class TestVectorizedSignalEngine(unittest.TestCase):
+    def _assert_engines_match(self, market, fred, housing):
+        loop = list(backtest.iter_signal_days(market, fred, housing, engine="loop"))
+        vectorized = list(backtest.iter_signal_days(market, fred, housing, engine="vectorized"))
+        self.assertEqual(loop, vectorized)
+        return loop
+
+    def test_matches_loop_engine(self):
+        fired = set()
+        for seed in (0, 2, 7):
+            market, fred, housing = _synthetic_inputs(seed)
+            days = self._assert_engines_match(market, fred, housing)
+            fired.update(t for _, triggers, _ in days for t in triggers)
+        self.assertTrue({"COMBO_CRISIS", "DEPRESSION_ALERT", "DEPRESSION_WATCH", "TEMPORAL_CRISIS", "HOUSING_BUST"}.issubset(fired))
+
+    def test_matches_loop_engine_with_missing_inputs(self):
+        market, _, _ = _synthetic_inputs(1, rows=600)
+        market = market.drop(columns=["GC=F", "WPM_Volume", "DX-Y.NYB"])
+        self._assert_engines_match(market, pd.DataFrame(), pd.DataFrame())
+
+    def test_warmup_days_are_skipped(self):
+        market, fred, housing = _synthetic_inputs(0, rows=backtest.WARMUP_TRADING_DAYS)
+        matrix, _ = backtest.build_signal_matrix(market, fred, housing)
+        self.assertFalse(matrix.to_numpy().any())
+        self.assertEqual(list(matrix.columns), backtest.SINGLE_SIGNALS + backtest.COMBO_SIGNALS)
+
+
+def _sweep_outcomes(index, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "DepressionFlag": (rng.random(len(index)) < 0.2).astype(int),
+            "Depress_NBER_Recession": (rng.random(len(index)) < 0.3).astype(int),
+        },
+        index=index,
+    )
+
+
+class TestParameterSweep(unittest.TestCase):
+    def test_pool_matches_serial_and_defaults(self):
+        market, fred, housing = _synthetic_inputs(2)
+        outcomes = _sweep_outcomes(market.index)
+        grid = {"vix_ceiling": [13.0, 20.0], "temporal_window_days": [30, 60], "z_num_std": [1.5, 2.0]}
+        serial = backtest.run_parameter_sweep(market, fred, housing, grid, workers=1, outcome_table=outcomes)
+        pooled = backtest.run_parameter_sweep(market, fred, housing, grid, workers=3, outcome_table=outcomes)
+        pd.testing.assert_frame_equal(serial, pooled)
+        self.assertEqual(len(serial), 8 * len(backtest.SINGLE_SIGNALS + backtest.COMBO_SIGNALS))
+
+        matrix, _ = backtest.build_signal_matrix(market, fred, housing)
+        defaults = serial[(serial["vix_ceiling"] == 13.0) & (serial["temporal_window_days"] == 30) & (serial["z_num_std"] == 2.0)]
+        self.assertEqual(defaults.set_index("Event")["signals"].to_dict(), matrix.sum().astype(int).to_dict())
+
+        sugar = serial[(serial["Event"] == "SUGAR_CRASH") & (serial["z_num_std"] == 2.0) & (serial["temporal_window_days"] == 30)]
+        self.assertGreaterEqual(sugar["signals"].iloc[1], sugar["signals"].iloc[0])
+
+    def test_outcomes_are_measured_on_each_signal_asset(self):
+        market, fred, housing = _synthetic_inputs(2)
+        outcomes = _sweep_outcomes(market.index)
+        table = backtest.run_parameter_sweep(market, fred, housing, {"vix_ceiling": [13.0]}, workers=1, outcome_table=outcomes)
+        matrix, _ = backtest.build_signal_matrix(market, fred, housing)
+        checked = set()
+        for event, row in table.set_index("Event").iterrows():
+            asset = backtest.result_asset(event)
+            prices = market[asset]
+            fwd = ((prices.shift(-90) - prices) / prices * 100).to_numpy()
+            starts = backtest.cluster_start_mask(matrix.index, matrix[event].to_numpy(), backtest.DEDUP_DAYS)
+            fwd = fwd[starts][~np.isnan(fwd[starts])]
+            if not len(fwd):
+                self.assertTrue(np.isnan(row["hit_rate"]))
+                continue
+            self.assertAlmostEqual(row["hit_rate"], (fwd < 0).mean() * 100)
+            self.assertAlmostEqual(row["avg_fwd_90"], fwd.mean())
+            checked.add(asset)
+        self.assertEqual(checked, {"BTC-USD", "^SPX"})
+
+    def test_cluster_starts_follow_dedup_gap(self):
+        dates = pd.DatetimeIndex(["2020-01-01", "2020-01-10", "2020-02-15", "2020-02-20", "2020-04-01"])
+        fired = np.array([True, True, True, False, True])
+        starts = backtest.cluster_start_mask(dates, fired, 30)
+        self.assertEqual(starts.tolist(), [True, False, True, False, True])
+
+    def test_unknown_parameter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            backtest.expand_parameter_grid({"vix_cutoff": [12]})
+
+
+
+class TestIncrementalBacktest(unittest.TestCase):
+    def _replay(self, market, fred, housing, path):
+        outcomes = backtest.build_depression_outcome_table(market, fred, housing)
+        signals = backtest.build_signal_matrix(market, fred, housing)
+        return pd.DataFrame(backtest.replay_backtest(market, fred, housing, outcomes, signals, path))
+
+    def test_resumed_run_matches_full_run(self):
+        market, fred, housing = _synthetic_inputs(2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            full = self._replay(market, fred, housing, os.path.join(tmp_dir, "full.pkl"))
+
+            path = os.path.join(tmp_dir, "incremental.pkl")
+            cut = market.index[650]
+            first = self._replay(market.loc[:cut], fred.loc[:cut], housing.loc[:cut], path)
+            checkpoint = pd.read_pickle(path)
+            self.assertLess(checkpoint["last_date"], cut)
+            self.assertGreater(len(first), 0)
+
+            with mock.patch.object(backtest, "iter_signal_days", wraps=backtest.iter_signal_days) as wrapped:
+                resumed = self._replay(market, fred, housing, path)
+            self.assertGreater(wrapped.call_args.kwargs["start"], 600)
+
+        pd.testing.assert_frame_equal(resumed, full)
+
+    def test_changed_history_invalidates_checkpoint(self):
+        market, fred, housing = _synthetic_inputs(0, rows=600)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "checkpoint.pkl")
+            self._replay(market, fred, housing, path)
+            self.assertIsNotNone(backtest.load_backtest_checkpoint(path, market, fred, housing))
+            edited = market.copy()
+            edited.iloc[10, 1] *= 1.01
+            self.assertIsNone(backtest.load_backtest_checkpoint(path, edited, fred, housing))
+
+    def test_revised_macro_data_invalidates_checkpoint(self):
+        market, fred, housing = _synthetic_inputs(0, rows=600)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "checkpoint.pkl")
+            self._replay(market, fred, housing, path)
+            revised = fred.copy()
+            revised.iloc[20, 0] *= 1.05
+            self.assertIsNone(backtest.load_backtest_checkpoint(path, market, revised, housing))
+            late = housing.drop(housing.index[-40])
+            self.assertIsNone(backtest.load_backtest_checkpoint(path, market, fred, late))
+
+
+class TestBacktestEras(unittest.TestCase):
+    def test_parse_eras(self):
+        eras = backtest.parse_backtest_eras("full, modern=2013-01-01,post2008=2008-09-15")
+        self.assertEqual([name for name, _ in eras], ["full", "modern", "post2008"])
+        self.assertIsNone(eras[0][1])
+        self.assertEqual(backtest.era_fetch_start(eras), None)
+        self.assertEqual(backtest.era_fetch_start(eras[1:]), "2008-09-15")
+        for raw in ("a=2010-13-01", "a,b", "a=2010-01-01,a=2011-01-01"):
+            with self.assertRaises(ValueError):
+                backtest.parse_backtest_eras(raw)
+
+    def test_single_pass_slices_every_era(self):
+        market, fred, housing = _synthetic_inputs(2)
+        start = market.index[700]
+        written = {}
+
+        def capture(df, matrix, market_df, outcome_table, tag):
+            written[tag] = (df, matrix)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(backtest, "BACKTEST_ERAS", f"full,late={start.date()}"), \
+                mock.patch.object(backtest, "BACKTEST_CHECKPOINT_PATH", os.path.join(tmp_dir, "ck.pkl")), \
+                mock.patch.object(backtest, "DEPRESSION_CACHE_PATH", os.path.join(tmp_dir, "dep.pkl")), \
+                mock.patch.object(backtest, "fetch_historical_data", return_value=(market, fred, housing)) as fetch, \
+                mock.patch.object(backtest, "write_backtest_outputs", side_effect=capture), \
+                mock.patch.object(backtest, "build_signal_matrix", wraps=backtest.build_signal_matrix) as matrix_calls:
+            backtest.run_backtest()
+
+        self.assertEqual(fetch.call_args.args, (backtest.HISTORICAL_START_DATE,))
+        self.assertEqual(matrix_calls.call_count, 1)
+        self.assertEqual(set(written), {None, "late"})
+        full, full_matrix = written[None]
+        late, late_matrix = written["late"]
+        self.assertEqual(len(full_matrix), len(market))
+        self.assertEqual(late_matrix.index[0], start)
+
+        expected = full[pd.to_datetime(full["Date"]) >= start].reset_index(drop=True)
+        self.assertGreater(len(expected), 0)
+        pd.testing.assert_frame_equal(late.drop(columns="IsClusterStart"), expected.drop(columns="IsClusterStart"))
+        first = ~late["Event"].duplicated()
+        self.assertTrue((late.loc[first, "IsClusterStart"] == 1).all())
+        pd.testing.assert_series_equal(late.loc[~first, "IsClusterStart"], expected.loc[~first, "IsClusterStart"])
+
+
+if __name__ == "__main__":
+    unittest.main()
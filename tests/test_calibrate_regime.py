@@ -0,0 +1,212 @@
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import calibrate_regime
+
+
+def _reference_threshold(values, labels, direction="ge", objective="f1", recall_floor=0.5, precision_floor=0.5,
+                         lead_days=None):
+    """Brute-force threshold search: one full pass over the data per candidate threshold."""
+    rows = [
+        (value, label, 0.0 if lead_days is None or np.isnan(lead_days[i]) else lead_days[i])
+        for i, (value, label) in enumerate(zip(values, labels))
+        if value is not None
+    ]
+    if not rows:
+        return None, 0.0
+    candidates = []
+    for threshold in sorted({value for value, _, _ in rows}):
+        tp = fp = fn = 0
+        lead = 0.0
+        for value, label, days in rows:
+            predicted = value >= threshold if direction == "ge" else value <= threshold
+            if predicted and label:
+                tp += 1
+                lead += days
+            elif predicted:
+                fp += 1
+            elif label:
+                fn += 1
+        precision = tp / (tp + fp) if tp else 0.0
+        recall = tp / (tp + fn) if tp else 0.0
+        candidates.append((threshold, calibrate_regime._f1_score(tp, fp, fn), precision, recall, lead / tp if tp else 0.0))
+
+    def eligible(candidate):
+        if candidate[3] < recall_floor:
+            return False
+        return objective != "lead_time" or candidate[2] >= precision_floor
+
+    if objective in {"precision", "lead_time"} and any(eligible(c) for c in candidates):
+        column = 2 if objective == "precision" else 4
+        scored = [(c[column] if eligible(c) else -np.inf, c) for c in candidates]
+    else:
+        scored = [(c[1], c) for c in candidates]
+    best_score, best = scored[0]
+    for score, candidate in scored[1:]:
+        if score > best_score:
+            best_score, best = score, candidate
+    if best_score <= 0:
+        return candidates[0][0], 0.0
+    return best[0], best[1]
+
+
+def _reference_labels(usrec_daily, dates, lookahead_days):
+    """Label of each date from a slice of its lookahead window."""
+    labels = []
+    for day in dates:
+        window = usrec_daily.loc[day + timedelta(days=1):day + timedelta(days=lookahead_days)]
+        labels.append(1 if not window.empty and window.max() >= 1 else 0)
+    return labels
+
+
+def _random_inputs(rng, size):
+    # Rounded values give many ties; roughly one in ten values is missing.
+    values = [None if rng.random() < 0.1 else float(v) for v in np.round(rng.normal(size=size), 1)]
+    labels = (rng.random(size) < 0.3).astype(int)
+    lead_days = np.where(rng.random(size) < 0.2, np.nan, rng.integers(1, 400, size).astype(float))
+    return values, labels, lead_days
+
+
+class TestThresholdSearch(unittest.TestCase):
+    def assertSameThreshold(self, result, expected):
+        self.assertEqual(result[0], expected[0])
+        self.assertAlmostEqual(result[1], expected[1], places=12)
+
+    def test_sweep_matches_brute_force_with_ties_and_missing_values(self):
+        rng = np.random.default_rng(7)
+        for _ in range(40):
+            values, labels, _ = _random_inputs(rng, int(rng.integers(1, 120)))
+            for direction in ("ge", "le"):
+                self.assertSameThreshold(
+                    calibrate_regime._best_threshold(values, labels, direction=direction),
+                    _reference_threshold(values, labels, direction=direction),
+                )
+
+    def test_empty_or_all_missing_values(self):
+        self.assertEqual(calibrate_regime._best_threshold([], []), (None, 0.0))
+        self.assertEqual(calibrate_regime._best_threshold([None, None], [1, 0]), (None, 0.0))
+
+    def test_precision_objective_and_floor_fallback(self):
+        rng = np.random.default_rng(11)
+        for _ in range(20):
+            values, labels, _ = _random_inputs(rng, 80)
+            for recall_floor in (0.3, 0.8):
+                self.assertSameThreshold(
+                    calibrate_regime._best_threshold(values, labels, objective="precision", recall_floor=recall_floor),
+                    _reference_threshold(values, labels, objective="precision", recall_floor=recall_floor),
+                )
+            # No threshold reaches the floor: F1 decides.
+            self.assertSameThreshold(
+                calibrate_regime._best_threshold(values, labels, objective="precision", recall_floor=1.1),
+                calibrate_regime._best_threshold(values, labels),
+            )
+
+    def test_lead_time_objective_and_floor_fallback(self):
+        rng = np.random.default_rng(13)
+        for _ in range(20):
+            values, labels, lead_days = _random_inputs(rng, 80)
+            options = {"objective": "lead_time", "recall_floor": 0.3, "precision_floor": 0.2, "lead_days": lead_days}
+            self.assertSameThreshold(
+                calibrate_regime._best_threshold(values, labels, **options),
+                _reference_threshold(values, labels, **options),
+            )
+            options["precision_floor"] = 1.1
+            self.assertSameThreshold(
+                calibrate_regime._best_threshold(values, labels, **options),
+                calibrate_regime._best_threshold(values, labels),
+            )
+
+    def test_lead_days_count_to_next_recession_day(self):
+        index = pd.date_range("2020-01-01", "2020-03-31", freq="D")
+        usrec = pd.Series(0.0, index=index)
+        usrec.loc["2020-02-10":"2020-02-20"] = 1.0
+        dates = pd.to_datetime(["2020-01-01", "2020-02-09", "2020-02-10", "2020-02-19", "2020-02-20", "2020-03-01"])
+        leads = calibrate_regime._lead_days(usrec, dates)
+        np.testing.assert_array_equal(leads[:4], [40, 1, 1, 1])
+        self.assertTrue(np.isnan(leads[4:]).all())
+
+
+class TestRecessionLabels(unittest.TestCase):
+    def test_label_grid_matches_window_slices(self):
+        index = pd.date_range("2000-01-01", "2006-12-31", freq="D")
+        usrec = pd.Series(0.0, index=index)
+        usrec.loc["2001-03-01":"2001-11-30"] = 1.0
+        usrec.loc["2004-06-15":"2004-07-02"] = 1.0
+        usrec.loc["2003-01-01":"2003-02-28"] = np.nan
+        usrec.loc["2004-06-20":"2004-06-25"] = np.nan
+        usrec = usrec.drop(pd.date_range("2002-05-01", "2002-08-31", freq="D"))
+        dates = pd.date_range("1999-12-01", "2007-02-01", freq="3D")
+
+        horizons = [1, 90, 180, 365, 540]
+        grid = calibrate_regime._build_label_grid(usrec, dates, horizons)
+        for horizon in horizons:
+            self.assertEqual(grid[horizon].tolist(), _reference_labels(usrec, dates, horizon), msg=f"horizon {horizon}")
+        self.assertEqual(calibrate_regime._build_labels(usrec, dates, 90), _reference_labels(usrec, dates, 90))
+
+
+def _grid_inputs(seed=3):
+    """Daily scores that rise in the year before each synthetic recession."""
+    usrec = pd.Series(0.0, index=pd.date_range("2000-01-01", "2010-12-31", freq="D"))
+    for start, end in (("2001-03-01", "2001-11-30"), ("2004-09-01", "2005-02-28"), ("2007-12-01", "2009-06-30")):
+        usrec.loc[start:end] = 1.0
+    dates = list(pd.date_range("2000-01-01", "2007-12-31", freq="D"))
+    ahead = calibrate_regime._build_label_grid(usrec, dates, [365])[365]
+    rng = np.random.default_rng(seed)
+    scores = [float(v) for v in 40 + 15 * ahead + rng.normal(0, 6, len(dates))]
+    return dates, scores, usrec
+
+
+class TestCalibrationGrid(unittest.TestCase):
+    def test_training_lookahead_never_reaches_holdout(self):
+        dates, _, usrec = _grid_inputs()
+        scores = [float(i) for i in range(len(dates))]  # absolute value of window 1 = day position
+        holdout_start = dates[2000]
+        grid = calibrate_regime.calibration_grid([1], [0], ["absolute"], [(365, 180), (90, 540)])
+        with mock.patch.object(calibrate_regime, "_fit_thresholds", wraps=calibrate_regime._fit_thresholds) as fit, \
+                mock.patch("builtins.print"):
+            leaderboard = calibrate_regime.run_grid(dates, scores, usrec, grid, 60, holdout_start, workers=1)
+
+        train_fits = fit.call_args_list[::2]  # each point fits its training days, then refits everything
+        self.assertEqual(len(train_fits), len(grid))
+        for point, call in zip(grid, train_fits):
+            lookahead = pd.Timedelta(days=max(point["lookahead_phase2_days"], point["lookahead_phase3_days"]))
+            positions = call.args[0].astype(int)
+            self.assertEqual(positions[0], 59)  # first day with min_samples scores
+            self.assertLess(dates[positions[-1]] + lookahead, holdout_start)
+            self.assertGreaterEqual(dates[positions[-1] + 1] + lookahead, holdout_start)
+            row = leaderboard[leaderboard["lookahead_phase3_days"] == point["lookahead_phase3_days"]].iloc[0]
+            self.assertEqual(row["train_size"], len(positions))
+            self.assertEqual(row["test_size"], len(dates) - 2000)
+
+    def test_leaderboard_ranking_and_worker_independence(self):
+        dates, scores, usrec = _grid_inputs()
+        grid = calibrate_regime.calibration_grid([1, 14], [0, 30, 180], ["absolute", "percentile"], [(365, 180), (180, 90)])
+        holdout_start = dates[int(len(dates) * 0.7)]
+        with mock.patch("builtins.print") as printed:
+            serial = calibrate_regime.run_grid(dates, scores, usrec, grid, 60, holdout_start, workers=1)
+            forked = calibrate_regime.run_grid(dates, scores, usrec, grid, 60, holdout_start, workers=2)
+        pd.testing.assert_frame_equal(serial, forked)
+        self.assertTrue(any("can never qualify" in str(call) for call in printed.call_args_list))
+
+        self.assertEqual(list(serial.columns), calibrate_regime.GRID_COLUMNS)
+        self.assertEqual(len(serial), len(grid))
+        scored = serial[serial["oos_f1"].notna()]
+        self.assertEqual(len(scored), 16)
+        self.assertTrue(serial["oos_f1"].iloc[len(scored):].isna().all())
+        self.assertTrue((serial["lookback_days"].iloc[len(scored):] == 30).all())
+        self.assertTrue((serial["sample_size"].iloc[len(scored):] == 0).all())
+        keys = list(zip(scored["oos_f1"], scored["train_f1"], scored["sample_size"]))
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertGreater(scored["oos_f1"].iloc[0], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+FULL_INDEX = pd.bdate_range("2024-01-01", "2024-12-31")
+
+
+def _fake_yahoo(calls, scale=None, missing=()):
+    def download(tickers, start, end):
+        calls.append((list(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        idx = FULL_INDEX[(FULL_INDEX >= pd.Timestamp(start)) & (FULL_INDEX < pd.Timestamp(end))]
+        frames = {}
+        for n, ticker in enumerate(sorted(tickers)):
+            if ticker in missing:
+                continue
+            base = (np.arange(len(FULL_INDEX), dtype=float) + 100 * (n + 1)) * (scale or {}).get(ticker, 1.0)
+            values = pd.Series(base, index=FULL_INDEX).reindex(idx)
+            frames[ticker] = pd.DataFrame(
+                {"Close": values, "High": values + 1, "Low": values - 1, "Open": values, "Volume": values * 10}
+            )
+        if not frames:
+            return pd.DataFrame()
+        raw = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+        raw.columns.names = ["Price", "Ticker"]
+        raw.index.name = "Date"
+        return raw
+
+    return download
+
+
+def _fake_fred(calls, fail=False):
+    def reader(series, start, end):
+        calls.append((list(series), pd.Timestamp(start), pd.Timestamp(end)))
+        if fail:
+            raise RuntimeError("FRED down")
+        idx = pd.date_range("2020-01-01", "2024-12-31", freq="D")
+        idx = idx[(idx >= pd.Timestamp(start)) & (idx <= pd.Timestamp(end))]
+        frame = pd.DataFrame({name: np.arange(len(idx), dtype=float) + i for i, name in enumerate(series)}, index=idx)
+        frame.index.name = "DATE"
+        return frame
+
+    return reader
+
+
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._env = mock.patch.dict(os.environ, {"DATA_CACHE_DIR": self._tmp.name, "DATA_CACHE_REFRESH_DAYS": "7"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmp.cleanup()
+
+    def test_yahoo_second_run_fetches_only_tail(self):
+        calls = []
+        download = _fake_yahoo(calls)
+        tickers = ["^SPX", "WPM"]
+        first = data_cache.cached_yahoo_download(tickers, datetime(2024, 1, 1), datetime(2024, 6, 1), download)
+        self.assertEqual(len(calls), 1)
+
+        second = data_cache.cached_yahoo_download(tickers, datetime(2024, 1, 1), datetime(2024, 7, 1), download)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1][1], pd.Timestamp("2024-05-24"))
+
+        direct = download(tickers, datetime(2024, 1, 1), datetime(2024, 7, 1))
+        pd.testing.assert_frame_equal(second, direct, check_freq=False)
+        self.assertEqual(list(first["Close"].columns), ["WPM", "^SPX"])
+        self.assertIn(("Volume", "WPM"), second.columns)
+
+    def test_yahoo_readjusted_history_is_refetched_in_full(self):
+        calls = []
+        tickers = ["^SPX", "WPM"]
+        data_cache.cached_yahoo_download(tickers, datetime(2024, 1, 1), datetime(2024, 6, 1), _fake_yahoo(calls))
+
+        split = _fake_yahoo(calls, scale={"WPM": 0.5})
+        frame = data_cache.cached_yahoo_download(tickers, datetime(2024, 1, 1), datetime(2024, 7, 1), split)
+        self.assertEqual(calls[-1][0], ["WPM"])
+        self.assertEqual(calls[-1][1], pd.Timestamp("2024-01-01"))
+        pd.testing.assert_frame_equal(frame, split(tickers, datetime(2024, 1, 1), datetime(2024, 7, 1)), check_freq=False)
+
+    def test_yahoo_failed_refresh_drops_ticker(self):
+        calls = []
+        tickers = ["^SPX", "WPM"]
+        data_cache.cached_yahoo_download(tickers, datetime(2024, 1, 1), datetime(2024, 6, 1), _fake_yahoo(calls))
+        with mock.patch("builtins.print"):
+            frame = data_cache.cached_yahoo_download(
+                tickers, datetime(2024, 1, 1), datetime(2024, 7, 1), _fake_yahoo(calls, missing={"WPM"})
+            )
+        self.assertEqual(list(frame["Close"].columns), ["^SPX"])
+        self.assertEqual(frame.index.max(), pd.Timestamp("2024-06-28"))
+
+    def test_fred_serves_cache_when_refresh_fails(self):
+        calls = []
+        series = ["SOFR", "DFF"]
+        first = data_cache.cached_fred(series, datetime(2024, 1, 1), datetime(2024, 3, 1), _fake_fred(calls))
+        self.assertEqual(list(first.columns), series)
+        cached = data_cache.cached_fred(series, datetime(2024, 1, 1), datetime(2024, 3, 1), _fake_fred(calls, fail=True))
+        pd.testing.assert_frame_equal(first, cached, check_freq=False)
+        self.assertEqual(calls[-1][1], pd.Timestamp("2024-02-23"))
+
+    def test_earlier_start_refetches_full_range(self):
+        calls = []
+        reader = _fake_fred(calls)
+        data_cache.cached_fred(["ICSA"], datetime(2024, 1, 1), datetime(2024, 3, 1), reader)
+        frame = data_cache.cached_fred(["ICSA"], datetime(2023, 1, 1), datetime(2024, 3, 1), reader)
+        self.assertEqual(calls[-1][1], pd.Timestamp("2023-01-01"))
+        self.assertEqual(frame.index.min(), pd.Timestamp("2023-01-01"))
+
+    def test_disabled_cache_passes_through(self):
+        calls = []
+        with mock.patch.dict(os.environ, {"DATA_CACHE": "false"}):
+            data_cache.cached_fred(["DFF"], datetime(2024, 1, 1), datetime(2024, 2, 1), _fake_fred(calls))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(os.path.exists(os.path.join(self._tmp.name, data_cache.MANIFEST_FILENAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,12 @@
+import json
 import os
 import sqlite3
 import tempfile
 import unittest
 from unittest import mock
 
+import numpy as np
+
 import history_store
 
 
@@ -35,6 +38,47 @@ class HistoryStoreRegimeTests(unittest.TestCase):
         self.assertIn("cycle_phase", columns)
         self.assertIn("cycle_break_risk", columns)
 
+    def test_signal_events_support_indexed_range_queries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "history.db")
+            history_store.ensure_db(db_path)
+            history_store.record_signal_events(db_path, "2026-01-05", [("SUGAR_CRASH", "rsi")])
+            history_store.record_signal_events(db_path, "2026-01-05", [("SUGAR_CRASH", "rsi v2")])
+            history_store.record_signal_events(
+                db_path, "2026-03-01", [("SUGAR_CRASH", "rsi"), ("EM_CURRENCY_STRESS", "dxy")]
+            )
+            history_store.record_signal_events(db_path, "2026-02-20", [("EM_CURRENCY_STRESS", "dxy")])
+
+            with sqlite3.connect(db_path) as conn:
+                indexes = {row[1] for row in conn.execute("PRAGMA index_list(signal_events)").fetchall()}
+                plan = " ".join(
+                    str(row[-1])
+                    for row in conn.execute(
+                        "EXPLAIN QUERY PLAN SELECT date FROM signal_events WHERE signal = ? AND date >= ?",
+                        ("SUGAR_CRASH", "2026-01-01"),
+                    ).fetchall()
+                )
+                detail = conn.execute(
+                    "SELECT detail FROM signal_events WHERE date = '2026-01-05'"
+                ).fetchone()[0]
+
+            self.assertIn("idx_signal_events_signal_date", indexes)
+            self.assertIn("idx_signal_events_signal_date", plan)
+            self.assertEqual(detail, "rsi v2")
+            self.assertEqual(
+                history_store.fetch_signal_dates(db_path, "SUGAR_CRASH", start_date="2026-01-01", end_date="2026-02-28"),
+                ["2026-01-05"],
+            )
+            self.assertFalse(
+                history_store.signal_combo_in_window(db_path, "SUGAR_CRASH", "EM_CURRENCY_STRESS", "2026-02-25", 30)
+            )
+            self.assertTrue(
+                history_store.signal_combo_in_window(db_path, "SUGAR_CRASH", "EM_CURRENCY_STRESS", "2026-02-25", 60)
+            )
+            self.assertTrue(
+                history_store.signal_combo_in_window(db_path, "SUGAR_CRASH", "EM_CURRENCY_STRESS", "2026-03-01", 0)
+            )
+
     def test_regime_history_limit_auto_includes_lookbacks_and_min_samples(self):
         with mock.patch.dict(
             os.environ,
@@ -87,6 +131,132 @@ class HistoryStoreRegimeTests(unittest.TestCase):
             )
         self.assertEqual(regime["regime_phase"], "Fase 1 - AUGE")
 
+    def test_write_snapshots_upserts_rows_and_events_in_one_transaction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "history.db")
+            history_store.ensure_db(db_path)
+            history_store.upsert_daily_snapshot(db_path, {"date": "2026-01-02", "run_ts": "old", "event": "NORMAL"})
+            snapshots = [
+                {"date": f"2026-01-0{day}", "run_ts": f"2026-01-0{day}T00:00:00", "event": "NORMAL", "phase_score": float(day)}
+                for day in range(1, 6)
+            ]
+            history_store.write_snapshots(
+                db_path,
+                snapshots,
+                [("2026-01-03", "SUGAR_CRASH", "rsi"), ("2026-01-04", "FLASH_MOVE", "btc")],
+            )
+
+            self.assertEqual([row["run_ts"] for row in history_store.fetch_history(db_path)][1], "2026-01-02T00:00:00")
+            self.assertEqual(
+                [row["date"] for row in history_store.fetch_history_before(db_path, "2026-01-04", 2)],
+                ["2026-01-02", "2026-01-03"],
+            )
+            self.assertEqual(history_store.fetch_signal_dates(db_path, "FLASH_MOVE"), ["2026-01-04"])
+
+            with self.assertRaises(sqlite3.Error):
+                history_store.write_snapshots(db_path, [{"date": "2026-01-09", "run_ts": "x"}, {"date": "2026-01-10"}])
+            self.assertEqual(len(history_store.fetch_history(db_path)), 5)
+
+    def test_compute_regime_series_matches_day_by_day_compute_regime(self):
+        rng = np.random.default_rng(3)
+        scores = [None if rng.random() < 0.05 else float(rng.integers(0, 7)) for _ in range(400)]
+        for method in ("auto", "zscore", "percentile", "absolute"):
+            with mock.patch.dict(
+                os.environ,
+                {"REGIME_METHOD": method, "REGIME_PCT_LOOKBACK": "120", "REGIME_AUTO_PCT_MIN_SAMPLES": "200"},
+                clear=False,
+            ):
+                limit = history_store.regime_history_limit(14, 7, 7)
+                rows, expected = [], []
+                for score in scores:
+                    rows.append({"phase_score": score, "regime_phase": "Fase 3 - QUIEBRE" if len(rows) < 30 else None})
+                    if len(rows) > 30:
+                        regime = history_store.compute_regime(rows[-limit:], 14, 7, 7)
+                        rows[-1]["regime_phase"] = regime["regime_phase"]
+                        expected.append(regime)
+                series = history_store.compute_regime_series(
+                    scores, 14, 7, 7, history_limit=limit, prior_phases=[row["regime_phase"] for row in rows[:30]]
+                )
+
+            self.assertEqual(len(series["regime_phase"]), len(expected))
+            for idx, regime in enumerate(expected):
+                for key in ("regime_phase", "regime_trend", "regime_confidence", "regime_method"):
+                    self.assertEqual(series[key][idx], regime[key], msg=f"{method} {idx} {key}")
+                self.assertAlmostEqual(round(series["regime_score"][idx], 2), regime["regime_score"])
+                self.assertAlmostEqual(series["regime_value"][idx], regime["regime_value"], delta=0.006)
+
+    def test_calibrated_regime_uses_the_calibration_window_and_lookback(self):
+        rng = np.random.default_rng(5)
+        scores = [None if rng.random() < 0.05 else float(rng.integers(0, 7)) for _ in range(500)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "regime_calibration.json")
+            with open(path, "w") as handle:
+                json.dump(
+                    {"value_type": "zscore", "phase2_enter": -0.05, "phase2_exit": -0.1, "phase3_enter": 0.1,
+                     "phase3_exit": 0.05, "window_days": 30, "lookback_days": 365, "min_samples": 120},
+                    handle,
+                )
+            with mock.patch.object(history_store, "DEFAULT_CALIBRATION_PATH", path), \
+                    mock.patch.dict(os.environ, {"REGIME_METHOD": "calibrated"}, clear=False):
+                limit = history_store.regime_history_limit(14, 7, 7)
+                self.assertGreaterEqual(limit, 365)
+                rows, expected = [], []
+                for score in scores:
+                    rows.append({"phase_score": score, "regime_phase": None})
+                    regime = history_store.compute_regime(rows[-limit:], 14, 7, 7)
+                    rows[-1]["regime_phase"] = regime["regime_phase"]
+                    expected.append(regime)
+                series = history_store.compute_regime_series(scores, 14, 7, 7, history_limit=limit)
+
+        known = [s for s in scores[-limit:] if s is not None]
+        window, sample = np.array(known[-30:]), np.array(known[-365:])
+        last = expected[-1]
+        self.assertEqual(last["regime_window_days"], 30)
+        self.assertAlmostEqual(last["regime_score"], round(window.mean(), 2))
+        self.assertAlmostEqual(last["regime_value"], round((window.mean() - sample.mean()) / sample.std(), 2))
+        phases = {regime["regime_phase"] for regime in expected[200:]}
+        # The default z-score thresholds (0.25/1.0) are out of reach of a 30-day mean
+        self.assertIn("Fase 3 - QUIEBRE", phases)
+        self.assertIn("Fase 1 - AUGE", phases)
+        for idx, regime in enumerate(expected):
+            self.assertEqual(series["regime_phase"][idx], regime["regime_phase"], msg=f"{idx}")
+            self.assertAlmostEqual(series["regime_value"][idx], regime["regime_value"], delta=0.006)
+
+    def test_regime_config_is_cached_until_file_or_env_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "regime_calibration.json")
+            with open(path, "w") as handle:
+                json.dump(
+                    {"value_type": "zscore", "phase2_enter": 1.0, "phase2_exit": 0.5,
+                     "phase3_enter": 2.0, "phase3_exit": 1.5},
+                    handle,
+                )
+
+            with mock.patch.object(history_store, "DEFAULT_CALIBRATION_PATH", path), \
+                    mock.patch.dict(os.environ, {"REGIME_METHOD": "auto"}, clear=False), \
+                    mock.patch.object(history_store, "_load_calibration",
+                                      wraps=history_store._load_calibration) as loader:
+                first = history_store.get_regime_config()
+                for _ in range(5):
+                    history_store.compute_regime([{"phase_score": v} for v in (1.0, 2.0, 3.0)], 2, 2, 1)
+                self.assertIs(history_store.get_regime_config(), first)
+                self.assertEqual(loader.call_count, 1)
+                self.assertEqual(first["calibration"]["value_type"], "zscore")
+
+                os.environ["REGIME_METHOD"] = "percentile"
+                self.assertEqual(history_store.get_regime_config()["method"], "percentile")
+                self.assertEqual(loader.call_count, 2)
+
+                with open(path, "w") as handle:
+                    json.dump(
+                        {"value_type": "percentile", "phase2_enter": 70, "phase2_exit": 60,
+                         "phase3_enter": 90, "phase3_exit": 80},
+                        handle,
+                    )
+                os.utime(path, ns=(0, 0))
+                self.assertEqual(history_store.get_regime_config()["calibration"]["value_type"], "percentile")
+                self.assertEqual(loader.call_count, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import indicators
+import sentinel
+
+
+def _frame(rows=300, seed=4):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2023-01-02", periods=rows)
+    return pd.DataFrame(
+        {
+            "^SPX": 4000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows))),
+            "^TNX": 4 + np.cumsum(rng.normal(0, 0.02, rows)),
+        },
+        index=idx,
+    )
+
+
+class TestIndicatorSet(unittest.TestCase):
+    def test_series_are_computed_once(self):
+        ind = indicators.IndicatorSet(_frame())
+        with mock.patch.object(indicators, "rsi", wraps=indicators.rsi) as wrapped:
+            first = ind.rsi("^SPX")
+            ind.rsi_rolling("^SPX", 50, "max")
+            second = ind.rsi("^SPX")
+        self.assertIs(first, second)
+        self.assertEqual(wrapped.call_count, 1)
+
+    def test_last_row_matches_prefix_computation(self):
+        frame = _frame()
+        ind = indicators.IndicatorSet(frame)
+        prefix = frame.iloc[:200]
+        self.assertEqual(ind.rsi("^SPX").iloc[199], indicators.rsi(prefix["^SPX"]).iloc[-1])
+        threshold, _ = indicators.calculate_z_score_threshold(prefix["^TNX"], 100, 2.0)
+        self.assertAlmostEqual(ind.z_threshold("^TNX", 100, 2.0).iloc[199], threshold, places=9)
+
+    def test_missing_column_rsi_is_neutral(self):
+        ind = indicators.IndicatorSet(_frame(rows=10))
+        self.assertTrue((ind.rsi("WPM") == 50.0).all())
+
+    def test_live_and_backtest_share_the_same_functions(self):
+        for name in ("normalize_tnx", "calculate_z_score_threshold", "calculate_percentile_threshold"):
+            self.assertIs(getattr(backtest, name), getattr(indicators, name))
+        self.assertIs(sentinel.normalize_tnx, indicators.normalize_tnx)
+        self.assertIs(backtest.rsi, indicators.rsi)
+
+
+if __name__ == "__main__":
+    unittest.main()
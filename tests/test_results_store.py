@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import results_store
+
+
+def _results(rows=60, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2001-01-01", periods=rows).strftime("%Y-%m-%d")
+    score = rng.integers(0, 5, rows)
+    return pd.DataFrame(
+        {
+            "Date": dates,
+            "Event": rng.choice(["SUGAR_CRASH", "FLASH_MOVE", "DEPRESSION_WATCH"], rows),
+            "EventDetail": rng.choice([None, "Sugar+Labour"], rows),
+            "Asset": "^SPX",
+            "IsClusterStart": rng.integers(0, 2, rows),
+            "DepressionScore": score,
+            "DepressionFlag": (score >= 3).astype(int),
+            "Depress_SPX_Drawdown_12m": rng.normal(-10, 5, rows).round(2),
+            "Fwd_90d": rng.normal(0, 8, rows),
+        }
+    )
+
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_partitions_and_typed_columns(self):
+        df = _results()
+        results_store.write_results(df, base_dir=self.base)
+        results_store.write_results(df.head(5), tag="modern", base_dir=self.base)
+
+        self.assertEqual(results_store.list_events(base_dir=self.base), sorted(df["Event"].unique()))
+        loaded = results_store.load_results(base_dir=self.base)
+        self.assertEqual(len(loaded), len(df))
+        self.assertEqual(loaded["Event"].dtype.name, "category")
+        self.assertEqual(loaded["Asset"].dtype.name, "category")
+        self.assertEqual(loaded["IsClusterStart"].dtype, np.int8)
+        self.assertEqual(loaded["Fwd_90d"].dtype, np.float32)
+        self.assertEqual(len(results_store.load_results(tag="modern", base_dir=self.base)), 5)
+
+    def test_loader_reads_only_requested_partitions_and_columns(self):
+        df = _results()
+        results_store.write_results(df, base_dir=self.base)
+        with mock.patch.object(results_store.pd, "read_parquet", wraps=pd.read_parquet) as wrapped:
+            subset = results_store.load_results(
+                columns=["Date", "Event", "DepressionFlag"], events=["FLASH_MOVE"], base_dir=self.base
+            )
+        self.assertEqual(wrapped.call_count, 1)
+        self.assertEqual(wrapped.call_args.kwargs["columns"], ["Date", "DepressionFlag"])
+        self.assertEqual(list(subset.columns), ["Date", "Event", "DepressionFlag"])
+        self.assertEqual(len(subset), (df["Event"] == "FLASH_MOVE").sum())
+
+    def test_rewrite_replaces_tag_and_csv_export_round_trips(self):
+        df = _results()
+        results_store.write_results(df.assign(Event="SUGAR_CRASH"), base_dir=self.base)
+        results_store.write_results(df, base_dir=self.base)
+        self.assertEqual(len(results_store.load_results(base_dir=self.base)), len(df))
+
+        path = results_store.export_csv(os.path.join(self.base, "export.csv"), base_dir=self.base)
+        exported = pd.read_csv(path).sort_values(["Date", "Event"]).reset_index(drop=True)
+        original = df.sort_values(["Date", "Event"]).reset_index(drop=True)
+        self.assertEqual(list(exported["Date"]), list(original["Date"]))
+        np.testing.assert_allclose(exported["Fwd_90d"], original["Fwd_90d"], rtol=1e-6)
+        self.assertEqual(list(exported["DepressionFlag"]), list(original["DepressionFlag"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
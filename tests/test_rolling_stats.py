@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import rolling_stats
+
+
+def _series(rows=400, seed=3):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0, 1, rows))
+    values[120:125] = np.nan
+    values[300:330] = 95.0
+    return pd.Series(values, index=pd.bdate_range("2020-01-01", periods=rows))
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_streaming_matches_pandas_rolling(self):
+        series = _series()
+        window = 50
+        rolling = rolling_stats.RollingWindow(window)
+        mean = series.rolling(window).mean()
+        std = series.rolling(window).std()
+        q95 = series.rolling(window).quantile(0.95)
+        for i, value in enumerate(series):
+            rolling.push(value)
+            if pd.isna(mean.iloc[i]):
+                self.assertIsNone(rolling.mean())
+                self.assertIsNone(rolling.quantile(0.95))
+                continue
+            self.assertAlmostEqual(rolling.mean(), mean.iloc[i], places=9)
+            self.assertAlmostEqual(rolling.std(), std.iloc[i], places=9)
+            self.assertAlmostEqual(rolling.quantile(0.95), q95.iloc[i], places=9)
+            recent = series.iloc[i - window + 1:i + 1]
+            expected_rank = (recent < value).sum() / window * 100
+            self.assertAlmostEqual(rolling.rank(), expected_rank, places=9)
+
+    def test_constant_window_has_no_z_threshold(self):
+        series = pd.Series([5.0] * 30)
+        self.assertEqual(rolling_stats.z_score_threshold(series, window=20), (None, None))
+
+    def test_short_series_returns_none(self):
+        series = _series(rows=10)
+        self.assertEqual(rolling_stats.z_score_threshold(series, window=20), (None, None))
+        self.assertEqual(rolling_stats.percentile_threshold(series, window=20), (None, None))
+
+    def test_batch_forms_match_last_point(self):
+        series = _series()
+        window = 60
+        z_thresholds = rolling_stats.z_score_threshold_series(series, window, 2.0)
+        p_thresholds = rolling_stats.percentile_threshold_series(series, window, 95)
+        ranks = rolling_stats.percentile_rank_series(series, window)
+        z_scores = rolling_stats.z_score_series(series, window)
+        for end in (59, 130, 200, 320, 399):
+            prefix = series.iloc[:end + 1]
+            threshold, z_score = rolling_stats.z_score_threshold(prefix, window, 2.0)
+            if threshold is None:
+                self.assertTrue(pd.isna(z_thresholds.iloc[end]))
+            else:
+                self.assertAlmostEqual(threshold, z_thresholds.iloc[end], places=9)
+                self.assertAlmostEqual(z_score, z_scores.iloc[end], places=9)
+            threshold, pctl = rolling_stats.percentile_threshold(prefix, window, 95)
+            if threshold is None:
+                self.assertTrue(pd.isna(p_thresholds.iloc[end]))
+            else:
+                self.assertAlmostEqual(threshold, p_thresholds.iloc[end], places=9)
+                self.assertAlmostEqual(pctl, ranks.iloc[end], places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
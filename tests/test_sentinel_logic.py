@@ -1,5 +1,6 @@
 import os
 import tempfile
+import time
 import unittest
 from datetime import datetime
 from unittest import mock
@@ -80,6 +81,67 @@ def _fred_df(index, spread=3.0):
     )
 
 
+def _housing_df(months=150, seed=5):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2010-01-31", periods=months, freq="ME")
+    cycle = np.sin(np.arange(months) / 14.0)
+    return pd.DataFrame(
+        {
+            "HOUST": 1300 + 300 * cycle + rng.normal(0, 40, months),
+            "MORTGAGE30US": 5 + 1.5 * np.cos(np.arange(months) / 20.0) + rng.normal(0, 0.1, months),
+            "CSUSHPINSA": 150 * np.exp(np.cumsum(0.004 + 0.01 * cycle + rng.normal(0, 0.003, months))),
+            "DRSFRMACBS": 3 - cycle + rng.normal(0, 0.1, months),
+        },
+        index=idx,
+    )
+
+
+def _reference_cycle_score(housing_df):
+    """Per-prefix cycle score, scored from the full history of each series."""
+    monthly = housing_df.resample("ME").last().ffill()
+
+    def history(name):
+        series = monthly[name].dropna() if name in monthly.columns else None
+        return series if series is not None and len(series) >= 2 else None
+
+    starts, mortgage = history("HOUST"), history("MORTGAGE30US")
+    prices, delinq = history("CSUSHPINSA"), history("DRSFRMACBS")
+    pressure = spec = metrics_used = 0
+    if starts is not None:
+        if len(starts) >= sentinel.CYCLE_STARTS_Z_MONTHS:
+            window = starts.iloc[-sentinel.CYCLE_STARTS_Z_MONTHS:]
+            std = window.std()
+            starts_z = (window.iloc[-1] - window.mean()) / std if std > 0 else 0
+            metrics_used += 1
+            pressure += 2 if starts_z < -1.0 else 0
+            spec += 1 if starts_z > 0.5 else 0
+        if len(starts) >= 36:
+            ma_long = starts.iloc[-36:].mean()
+            if ma_long > 0:
+                starts_trend = (starts.iloc[-12:].mean() - ma_long) / ma_long * 100
+                metrics_used += 1
+                pressure += 1 if starts_trend < -3.0 else 0
+                spec += 1 if starts_trend > 3.0 else 0
+    if mortgage is not None and len(mortgage) >= 60:
+        gap = mortgage.iloc[-1] - mortgage.iloc[-60:].mean()
+        metrics_used += 1
+        pressure += 1 if gap > 0.75 else 0
+        spec += 1 if gap <= 0.0 else 0
+    if delinq is not None and len(delinq) >= 13:
+        metrics_used += 1
+        pressure += 1 if delinq.iloc[-1] - delinq.iloc[-13] > 0.2 else 0
+    if prices is not None:
+        if len(prices) >= 13:
+            yoy = (prices.iloc[-1] / prices.iloc[-13] - 1) * 100
+            metrics_used += 1
+            pressure += 1 if yoy < 0 else 0
+            spec += 1 if yoy >= 6 else 0
+        if len(prices) >= 7:
+            metrics_used += 1
+            spec += 1 if (prices.iloc[-1] / prices.iloc[-7] - 1) * 100 >= 3 else 0
+    return {"pressure": pressure, "spec": spec, "metrics_used": metrics_used, "cycle_index": pressure + spec * 0.5}
+
+
 class SentinelLogicTests(unittest.TestCase):
     def test_classify_cycle_phase_and_break_risk(self):
         self.assertEqual(
@@ -132,6 +194,31 @@ class SentinelLogicTests(unittest.TestCase):
         )
         self.assertEqual(adjusted, "Fase 1 - AUGE")
 
+    def test_cycle_scores_match_reference_on_every_prefix(self):
+        for months, step in ((150, 1), (400, 7)):
+            housing = _housing_df(months=months)
+            scores = sentinel.compute_cycle_scores(housing)
+            self.assertEqual(list(scores.columns), sentinel.CYCLE_SCORE_COLUMNS)
+            self.assertEqual(len(scores), months)
+            for month in scores.index[1::step]:
+                expected = _reference_cycle_score(housing.loc[:month])
+                row = scores.loc[month]
+                for column in ("pressure", "spec", "metrics_used"):
+                    self.assertEqual(row[column], expected[column], msg=f"{month:%Y-%m} {column}")
+                self.assertAlmostEqual(row["cycle_index"], expected["cycle_index"], msg=f"{month:%Y-%m}")
+            context = sentinel.compute_cycle_context(housing)
+            expected = _reference_cycle_score(housing)
+            self.assertEqual((context["cycle_pressure"], context["cycle_spec"]), (expected["pressure"], expected["spec"]))
+
+    def test_cycle_phase_history_applies_sequence_rule(self):
+        history = sentinel.cycle_phase_history(_housing_df(months=150))
+        phases = history["cycle_phase"].dropna().tolist()
+        self.assertTrue(phases)
+        for previous, current in zip(phases, phases[1:]):
+            self.assertEqual(sentinel.enforce_cycle_phase_sequence(previous, current), current)
+        context = sentinel.compute_cycle_context(_housing_df(months=150))
+        self.assertEqual(history["cycle_trend"].iloc[-1], context["cycle_trend"])
+
     def test_dedupe_active_triggers_collapses_same_event_reasons(self):
         deduped = sentinel.dedupe_active_triggers(
             [
@@ -167,6 +254,66 @@ class SentinelLogicTests(unittest.TestCase):
             )
         )
 
+    def test_recent_signals_round_trip_as_sorted_ordinals(self):
+        state = _base_state()
+        state["recent_signals"]["SUGAR_CRASH"] = ["2026-02-03", "2026-01-01", "2026-02-03", "bad"]
+        sentinel.normalize_recent_signals(state)
+        days = state["recent_signals"]["SUGAR_CRASH"]
+        self.assertEqual(days, [datetime(2026, 1, 1).toordinal(), datetime(2026, 2, 3).toordinal()])
+
+        sentinel.add_signal_to_history(state, "SUGAR_CRASH", datetime(2026, 1, 15))
+        sentinel.add_signal_to_history(state, "SUGAR_CRASH", datetime(2026, 1, 15))
+        sentinel.clean_old_signals(state, datetime(2026, 2, 10), window_days=30)
+        serialized = sentinel.serialize_state(state)
+        self.assertEqual(serialized["recent_signals"]["SUGAR_CRASH"], ["2026-01-15", "2026-02-03"])
+        self.assertIsInstance(state["recent_signals"]["SUGAR_CRASH"][0], int)
+
+    def test_check_temporal_combo_bisect_matches_pairwise_scan(self):
+        rng = np.random.default_rng(11)
+        base = datetime(2020, 1, 1).toordinal()
+        for _ in range(50):
+            state = _base_state()
+            days_a = sorted(set(int(v) for v in base + rng.integers(0, 2000, rng.integers(1, 30))))
+            days_b = sorted(set(int(v) for v in base + rng.integers(0, 2000, rng.integers(1, 30))))
+            state["recent_signals"]["SUGAR_CRASH"] = days_a
+            state["recent_signals"]["FLASH_MOVE"] = days_b
+            window = int(rng.integers(0, 90))
+            expected = any(abs(a - b) <= window for a in days_a for b in days_b)
+            self.assertEqual(
+                sentinel.check_temporal_combo(state, "SUGAR_CRASH", "FLASH_MOVE", window_days=window),
+                expected,
+            )
+
+    def test_check_temporal_combo_reads_signal_events_table(self):
+        state = _base_state()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "history.db")
+            sentinel.history_store.ensure_db(db_path)
+            sentinel.history_store.record_signal_events(db_path, "2025-12-20", [("SUGAR_CRASH", "rsi")])
+            sentinel.history_store.record_signal_events(db_path, "2026-01-10", [("INTERBANK_STRESS", "sofr")])
+
+            self.assertFalse(sentinel.check_temporal_combo(state, "SUGAR_CRASH", "INTERBANK_STRESS", window_days=30))
+            self.assertTrue(
+                sentinel.check_temporal_combo(
+                    state,
+                    "SUGAR_CRASH",
+                    "INTERBANK_STRESS",
+                    window_days=30,
+                    db_path=db_path,
+                    as_of=datetime(2026, 1, 15),
+                )
+            )
+            self.assertFalse(
+                sentinel.check_temporal_combo(
+                    state,
+                    "SUGAR_CRASH",
+                    "INTERBANK_STRESS",
+                    window_days=30,
+                    db_path=db_path,
+                    as_of=datetime(2026, 2, 1),
+                )
+            )
+
     def test_analyse_market_emergency_exit_updates_state(self):
         market = _market_df()
         wpm = _wpm_df(market.index)
@@ -292,6 +439,153 @@ class SentinelLogicTests(unittest.TestCase):
 
         self.assertIn("HISTORY_GIST_SAVE_FAILED", state["daily_alerts"]["sent_ops_warnings"])
 
+    def test_run_fetch_stage_runs_sources_concurrently_under_deadline(self):
+        def slow(seconds, rows):
+            def fetch():
+                time.sleep(seconds)
+                return pd.DataFrame({"x": range(rows)})
+            return fetch
+
+        def broken():
+            raise RuntimeError("boom")
+
+        started = time.monotonic()
+        with mock.patch("builtins.print"):
+            results, report = sentinel.run_fetch_stage(
+                {"a": slow(0.3, 3), "b": slow(0.3, 2), "bad": broken, "hung": slow(5, 1)},
+                deadline_seconds=0.8,
+            )
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.5)
+        statuses = {r["source"]: r["status"] for r in report}
+        self.assertEqual(statuses, {"a": "ok", "b": "ok", "bad": "error", "hung": "timeout"})
+        self.assertEqual(len(results["a"]), 3)
+        self.assertTrue(results["hung"].empty)
+
+    def test_hedged_fallbacks_come_from_primary_batch(self):
+        idx = pd.date_range("2025-01-01", periods=5, freq="D")
+        calls = []
+
+        def fake_download(tickers, start, end, downloader):
+            calls.append(list(tickers))
+            closes = {t: pd.Series(10.0, index=idx) for t in tickers if t not in {"^SPX", "BTC=F"}}
+            if "BTC-USD" in tickers:
+                closes["BTC-USD"] = pd.Series(float("nan"), index=idx)
+            raw = pd.concat({"Close": pd.DataFrame(closes, index=idx)}, axis=1)
+            raw.columns.names = ["Price", "Ticker"]
+            return raw
+
+        with mock.patch.object(sentinel, "HEDGED_FALLBACKS", True), mock.patch.object(
+            sentinel.data_cache, "cached_yahoo_download", side_effect=fake_download
+        ), mock.patch("builtins.print"):
+            data = sentinel.market_closes(sentinel._fetch_market_ohlcv(idx[0], idx[-1]))
+
+        # SPY rides in the batch; only BTC, with neither sensor returned, is retried alone.
+        self.assertEqual(len(calls), 2)
+        self.assertIn("SPY", calls[0])
+        self.assertEqual(calls[1], ["BTC=F"])
+        self.assertEqual(data["^SPX"].tolist(), [10.0] * 5)
+        self.assertTrue(data["BTC-USD"].isna().all())
+        self.assertNotIn("SPY", data.columns)
+        self.assertEqual(set(data.columns), set(sentinel.MARKET_TICKERS))
+
+    def test_hedged_fallbacks_download_backups_when_batch_fails(self):
+        idx = pd.date_range("2025-01-01", periods=5, freq="D")
+        calls = []
+
+        def fake_download(tickers, start, end, downloader):
+            calls.append(list(tickers))
+            if len(tickers) > 1:
+                return pd.DataFrame()
+            raw = pd.concat({"Close": pd.DataFrame({tickers[0]: pd.Series(7.0, index=idx)})}, axis=1)
+            raw.columns.names = ["Price", "Ticker"]
+            return raw
+
+        with mock.patch.object(sentinel, "HEDGED_FALLBACKS", True), mock.patch.object(
+            sentinel.data_cache, "cached_yahoo_download", side_effect=fake_download
+        ), mock.patch("builtins.print"):
+            data = sentinel.market_closes(sentinel._fetch_market_ohlcv(idx[0], idx[-1]))
+
+        backups = [backup for _, backup, _ in sentinel.MARKET_FALLBACKS]
+        self.assertEqual(calls[1:], [[backup] for backup in backups])
+        for target, _, _ in sentinel.MARKET_FALLBACKS:
+            self.assertEqual(data[target].tolist(), [7.0] * 5)
+
+    def test_wpm_ohlcv_is_derived_from_the_shared_batch(self):
+        idx = pd.date_range("2025-01-03", periods=4, freq="D")  # Fri..Mon
+        weekdays = idx[[0, 3]]
+        fields = {}
+        for field, scale in (("Close", 1.0), ("High", 1.1), ("Low", 0.9), ("Open", 1.0), ("Volume", 1000.0)):
+            fields[field] = pd.DataFrame(
+                {
+                    "WPM": pd.Series([50.0 * scale, 51.0 * scale], index=weekdays),
+                    "BTC-USD": pd.Series(40000.0 * scale, index=idx),
+                }
+            )
+        raw = pd.concat(fields, axis=1)
+        raw.columns.names = ["Price", "Ticker"]
+
+        wpm = sentinel.ticker_ohlcv(raw, "WPM")
+        self.assertEqual(list(wpm.index), list(weekdays))
+        self.assertEqual(wpm["Volume"].tolist(), [50000.0, 51000.0])
+        self.assertEqual(sentinel.ohlcv_field(raw, "Volume")["BTC-USD"].iloc[-1], 40000000.0)
+        self.assertTrue(sentinel.ticker_ohlcv(raw, "ITA").empty)
+
+    def test_market_input_rows_match_inputs_of_each_day_slice(self):
+        rng = np.random.default_rng(11)
+        market = _market_df(rows=300)
+        market = market * np.exp(np.cumsum(rng.normal(0, 0.03, market.shape), axis=0))
+        market.iloc[20:23, market.columns.get_loc("^SPX")] = np.nan
+        wpm = _wpm_df(market.index[5:])
+        fred = _fred_df(pd.date_range(market.index[0] - pd.Timedelta(days=200), market.index[-1]))
+        fred["ICSA"] = rng.normal(220_000, 20_000, len(fred))
+        fred["BAMLH0A0HYM2"] = rng.normal(5.0, 0.5, len(fred))
+        housing = _housing_df().reindex(pd.date_range("2010-01-31", market.index[-1])).ffill()
+
+        rows = list(sentinel.market_input_rows(market, wpm, fred, housing))
+        self.assertEqual(len(rows), len(market))
+        for i in (0, 12, 13, 21, 49, 50, 120, 249, 250, 299):
+            day = market.index[i]
+            expected = sentinel._latest_market_inputs(
+                market.loc[:day], wpm.loc[:day], fred.loc[:day], housing.loc[:day]
+            )
+            got = dict(rows[i])
+            scores = got.pop("cycle_scores", None)
+            np.testing.assert_equal(got, expected, err_msg=str(day))
+            if scores is not None:
+                pd.testing.assert_frame_equal(scores, sentinel.compute_cycle_scores(housing.loc[:day]))
+        self.assertEqual(len(list(sentinel.market_input_rows(market, wpm, fred, housing, after=market.index[289]))), 10)
+
+    def test_analyse_market_history_matches_day_by_day_analysis(self):
+        market = _market_df(rows=60)
+        market["BTC-USD"] = np.linspace(40000, 30000, 60)
+        market.iloc[-5:, market.columns.get_loc("WPM")] = [50.0, 46.0, 49.0, 44.0, 45.0]
+        wpm = _wpm_df(market.index)
+        fred = _fred_df(market.index)
+        fred.iloc[-20:, fred.columns.get_loc("SOFR")] = 5.5
+        housing = _housing_df()
+
+        loop_state, batch_state = _base_state(), _base_state()
+        expected = []
+        for day in market.index:
+            result = sentinel.analyse_market(
+                market.loc[:day], wpm.loc[:day], fred.loc[:day], housing.loc[:day],
+                loop_state, end_date=day.to_pydatetime(),
+            )
+            loop_state.update(result.get("state_update") or {})
+            expected.append(result)
+
+        for (day, result), want in zip(
+            sentinel.analyse_market_history(market, wpm, fred, housing, batch_state), expected
+        ):
+            batch_state.update(result.get("state_update") or {})
+            want.pop("data_warnings", None)
+            result.pop("data_warnings", None)
+            np.testing.assert_equal(result, want, err_msg=str(day))
+        self.assertIn("INTERBANK_STRESS", {e for r in expected for e in r.get("trigger_events", [])})
+        self.assertEqual(sentinel.serialize_state(batch_state), sentinel.serialize_state(loop_state))
+
 
 if __name__ == "__main__":
     unittest.main()